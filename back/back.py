@@ -1,18 +1,18 @@
 import base64
-import io
-import os
-import time
-import hmac
 import hashlib
-import secrets
+import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 
 import requests
 import streamlit as st
-from PIL import Image, ImageFilter, ImageOps
-import textwrap
+
+# 저장소 루트의 restoration 패키지 (Streamlit 없는 공용 코어: OAuth / 이미지 연산 / 상태 관리)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from restoration import kakao, workflow  # noqa: E402
+from restoration.ops import colorize_image, denoise_image, image_from_bytes, image_to_bytes, upscale_image  # noqa: E402
+from restoration.workflow import build_story, format_status  # noqa: E402
 
 import warnings
 
@@ -319,90 +319,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ------------------------------[ 1) 카카오 OAuth 설정 ]------------------------
-REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "caf4fd09d45864146cb6e75f70c713a1")
-REDIRECT_URI = os.getenv("KAKAO_REDIRECT_URI", "https://hackteam32.streamlit.app")
-STATE_SECRET = os.getenv("KAKAO_STATE_SECRET", "UzdfMyaTkcNsJ2eVnRoKjUIOvWbeAy5E")
-# or os.getenv("OAUTH_STATE_SECRET")
-# or (REST_API_KEY or "dev-secret")
-
-AUTHORIZE_URL = "https://kauth.kakao.com/oauth/authorize"
-TOKEN_URL = "https://kauth.kakao.com/oauth/token"
-USERME_URL = "https://kapi.kakao.com/v2/user/me"
-STATE_TTL_SEC = 5 * 60
-
-
-def _hmac_sha256(key: str, msg: str) -> str:
-    return hmac.new(key.encode(), msg.encode(), hashlib.sha256).hexdigest()
-
-
-def make_state() -> str:
-    ts = str(int(time.time()))
-    nonce = secrets.token_urlsafe(8)
-    raw = f"{ts}.{nonce}"
-    sig = _hmac_sha256(STATE_SECRET, raw)
-    return f"{raw}.{sig}"
-
-
-def verify_state(state: str) -> bool:
-    if not state or state.count(".") != 2:
-        return False
-    ts, nonce, sig = state.split(".")
-    expected = _hmac_sha256(STATE_SECRET, f"{ts}.{nonce}")
-    if not hmac.compare_digest(sig, expected):
-        return False
-    try:
-        ts_i = int(ts)
-    except ValueError:
-        return False
-    if time.time() - ts_i > STATE_TTL_SEC:
-        return False
-    return True
-
-
-def build_auth_url() -> str:
-    state = make_state()
-    return (
-        f"{AUTHORIZE_URL}"
-        f"?client_id={REST_API_KEY}"
-        f"&redirect_uri={REDIRECT_URI}"
-        f"&response_type=code"
-        f"&state={state}"
-    )
-
-
-def exchange_code_for_token(code: str) -> dict:
-    data = {
-        "grant_type": "authorization_code",
-        "client_id": REST_API_KEY,
-        "redirect_uri": REDIRECT_URI,
-        "code": code,
-        "client_secret": STATE_SECRET
-    }
-    response = requests.post(TOKEN_URL, data=data, timeout=10)
-    response.raise_for_status()
-    return response.json()
-
-
-def get_user_profile(access_token: str) -> dict:
-    response = requests.get(
-        USERME_URL,
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=10,
-    )
-    response.raise_for_status()
-    return response.json()
-
-
-def extract_profile(user_me: dict):
-    account = (user_me or {}).get("kakao_account", {}) or {}
-    profile = account.get("profile", {}) or {}
-    nickname = profile.get("nickname") or None
-    img = profile.get("profile_image_url") or profile.get("thumbnail_image_url") or None
-    if not nickname or not img:
-        props = (user_me or {}).get("properties", {}) or {}
-        nickname = nickname or props.get("nickname")
-        img = img or props.get("profile_image") or props.get("thumbnail_image")
-    return nickname, img
+KAKAO = kakao.config_from_env()  # state 서명/토큰 교환/프로필 조회는 restoration/kakao.py
 
 
 # ------------------------------[ 2) 콜백/로그아웃 처리 ]------------------------
@@ -431,13 +348,13 @@ state = _first_param("state")
 if error:
     st.error(f"카카오 인증 에러: {error}\n{error_description or ''}")
 elif code:
-    if not verify_state(state):
+    if not kakao.verify_state(state, KAKAO.state_secret, KAKAO.state_ttl_sec):
         st.error("state 검증 실패(CSRF/만료). 다시 시도해주세요.")
     else:
         try:
-            token_json = exchange_code_for_token(code)
+            token_json = kakao.exchange_code_for_token(KAKAO, code)
             st.session_state.kakao_token = token_json
-            st.session_state.kakao_profile = get_user_profile(token_json["access_token"])
+            st.session_state.kakao_profile = kakao.get_user_profile(KAKAO, token_json["access_token"])
 
             # === 팝업 창이면 토큰을 부모창으로 전달 ===
             st.markdown(f"""
@@ -460,10 +377,10 @@ elif code:
         except requests.HTTPError as exc:
             st.exception(exc)
 # ------------------------------[ 3) 우상단 네비바 ]-----------------------------
-auth_url = build_auth_url()
+auth_url = kakao.build_auth_url(KAKAO)
 nickname, img_url = None, None
 if "kakao_profile" in st.session_state:
-    nickname, img_url = extract_profile(st.session_state["kakao_profile"])
+    nickname, img_url = kakao.extract_profile(st.session_state["kakao_profile"])
 nav_content = []
 if "kakao_token" in st.session_state:
     nav_content.append("<a class='logout-btn' href='?logout=1'>로그아웃</a>")
@@ -646,114 +563,18 @@ render_hero_section(auth_url, "kakao_token" in st.session_state)
 # ------------------------------[ 4) 복원 유틸 함수 ]---------------------------
 def ensure_restoration_state() -> Dict:
     if "restoration" not in st.session_state:
-        st.session_state.restoration = {
-            "upload_digest": None,
-            "original_bytes": None,
-            "photo_type": None,
-            "description": "",
-            "current_bytes": None,
-            "counts": {"color": 0, "upscale": 0, "denoise": 0, "story": 0},
-            "history": [],
-            "story": None,
-        }
+        st.session_state.restoration = workflow.new_state(photo_type=None)
     return st.session_state.restoration
 
 
-def image_from_bytes(data: bytes) -> Image.Image:
-    image = Image.open(io.BytesIO(data))
-    image = ImageOps.exif_transpose(image)
-    return image.convert("RGB")
-
-
-def image_to_bytes(image: Image.Image) -> bytes:
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return buffer.getvalue()
-
-
-def colorize_image(image: Image.Image) -> Image.Image:
-    gray = image.convert("L")
-    colorized = ImageOps.colorize(gray, black="#1e1e1e", white="#f8efe3", mid="#88a6c6")
-    return colorized.convert("RGB")
-
-
-def upscale_image(image: Image.Image) -> Image.Image:
-    width, height = image.size
-    factor = 2
-    return image.resize((width * factor, height * factor), Image.LANCZOS)
-
-
-def denoise_image(image: Image.Image) -> Image.Image:
-    smoothed = image.filter(ImageFilter.MedianFilter(size=3))
-    return smoothed.filter(ImageFilter.SMOOTH_MORE)
-
-
-def format_status(counts: Dict[str, int]) -> str:
-    return (
-        f"[컬러화 {'✔' if counts['color'] else '✖'} / "
-        f"해상도 {counts['upscale']}회 / 노이즈 {counts['denoise']}회]"
-    )
-
-
+# 이미지 연산(image_from_bytes, image_to_bytes, colorize/upscale/denoise)과 build_story, format_status 는
+# restoration 패키지 (team_project1.py 와 같은 구현)
 def add_history_entry(label: str, image_bytes: bytes, note: Optional[str] = None):
-    restoration = ensure_restoration_state()
-    entry = {
-        "label": label,
-        "bytes": image_bytes,
-        "status": dict(restoration["counts"]),
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "note": note,
-    }
-    restoration["history"].append(entry)
-    restoration["current_bytes"] = image_bytes
+    workflow.add_history_entry(ensure_restoration_state(), label, image_bytes, note)
 
 
 def reset_restoration(upload_digest: str, original_bytes: bytes, photo_type: str, description: str):
-    restoration = ensure_restoration_state()
-    restoration.update(
-        {
-            "upload_digest": upload_digest,
-            "original_bytes": original_bytes,
-            "photo_type": photo_type,
-            "description": description,
-            "current_bytes": original_bytes,
-            "counts": {"color": 0, "upscale": 0, "denoise": 0, "story": 0},
-            "history": [],
-            "story": None,
-        }
-    )
-
-
-def build_story(description: str, counts: Dict[str, int], photo_type: str) -> str:
-    base = description.strip() or "이 사진"
-    story_lines = []
-    intro = f"{base}은(는) 조심스럽게 복원 과정을 거치고 있습니다."
-    story_lines.append(intro)
-    if photo_type == "흑백":
-        if counts["color"]:
-            story_lines.append(
-                "흑백으로 남아 있던 순간에 색을 덧입히자 잊혔던 온기와 공기가 되살아났습니다."
-            )
-        else:
-            story_lines.append("아직 색을 입히지 못한 채 시간 속에서 기다리고 있습니다.")
-    if counts["upscale"]:
-        story_lines.append(
-            f"세부 묘사를 살리기 위해 해상도 보정을 {counts['upscale']}회 반복하며 흐릿했던 윤곽을 또렷하게 다듬었습니다."
-        )
-    if counts["denoise"]:
-        story_lines.append(
-            f"잡음을 정리하는 과정도 {counts['denoise']}회 진행되어 사진 속 인물의 표정과 배경이 한층 차분해졌습니다."
-        )
-    if not counts["upscale"] and not counts["denoise"] and counts["color"]:
-        story_lines.append("색만 더했을 뿐인데도 장면의 감정이 살아 움직이는 듯합니다.")
-    climax = (
-        "복원된 이미지를 바라보는 지금, 사진 속 이야기가 현재의 우리에게 말을 건네는 듯합니다."
-    )
-    story_lines.append(climax)
-    outro = "이 장면이 전하고 싶은 메시지가 있다면, 그것은 기억을 계속 이어가자는 마음일지도 모릅니다."
-    story_lines.append(outro)
-    wrapped = [textwrap.fill(line, width=46) for line in story_lines]
-    return "\n\n".join(wrapped)
+    workflow.reset(ensure_restoration_state(), upload_digest, original_bytes, description, photo_type=photo_type)
 
 
 def handle_auto_colorization(photo_type: str):
@@ -771,11 +592,7 @@ def handle_auto_colorization(photo_type: str):
 
 
 def can_run_operation(operation: str, allow_repeat: bool) -> bool:
-    restoration = ensure_restoration_state()
-    count = restoration["counts"].get(operation, 0)
-    if allow_repeat:
-        return count < 3
-    return count == 0
+    return workflow.can_run_operation(ensure_restoration_state(), operation, allow_repeat)
 
 
 def run_upscale():
@@ -0,0 +1,50 @@
+# ============================================================
+# 인코딩 정책 벤치마크
+#   python bench/bench_encoding.py [--repeat 3]
+# - before.png 를 여러 해상도로 리사이즈한 뒤 정책별 인코딩 시간/크기를 표로 출력
+# ============================================================
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from restoration.encoding import POLICIES, encode_image  # noqa: E402
+
+SIZES_MP = [0.3, 1.0, 4.0, 12.0]
+
+
+def make_input(mp: float) -> Image.Image:
+    src = Image.open(ROOT / "before.png").convert("RGB")
+    scale = (mp * 1_000_000 / (src.width * src.height)) ** 0.5
+    return src.resize((max(1, int(src.width * scale)), max(1, int(src.height * scale))), Image.LANCZOS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--policies", nargs="*", default=list(POLICIES))
+    args = parser.parse_args()
+
+    print("| size | policy | encode ms | KB |")
+    print("|---:|---|---:|---:|")
+    for mp in SIZES_MP:
+        image = make_input(mp)
+        label = f"{image.width}x{image.height}"
+        for name in args.policies:
+            policy = POLICIES[name]
+            best = float("inf")
+            data = b""
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                data = encode_image(image, policy)
+                best = min(best, time.perf_counter() - t0)
+            print(f"| {label} | {name} | {best * 1000:.1f} | {len(data) / 1024:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# ============================================================
+# 콜드 스타트 / import 시간 벤치마크
+#   python bench/bench_import.py [--repeat 3]
+# - 새 프로세스에서 AppTest로 랜딩 페이지를 1회 렌더링하고
+#   소요 시간과 torch / transformers 가 sys.modules 에 올라왔는지 확인
+# - 비교용으로 `import torch, transformers` 자체에 걸리는 시간도 측정(설치된 경우)
+# ============================================================
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+LANDING_SNIPPET = f"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({str(ROOT / "team_project1.py")!r}, default_timeout=120)
+at.run()
+print(json.dumps({{
+    "seconds": time.perf_counter() - t0,
+    "exception": [e.value for e in at.exception],
+    "torch_loaded": "torch" in sys.modules,
+    "transformers_loaded": "transformers" in sys.modules,
+}}))
+"""
+
+ML_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+try:
+    import torch, transformers
+    ok = True
+except ImportError:
+    ok = False
+print(json.dumps({"seconds": time.perf_counter() - t0, "installed": ok}))
+"""
+
+
+def _run(snippet: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    landing = [_run(LANDING_SNIPPET) for _ in range(args.repeat)]
+    ml = [_run(ML_SNIPPET) for _ in range(args.repeat)]
+
+    print("| measurement | best s | notes |")
+    print("|---|---:|---|")
+    best = min(landing, key=lambda r: r["seconds"])
+    notes = f"torch loaded={best['torch_loaded']}, transformers loaded={best['transformers_loaded']}"
+    if best["exception"]:
+        notes += f", exception={best['exception'][0][:60]}"
+    print(f"| landing page (streamlit import + first run) | {best['seconds']:.2f} | {notes} |")
+    ml_best = min(ml, key=lambda r: r["seconds"])
+    ml_note = "" if ml_best["installed"] else "torch/transformers not installed"
+    print(f"| import torch, transformers | {ml_best['seconds']:.2f} | {ml_note} |")
+
+    if any(r["torch_loaded"] or r["transformers_loaded"] for r in landing):
+        sys.exit("랜딩 페이지 렌더링 중 ML 스택이 import 되었습니다.")
+
+
+if __name__ == "__main__":
+    main()
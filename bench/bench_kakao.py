@@ -0,0 +1,87 @@
+# ============================================================
+# Kakao 로그인 콜백 HTTP 벤치마크 (로컬 대역 서버 사용)
+#   python bench/bench_kakao.py [--logins 200] [--latency 0.002]
+# - 로그인 1회 = 토큰 교환(POST) + 프로필 조회(GET)
+# - bare requests.post/get vs 공용 세션(restoration/kakao.py) 비교
+# - 일시적 503 에 대한 재시도 동작도 확인 (실패 시 종료 코드 1)
+# ============================================================
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.kakao_stub import KakaoStub  # noqa: E402
+from restoration import kakao  # noqa: E402
+
+
+def login_bare(stub: KakaoStub, code: str) -> dict:
+    token = requests.post(stub.token_url, data={"code": code}, timeout=10).json()
+    response = requests.get(
+        stub.user_url, headers={"Authorization": f"Bearer {token['access_token']}"}, timeout=10
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def login_pooled(stub: KakaoStub, code: str) -> dict:
+    token = kakao.request("token", "POST", stub.token_url, data={"code": code}).json()
+    response = kakao.request(
+        "profile", "GET", stub.user_url, headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def run(label: str, fn, logins: int, latency: float) -> None:
+    stub = KakaoStub(latency=latency).start()
+    try:
+        samples = []
+        for i in range(logins):
+            t0 = time.perf_counter()
+            fn(stub, f"code{i}")
+            samples.append(time.perf_counter() - t0)
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(
+            f"| {label} | {logins} | {statistics.median(samples) * 1000:.2f} | {p95 * 1000:.2f} "
+            f"| {stub.stats['connections']} |"
+        )
+    finally:
+        stub.stop()
+
+
+def check_retry() -> bool:
+    stub = KakaoStub(fail_first=2).start()
+    try:
+        profile = login_pooled(stub, "retry")
+        ok = stub.stats["failed"] == 2 and profile["kakao_account"]["profile"]["nickname"]
+        print(f"retry check: failed={stub.stats['failed']} profile_calls={stub.stats['profile']} → {'OK' if ok else 'FAIL'}")
+        return bool(ok)
+    finally:
+        stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print("| client | logins | p50 ms | p95 ms | TCP connections |")
+    print("|---|---:|---:|---:|---:|")
+    run("bare requests", login_bare, args.logins, args.latency)
+    run("pooled session", login_pooled, args.logins, args.latency)
+    print()
+    print(kakao.latency_summary())
+    if not check_retry():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# ============================================================
+# 이미지 연산 마이크로 벤치마크
+#   python bench/bench_ops.py                       # 전체 실행 + 기준선 비교
+#   python bench/bench_ops.py --sizes 0.3 1 --modes RGB
+#   python bench/bench_ops.py --update-baseline     # bench/baseline_ops.json 갱신
+# - 연산: decode(image_from_bytes) / encode(image_to_bytes) / upscale / denoise / colorize
+# - 입력: before.png 를 0.3 ~ 50MP 로 리사이즈한 합성 이미지, 모드 RGB / L / RGBA
+# - 기록: 벽시계 시간(best of N), 최대 RSS 증가량, 처리량(MP/s)
+# - 기준선보다 --tolerance 이상 느려진 항목은 REGRESSION 으로 표시하고 종료 코드 1
+# ============================================================
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from pathlib import Path
+
+import PIL
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from restoration.encoding import encode_for_stage  # noqa: E402
+from restoration.ops import colorize_image, denoise_image, image_from_bytes, image_to_bytes, upscale_image  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline_ops.json"
+DEFAULT_SIZES = [0.3, 1.0, 4.0, 12.0, 50.0]
+DEFAULT_MODES = ["RGB", "L", "RGBA"]
+OPS = {
+    "decode": image_from_bytes,
+    "encode": image_to_bytes,
+    "upscale": upscale_image,
+    "denoise": denoise_image,
+    "colorize": colorize_image,
+}
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """연산 중 RSS 를 주기적으로 샘플링해서 시작 대비 최대 증가량을 잰다."""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.start = rss_bytes()
+        self.peak = self.start
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+    @property
+    def delta_mb(self) -> float:
+        return (self.peak - self.start) / (1024 * 1024)
+
+
+def make_input(mp: float, mode: str) -> Image.Image:
+    with Image.open(ROOT / "before.png") as src:
+        src = src.convert("RGB")
+        scale = (mp * 1_000_000 / (src.width * src.height)) ** 0.5
+        im = src.resize((max(1, int(src.width * scale)), max(1, int(src.height * scale))), Image.BILINEAR)
+    if mode == "RGBA":
+        im.putalpha(Image.linear_gradient("L").resize(im.size))
+        return im
+    return im.convert(mode)
+
+
+def run_case(op: str, image: Image.Image, payload, repeat: int) -> dict:
+    fn = OPS[op]
+    arg = payload if op == "decode" else image
+    best = float("inf")
+    peak = 0.0
+    for _ in range(repeat):
+        with PeakRSS() as mem:
+            t0 = time.perf_counter()
+            result = fn(arg)
+            elapsed = time.perf_counter() - t0
+        del result
+        best = min(best, elapsed)
+        peak = max(peak, mem.delta_mb)
+    mp = image.width * image.height / 1_000_000
+    return {"seconds": best, "peak_rss_mb": peak, "mp_per_s": mp / best if best else 0.0}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for key, row in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        ratio = row["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        row["vs_baseline"] = ratio
+        # 아주 짧은 연산은 타이머 잡음이 커서 5ms 미만 차이는 무시
+        if ratio > 1 + tolerance and row["seconds"] - base["seconds"] > 0.005:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--modes", nargs="+", default=DEFAULT_MODES)
+    parser.add_argument("--ops", nargs="+", default=list(OPS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, help="결과를 JSON 으로도 저장")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    results = {}
+    print("| op | mode | size | ms | peak RSS MB | MP/s | vs baseline |")
+    print("|---|---|---|---:|---:|---:|---:|")
+    for mp in args.sizes:
+        for mode in args.modes:
+            image = make_input(mp, mode)
+            payload = encode_for_stage(image, "intermediate") if "decode" in args.ops else None
+            repeat = args.repeat if mp < 12 else 1
+            for op in args.ops:
+                key = f"{op}/{mode}/{mp:g}mp"
+                row = run_case(op, image, payload, repeat)
+                results[key] = row
+                base = baseline.get("results", {}).get(key)
+                vs = f"{row['seconds'] / base['seconds']:.2f}x" if base and base["seconds"] else "-"
+                print(
+                    f"| {op} | {mode} | {image.width}x{image.height} | {row['seconds'] * 1000:.1f} "
+                    f"| {row['peak_rss_mb']:.0f} | {row['mp_per_s']:.1f} | {vs} |",
+                    flush=True,
+                )
+            del image, payload
+
+    meta = {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    if args.json:
+        args.json.write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+    if args.update_baseline:
+        merged = dict(baseline.get("results", {}))
+        merged.update(results)
+        args.baseline.write_text(json.dumps({"meta": meta, "results": merged}, indent=1, sort_keys=True) + "\n")
+        print(f"baseline updated → {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for key, ratio in regressions:
+        print(f"REGRESSION {key}: {ratio:.2f}x baseline")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# ============================================================
+# rerun 지연 벤치마크 (브라우저 없이 AppTest 로 team_project1.py 실행)
+#   python bench/bench_rerun.py [--repeat 10] [--image-mp 1.0]
+# - 스토리 모델은 STORY_MODEL_BACKEND=stub (torch 불필요, 이 벤치에서는 호출되지도 않음)
+# - 시나리오: 랜딩 / 업로드 직후 / 히스토리 5개 / 스토리 표시
+#   세션 상태를 직접 주입한 뒤 전체 스크립트 rerun 을 반복
+# - 시나리오별 첫 실행(cold)·rerun p50/p95 시간, ForwardMsg 페이로드 크기, 요소 수 출력
+# ============================================================
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("STORY_MODEL_BACKEND", "stub")
+os.environ.setdefault("METRICS_PORT", "")
+
+from PIL import Image  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from restoration.encoding import encode_for_stage  # noqa: E402
+
+SCENARIOS = ["landing", "uploaded", "history5", "story"]
+STORY_TEXT = "오래된 사진 속 장면이 다시 숨을 쉬는 듯합니다. " * 20
+
+# ---------- 페이로드 측정 ----------
+# AppTest 는 실행이 끝나면 forward_msgs() 로 메시지를 모아 트리를 만든다 → 그 시점에 크기 합산
+_last_payload = {"bytes": 0, "messages": 0}
+_orig_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _measured_forward_msgs(self):
+    msgs = _orig_forward_msgs(self)
+    _last_payload["bytes"] = sum(m.ByteSize() for m in msgs)
+    _last_payload["messages"] = len(msgs)
+    return msgs
+
+
+LocalScriptRunner.forward_msgs = _measured_forward_msgs
+
+
+def make_upload(mp: float) -> bytes:
+    with Image.open(ROOT / "before.png") as src:
+        src = src.convert("RGB")
+        scale = (mp * 1_000_000 / (src.width * src.height)) ** 0.5
+        im = src.resize((max(1, int(src.width * scale)), max(1, int(src.height * scale))))
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def restoration_state(scenario: str, upload: bytes) -> dict:
+    intermediate = encode_for_stage(Image.open(io.BytesIO(upload)).convert("RGB"))
+    labels = ["해상도 업", "노이즈 제거"]
+    n_history = {"uploaded": 0, "history5": 5, "story": 1}[scenario]
+    history = [
+        {
+            "label": labels[i % 2],
+            "bytes": intermediate,
+            "status": {"color": 0, "upscale": (i + 2) // 2, "denoise": (i + 1) // 2, "story": 0},
+            "timestamp": "2024-01-01 00:00:00",
+            "file_name": "bench.jpg",
+            "note": None,
+        }
+        for i in range(n_history)
+    ]
+    return {
+        "upload_digest": "bench",
+        "original_bytes": upload,
+        "description": "",
+        "current_bytes": history[-1]["bytes"] if history else upload,
+        "counts": {"color": 0, "upscale": 0, "denoise": 0, "story": 0},
+        "history": history,
+        "story": {"text": STORY_TEXT, "spent": 1.0} if scenario == "story" else None,
+        "file_name": "bench.jpg",
+    }
+
+
+def count_elements(node) -> int:
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(c) for c in children.values())
+
+
+def run_scenario(scenario: str, upload: bytes, repeat: int) -> dict:
+    at = AppTest.from_file(str(ROOT / "team_project1.py"), default_timeout=120)
+    at.secrets["HF_TOKEN"] = "bench"
+    if scenario != "landing":
+        at.session_state["restoration"] = restoration_state(scenario, upload)
+
+    t0 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"{scenario}: {at.exception[0].value}")
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "cold": cold,
+        "p50": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "payload_kb": _last_payload["bytes"] / 1024,
+        "messages": _last_payload["messages"],
+        "elements": count_elements(at._tree),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--image-mp", type=float, default=1.0)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    args = parser.parse_args()
+
+    upload = make_upload(args.image_mp)
+    print(f"upload: {len(upload) / 1024:.0f} KB ({args.image_mp} MP), reruns per scenario: {args.repeat}")
+    print("| scenario | cold ms | rerun p50 ms | rerun p95 ms | payload KB | messages | elements |")
+    print("|---|---:|---:|---:|---:|---:|---:|")
+    for scenario in args.scenarios:
+        r = run_scenario(scenario, upload, args.repeat)
+        print(
+            f"| {scenario} | {r['cold'] * 1000:.0f} | {r['p50'] * 1000:.0f} | {r['p95'] * 1000:.0f} "
+            f"| {r['payload_kb']:.1f} | {r['messages']} | {r['elements']} |",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
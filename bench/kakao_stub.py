@@ -0,0 +1,129 @@
+# ============================================================
+# 로컬 Kakao OAuth 대역 서버 (벤치마크 / 부하 테스트용)
+#   python bench/kakao_stub.py --port 8765
+# - POST /oauth/token  → {"access_token": "tok-<code>", ...}
+# - GET  /v2/user/me   → 닉네임/프로필 이미지가 든 사용자 정보
+# - latency: 응답 지연(초), fail_first: 처음 N번의 프로필 요청은 503
+# - fail_token: 처음 N번의 토큰 요청은 503 (POST 가 재시도되지 않는지 확인용)
+# - 새 TCP 연결 수를 세어 keep-alive 재사용 여부를 확인할 수 있음
+# ============================================================
+import argparse
+import json
+import socket
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class KakaoStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, fail_first: int = 0,
+                 fail_token: int = 0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_token = fail_token
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "token": 0, "profile": 0, "failed": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.base_url}/oauth/token"
+
+    @property
+    def user_url(self) -> str:
+        return f"{self.base_url}/v2/user/me"
+
+    def _count(self, key: str) -> int:
+        with self.lock:
+            self.stats[key] += 1
+            return self.stats[key]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                # 헤더/본문이 따로 나가도 delayed ACK(~40ms)에 걸리지 않도록
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                stub._count("connections")
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if self.path != "/oauth/token":
+                    return self._send(404, {"error": "not_found"})
+                n = stub._count("token")
+                time.sleep(stub.latency)
+                if n <= stub.fail_token:
+                    stub._count("failed")
+                    return self._send(503, {"error": "temporarily unavailable"})
+                code = (form.get("code") or [""])[0]
+                self._send(200, {
+                    "access_token": f"tok-{code}",
+                    "token_type": "bearer",
+                    "refresh_token": f"ref-{code}",
+                    "expires_in": 21599,
+                })
+
+            def do_GET(self):
+                if self.path != "/v2/user/me":
+                    return self._send(404, {"error": "not_found"})
+                n = stub._count("profile")
+                time.sleep(stub.latency)
+                if n <= stub.fail_first:
+                    stub._count("failed")
+                    return self._send(503, {"msg": "temporarily unavailable"})
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                self._send(200, {
+                    "id": zlib.crc32(token.encode()),
+                    "kakao_account": {"profile": {
+                        "nickname": f"user-{token[-6:]}",
+                        "profile_image_url": "https://example.invalid/avatar.png",
+                    }},
+                })
+
+        return Handler
+
+    def start(self) -> "KakaoStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+    stub = KakaoStub(port=args.port, latency=args.latency, fail_first=args.fail_first)
+    print(f"KAKAO_TOKEN_URL={stub.token_url}")
+    print(f"KAKAO_USER_URL={stub.user_url}")
+    stub.server.serve_forever()
@@ -0,0 +1,270 @@
+# ============================================================
+# 전체 앱 부하 테스트 하네스
+#   python bench/loadtest.py [--concurrency 1 2 4 8] [--sessions 2] [--image-mp 0.5]
+# - 로컬 Kakao 대역 서버(bench/kakao_stub.py) + 가짜 스토리 모델(STORY_MODEL_BACKEND=stub)로
+#   `streamlit run team_project1.py` 프로세스를 하나 띄우고,
+#   브라우저 대신 Streamlit 웹소켓 프로토콜(BackMsg / ForwardMsg)로 세션을 직접 구동한다.
+# - 세션 시나리오: 랜딩 → 카카오 콜백(code+state) → 업로드 → 해상도 업 → 노이즈 제거 → 스토리
+# - 동시 세션 수별 단계 p50/p95/p99 지연과 시나리오 처리량(sessions/s) 출력
+# ============================================================
+import argparse
+import asyncio
+import io
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+from PIL import Image
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileURLs, FileURLsRequest, FileUploaderState, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.websocket import websocket_connect
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.kakao_stub import KakaoStub  # noqa: E402
+from restoration.kakao import make_state  # noqa: E402  (앱과 같은 state 서명)
+
+STATE_SECRET = "loadtest-state-secret"
+STEPS = ["landing", "login", "upload", "upscale", "denoise", "story"]
+DONE = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+def make_upload(mp: float) -> bytes:
+    with Image.open(ROOT / "before.png") as src:
+        src = src.convert("RGB")
+        scale = (mp * 1_000_000 / (src.width * src.height)) ** 0.5
+        im = src.resize((max(1, int(src.width * scale)), max(1, int(src.height * scale))))
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+class AppClient:
+    """브라우저 탭 하나를 흉내내는 최소 Streamlit 웹소켓 클라이언트."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.ws = None
+        self.session_id = ""
+        self.widgets = {}  # key → (widget_id, fragment_id)
+        self.states = {}  # widget_id → WidgetState
+        self.errors = []
+
+    async def connect(self) -> None:
+        url = self.base_url.replace("http://", "ws://") + "/_stcore/stream"
+        self.ws = await websocket_connect(url, subprotocols=["streamlit"], max_message_size=256 * 1024 * 1024)
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            self.ws.close()
+
+    def _track(self, msg: ForwardMsg) -> None:
+        kind = msg.WhichOneof("type")
+        if kind == "new_session" and msg.new_session.initialize.session_id:
+            self.session_id = msg.new_session.initialize.session_id
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            etype = element.WhichOneof("type")
+            if etype == "exception":
+                self.errors.append(element.exception.message)
+                return
+            widget = getattr(element, etype, None)
+            widget_id = getattr(widget, "id", "") if widget is not None else ""
+            if widget_id.startswith("$$ID-"):
+                self.widgets[widget_id.rsplit("-", 1)[-1]] = (widget_id, msg.delta.fragment_id)
+
+    async def _read_until(self, predicate):
+        received = 0
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise ConnectionError("websocket closed")
+            received += len(raw)
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            self._track(msg)
+            if predicate(msg):
+                return msg, received
+
+    async def rerun(self, query_string: str = "", trigger: str = "", fragment_id: str = ""):
+        back = BackMsg()
+        state = back.rerun_script
+        state.query_string = query_string
+        state.fragment_id = fragment_id
+        for ws in self.states.values():
+            state.widget_states.widgets.append(ws)
+        if trigger:
+            state.widget_states.widgets.append(WidgetState(id=self.widgets[trigger][0], trigger_value=True))
+        self.errors.clear()
+        await self.ws.write_message(back.SerializeToString(), binary=True)
+        _, received = await self._read_until(lambda m: m.WhichOneof("type") == "script_finished" and m.script_finished in DONE)
+        if self.errors:
+            raise RuntimeError(self.errors[0])
+        return received
+
+    async def click(self, key: str) -> int:
+        _, fragment_id = self.widgets[key]
+        return await self.rerun(trigger=key, fragment_id=fragment_id)
+
+    async def upload(self, key: str, name: str, data: bytes) -> int:
+        request_id = uuid.uuid4().hex
+        back = BackMsg(file_urls_request=FileURLsRequest(request_id=request_id, file_names=[name], session_id=self.session_id))
+        await self.ws.write_message(back.SerializeToString(), binary=True)
+        msg, _ = await self._read_until(
+            lambda m: m.WhichOneof("type") == "file_urls_response" and m.file_urls_response.response_id == request_id
+        )
+        urls = msg.file_urls_response.file_urls[0]
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{name}\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n"
+        ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        await AsyncHTTPClient().fetch(HTTPRequest(
+            self.base_url + urls.upload_url, method="PUT", body=body,
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        ))
+        widget_id, fragment_id = self.widgets[key]
+        self.states[widget_id] = WidgetState(id=widget_id, file_uploader_state_value=FileUploaderState(
+            max_file_id=1,
+            uploaded_file_info=[UploadedFileInfo(
+                id=1, name=name, size=len(data), file_id=urls.file_id,
+                file_urls=FileURLs(file_id=urls.file_id, upload_url=urls.upload_url, delete_url=urls.delete_url),
+            )],
+        ))
+        return await self.rerun(fragment_id=fragment_id)
+
+
+async def run_scenario(base_url: str, idx: int, upload: bytes) -> dict:
+    client = AppClient(base_url)
+    timings = {}
+    try:
+        await client.connect()
+
+        async def step(name, coro):
+            t0 = time.perf_counter()
+            await coro
+            timings[name] = time.perf_counter() - t0
+
+        await step("landing", client.rerun())
+        await step("login", client.rerun(query_string=f"code=session{idx}&state={make_state(STATE_SECRET)}"))
+        await step("upload", client.upload("photo_uploader", f"load{idx}.jpg", upload))
+        await step("upscale", client.click("btn_upscale"))
+        await step("denoise", client.click("btn_denoise"))
+        await step("story", client.click("btn_story"))
+    finally:
+        await client.close()
+    return timings
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port: int, env: dict) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "streamlit", "run", str(ROOT / "team_project1.py"),
+        "--server.headless", "true",
+        "--server.port", str(port),
+        "--server.address", "127.0.0.1",
+        "--server.enableXsrfProtection", "false",
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(proc.stderr.read().decode(errors="replace"))
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    proc.kill()
+    raise RuntimeError("streamlit 서버가 60초 안에 뜨지 않았습니다.")
+
+
+async def run_level(base_url: str, conc: int, sessions: int, upload: bytes, counter) -> None:
+    samples = defaultdict(list)
+    errors = []
+
+    async def worker():
+        for _ in range(sessions):
+            try:
+                for name, sec in (await run_scenario(base_url, next(counter), upload)).items():
+                    samples[name].append(sec)
+            except Exception as exc:  # 실패도 집계
+                errors.append(repr(exc))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(conc)))
+    wall = time.perf_counter() - t0
+    done = conc * sessions - len(errors)
+    cells = ["/".join(f"{percentile(samples[s], q) * 1000:.0f}" for q in (0.5, 0.95, 0.99)) for s in STEPS]
+    print(f"| {conc} | {done / wall:.2f} | " + " | ".join(cells) + f" | {len(errors)} |", flush=True)
+    for err in errors[:3]:
+        print(f"  error: {err}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sessions", type=int, default=2, help="동시 세션 1개당 반복할 시나리오 수")
+    parser.add_argument("--image-mp", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.002, help="가짜 모델 토큰당 지연(초)")
+    parser.add_argument("--kakao-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    stub = KakaoStub(latency=args.kakao_latency).start()
+    env = dict(os.environ)
+    env.update({
+        "KAKAO_TOKEN_URL": stub.token_url,
+        "KAKAO_USER_URL": stub.user_url,
+        "KAKAO_STATE_SECRET": STATE_SECRET,
+        "STORY_MODEL_BACKEND": "stub",
+        "STUB_TOKEN_DELAY": str(args.token_delay),
+    })
+    port = free_port()
+    app = start_app(port, env)
+    base_url = f"http://127.0.0.1:{port}"
+    upload = make_upload(args.image_mp)
+    print(f"app: {base_url}, upload: {len(upload) / 1024:.0f} KB, kakao stub: {stub.base_url}")
+
+    counter = itertools.count(1)
+    try:
+        # 워밍업 (캐시 자원 생성, 모듈 import)
+        asyncio.run(run_scenario(base_url, 0, upload))
+        print("| concurrency | sessions/s | " + " | ".join(f"{s} p50/p95/p99 ms" for s in STEPS) + " | errors |")
+        print("|" + "---:|" * (len(STEPS) + 3))
+        for conc in args.concurrency:
+            asyncio.run(run_level(base_url, conc, args.sessions, upload, counter))
+        print(f"kakao stub: {stub.stats}")
+    finally:
+        app.terminate()
+        app.wait(timeout=10)
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
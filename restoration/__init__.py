@@ -0,0 +1 @@
+"""사진 복원 앱에서 Streamlit 없이 import 가능한 공용 모듈 모음."""
@@ -0,0 +1,143 @@
+# ============================================================
+# 스토리 생성 입장 제어 (프로세스 공용)
+# - 동시 생성 STORY_MAX_CONCURRENT 개 (기본 1), 대기열 STORY_MAX_QUEUE 개 (기본 8, FIFO)
+# - 대기열이 가득 차면 즉시 ServerBusy → UI 에서 "서버가 바쁩니다" 안내
+# - 대기 중에는 wait(ticket, timeout) 을 짧게 반복 호출하며 position() 으로 순번 표시
+# - 반드시 with gate.slot(ticket) / release() 로 자리 반납, 이탈 시 cancel(ticket)
+# ============================================================
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Optional
+
+from restoration import metrics
+
+QUEUE_DEPTH = metrics.REGISTRY.gauge("restoration_admission_queue_depth", "Requests waiting for a generation slot")
+RUNNING = metrics.REGISTRY.gauge("restoration_admission_running", "Generations currently running")
+ADMISSION_TOTAL = metrics.REGISTRY.counter("restoration_admission_total", "Admission decisions by outcome")
+QUEUE_WAIT = metrics.REGISTRY.histogram("restoration_admission_wait_seconds", "Time spent in the queue before running")
+
+
+class ServerBusy(Exception):
+    """대기열이 가득 참."""
+
+
+class Ticket:
+    _ids = itertools.count(1)
+
+    def __init__(self, owner: str = ""):
+        self.id = next(self._ids)
+        self.owner = owner
+        self.created = time.monotonic()
+        self.admitted = False
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting: Deque[Ticket] = deque()
+
+    def _publish(self) -> None:
+        QUEUE_DEPTH.set(len(self._waiting), gate=self.name)
+        RUNNING.set(self._running, gate=self.name)
+
+    def _admit(self, ticket: Ticket) -> None:
+        self._running += 1
+        ticket.admitted = True
+        QUEUE_WAIT.observe(time.monotonic() - ticket.created, gate=self.name)
+        ADMISSION_TOTAL.inc(gate=self.name, outcome="admitted")
+        self._publish()
+
+    def enter(self, owner: str = "") -> Ticket:
+        """자리가 있으면 바로 입장(admitted=True), 아니면 대기열 맨 뒤. 대기열이 차 있으면 ServerBusy."""
+        ticket = Ticket(owner)
+        with self._cond:
+            if self._running < self.max_concurrent and not self._waiting:
+                self._admit(ticket)
+                return ticket
+            if len(self._waiting) >= self.max_queue:
+                ADMISSION_TOTAL.inc(gate=self.name, outcome="rejected")
+                raise ServerBusy(self.name)
+            self._waiting.append(ticket)
+            self._publish()
+            return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """0 = 실행 중, 1 = 다음 차례, ..."""
+        with self._cond:
+            if ticket.admitted:
+                return 0
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def wait(self, ticket: Ticket, timeout: Optional[float] = None) -> bool:
+        """timeout 안에 입장하면 True. 순번 갱신용으로 짧은 timeout 반복 호출을 가정."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not ticket.admitted:
+                if self._waiting and self._waiting[0] is ticket and self._running < self.max_concurrent:
+                    self._waiting.popleft()
+                    self._admit(ticket)
+                    # 슬롯이 더 남아 있으면 다음 대기자도 깨움
+                    self._cond.notify_all()
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def cancel(self, ticket: Ticket, outcome: str = "cancelled") -> None:
+        """대기 중 이탈(타임아웃, 세션 종료). 이미 입장한 티켓이면 release()."""
+        with self._cond:
+            if ticket.admitted:
+                self._release_locked(ticket)
+                return
+            try:
+                self._waiting.remove(ticket)
+            except ValueError:
+                return
+            ADMISSION_TOTAL.inc(gate=self.name, outcome=outcome)
+            self._publish()
+            self._cond.notify_all()
+
+    def _release_locked(self, ticket: Ticket) -> None:
+        if not ticket.admitted:
+            return
+        ticket.admitted = False
+        self._running -= 1
+        self._publish()
+        self._cond.notify_all()
+
+    def release(self, ticket: Ticket) -> None:
+        with self._cond:
+            self._release_locked(ticket)
+
+    @contextmanager
+    def slot(self, ticket: Ticket):
+        """입장한 티켓으로 작업하는 구간. 예외가 나도 자리 반납."""
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"running": self._running, "waiting": len(self._waiting),
+                    "max_concurrent": self.max_concurrent, "max_queue": self.max_queue}
+
+
+STORY_GATE = AdmissionController(
+    "story",
+    max_concurrent=int(os.getenv("STORY_MAX_CONCURRENT", "1")),
+    max_queue=int(os.getenv("STORY_MAX_QUEUE", "8")),
+)
@@ -0,0 +1,291 @@
+# ============================================================
+# 배치 복원 (Streamlit 의존성 없음)
+# - 입력: 여러 이미지 파일 / ZIP → expand() 로 파일 목록만 만들고 내용은 제출 직전에 하나씩 읽음
+# - 레시피: RECIPE_ORDER 순서(denoise → colorize → upscale)로 고른 연산만 적용
+# - 프로세스 풀(BATCH_WORKERS, 기본 CPU 수, spawn)에 파일 단위로 분배
+#   동시에 떠 있는 작업은 workers * 2 개까지 → 배치 전체를 메모리에 올리지 않음
+# - 결과는 끝나는 순서대로 sink 에 바로 기록
+#   ZipSink: ZIP 파일 (PNG/WebP 는 이미 압축돼 있으므로 STORED) / DirSink: 폴더 트리 (CLI)
+# - 스토리(선택): 메인 프로세스에서 결과가 나올 때마다 콜백 호출 (그 사이 워커는 계속 처리)
+# ============================================================
+import io
+import multiprocessing
+import os
+import posixpath
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from restoration import metrics, ops
+from restoration.cancellation import NEVER, CancelToken
+from restoration.encoding import policy_for
+from restoration.ingest import MAX_BYTES, MAX_PIXELS, IngestError, ingest
+
+WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or os.cpu_count() or 1
+MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+
+RECIPE_ORDER = ("denoise", "colorize", "upscale")
+OPS: Dict[str, Callable] = {
+    "denoise": ops.denoise_image,
+    "colorize": ops.colorize_image,
+    "upscale": ops.upscale_image,
+}
+
+BATCH_FILES = metrics.REGISTRY.counter("restoration_batch_files_total", "Batch files processed by outcome")
+
+
+@dataclass(frozen=True)
+class BatchInput:
+    name: str
+    size: int
+    read: Callable[[], bytes]
+
+
+@dataclass
+class BatchResult:
+    name: str
+    data: Optional[bytes] = None
+    ext: str = ""
+    error: Optional[str] = None
+    arcname: Optional[str] = None  # 결과 ZIP 안의 이름
+    story: bool = False  # 스토리 .txt 를 실제로 남겼는지
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.timings.values())
+
+
+# ---------- 입력 ----------
+def _is_image(name: str) -> bool:
+    base = posixpath.basename(name)
+    return (not base.startswith(".") and "__MACOSX/" not in name
+            and posixpath.splitext(base)[1].lower() in IMAGE_EXTS)
+
+
+def expand(files: Iterable[Tuple[str, BinaryIO]], max_files: int = MAX_FILES) -> List[BatchInput]:
+    """(파일명, 스트림) 목록 → 처리할 이미지 목록. ZIP 은 안의 이미지만 (폴더 구조 유지)."""
+    inputs: List[BatchInput] = []
+    for name, stream in files:
+        if name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(stream)
+            except zipfile.BadZipFile:
+                raise IngestError(f"ZIP 파일을 열 수 없습니다: {name}")
+            for info in archive.infolist():
+                if not info.is_dir() and _is_image(info.filename):
+                    inputs.append(BatchInput(info.filename, info.file_size, partial(archive.read, info)))
+        else:
+            stream.seek(0, io.SEEK_END)
+            size = stream.tell()
+            stream.seek(0)
+            read = stream.getvalue if isinstance(stream, io.BytesIO) else stream.read
+            inputs.append(BatchInput(name, size, read))
+        if len(inputs) > max_files:
+            raise IngestError(f"한 번에 {max_files}장까지 처리할 수 있습니다.")
+    return inputs
+
+
+def normalize_recipe(recipe: Iterable[str]) -> Tuple[str, ...]:
+    chosen = set(recipe)
+    unknown = chosen - set(OPS)
+    if unknown:
+        raise ValueError(f"알 수 없는 연산: {sorted(unknown)}")
+    return tuple(op for op in RECIPE_ORDER if op in chosen)
+
+
+# ---------- 워커 (별도 프로세스) ----------
+def process_file(
+    name: str,
+    data: bytes,
+    recipe: Tuple[str, ...],
+    stage: str = "export",
+    max_bytes: int = MAX_BYTES,
+    max_pixels: int = MAX_PIXELS,
+) -> BatchResult:
+    timings: Dict[str, float] = {}
+
+    def timed(label: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[label] = round(time.perf_counter() - start, 4)
+
+    try:
+        upload = timed("ingest", ingest, io.BytesIO(data), name, len(data), max_bytes, max_pixels)
+        image = timed("decode", ops.image_from_bytes, upload.data)
+        for op in recipe:
+            image = timed(op, OPS[op], image)
+        out = timed("encode", ops.image_to_bytes, image, stage)
+    except IngestError as exc:
+        return BatchResult(name, error=str(exc), timings=timings)
+    except Exception as exc:  # 손상된 파일 등 한 장 실패가 배치 전체를 멈추지 않도록
+        return BatchResult(name, error=f"처리 실패: {type(exc).__name__}: {exc}", timings=timings)
+    return BatchResult(name, out, policy_for(stage).ext, timings=timings)
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def executor(workers: int = WORKERS) -> ProcessPoolExecutor:
+    """프로세스 공용 풀 (동시에 여러 배치가 돌아도 코어 수만큼만 사용). workers 는 처음 만들 때만 적용."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # fork 는 Streamlit 서버 스레드/락까지 복제하므로 spawn
+            _pool = ProcessPoolExecutor(max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_broken_pool() -> None:
+    global _pool
+    with _pool_lock:
+        broken = _pool if _pool is not None and _pool._broken else None
+        if broken is not None:
+            _pool = None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------- 결과 기록 ----------
+class _Names:
+    """입력 경로 → 결과 이름 (확장자만 바꿈). 같은 이름은 -2, -3 … 를 붙인다."""
+
+    def __init__(self, taken: Iterable[str] = ()):
+        self._names = set(taken)
+
+    def _arcname(self, name: str, ext: str) -> str:
+        parts = [p for p in posixpath.normpath(name.replace("\\", "/")).split("/") if p not in ("", ".", "..")]
+        stem = posixpath.splitext("/".join(parts) or "image")[0]
+        arcname, n = f"{stem}.{ext}", 1
+        while arcname in self._names:
+            n += 1
+            arcname = f"{stem}-{n}.{ext}"
+        self._names.add(arcname)
+        return arcname
+
+
+class ZipSink(_Names):
+    def __init__(self, path: Path):
+        super().__init__()
+        self._zip = zipfile.ZipFile(path, "w")
+
+    def add(self, result: BatchResult) -> str:
+        arcname = self._arcname(result.name, result.ext)
+        self._zip.writestr(arcname, result.data, compress_type=zipfile.ZIP_STORED)
+        return arcname
+
+    def add_text(self, name: str, text: str) -> str:
+        arcname = self._arcname(name, "txt")
+        self._zip.writestr(arcname, text, compress_type=zipfile.ZIP_DEFLATED)
+        return arcname
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class DirSink(_Names):
+    """out_dir 아래에 입력과 같은 폴더 구조로 기록. 임시 파일에 쓴 뒤 교체 → 중간에 죽어도 반쪽 파일 없음.
+    taken: 이전 실행에서 이미 쓴 결과 이름 (재개 시 이름이 겹치지 않도록)."""
+
+    def __init__(self, out_dir: Path, taken: Iterable[str] = ()):
+        super().__init__(taken)
+        self.out_dir = Path(out_dir)
+
+    def _write(self, arcname: str, data: bytes) -> str:
+        path = self.out_dir / arcname
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.part")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return arcname
+
+    def add(self, result: BatchResult) -> str:
+        return self._write(self._arcname(result.name, result.ext), result.data)
+
+    def add_text(self, name: str, text: str) -> str:
+        return self._write(self._arcname(name, "txt"), text.encode("utf-8"))
+
+    def close(self) -> None:
+        pass
+
+
+# ---------- 실행 ----------
+def run_batch(
+    inputs: Sequence[BatchInput],
+    recipe: Iterable[str],
+    sink,
+    story: Optional[Callable[[bytes], Optional[str]]] = None,
+    on_result: Optional[Callable[[BatchResult, int, int], None]] = None,
+    cancel: CancelToken = NEVER,
+    workers: int = WORKERS,
+    stage: str = "export",
+    max_bytes: int = MAX_BYTES,
+    max_pixels: int = MAX_PIXELS,
+) -> List[BatchResult]:
+    """결과는 sink(ZipSink / DirSink)에 기록되고, 반환 목록에는 data 를 비운 결과(이름/오류/시간)만 남는다.
+    on_result(result, 완료 수, 전체 수) 는 한 장 끝날 때마다 호출. sink 는 끝나면 닫는다."""
+    recipe = normalize_recipe(recipe)
+    total = len(inputs)
+    pending: Dict[Future, BatchInput] = {}
+    results: List[BatchResult] = []
+    queue = iter(inputs)
+
+    def finish(result: BatchResult) -> None:
+        if result.ok:
+            result.arcname = sink.add(result)
+            if story is not None:
+                text = story(result.data)
+                if text:
+                    sink.add_text(result.arcname, text)
+                    result.story = True
+        BATCH_FILES.inc(outcome="ok" if result.ok else "failed")
+        result.data = None  # sink 에 기록했으니 메모리에서 놓아줌
+        results.append(result)
+        if on_result is not None:
+            on_result(result, len(results), total)
+
+    def submit_next() -> None:
+        for item in queue:
+            if item.size > max_bytes:
+                finish(BatchResult(item.name, error=f"파일이 너무 큽니다({item.size / 1024 / 1024:.1f}MB)."))
+                continue
+            future = executor(workers).submit(process_file, item.name, item.read(), recipe, stage, max_bytes, max_pixels)
+            pending[future] = item
+            return
+
+    try:
+        for _ in range(max(1, workers) * 2):
+            submit_next()
+        while pending:
+            cancel.check("batch")
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as exc:  # 워커가 죽음(메모리 부족 등) → 새 풀로 계속
+                    _reset_broken_pool()
+                    result = BatchResult(item.name, error=f"처리 실패: {exc}")
+                finish(result)
+                submit_next()
+    except BaseException:  # 취소, Streamlit rerun 예외 등 → 아직 시작 안 한 작업은 버림
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        sink.close()
+    return results
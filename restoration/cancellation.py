@@ -0,0 +1,105 @@
+# ============================================================
+# 협조적 취소 (cooperative cancellation)
+# - CancelToken: 세션 + 업로드 digest 에 묶인 취소 신호
+#   cancel(reason) 로 직접 취소하거나, probe(추가 조건 함수)가 사유 문자열을 돌려주면 취소로 간주
+#   (앱은 "rerun/중지 요청 들어옴", "세션 종료", "업로드 변경" probe 를 붙인다)
+# - 생성: StoppingCriteria 가 디코드 스텝마다 확인 / 이미지 연산: 타일(가로 띠)마다 확인
+# - 같은 세션이 새 digest 로 bind() 하면 이전 토큰은 "new_upload" 로 취소
+# ============================================================
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from restoration import metrics
+
+CANCELLED_TOTAL = metrics.REGISTRY.counter("restoration_cancelled_total", "Operations stopped by a cancel token")
+
+Probe = Callable[[], Optional[str]]
+
+
+class Cancelled(Exception):
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    def __init__(self, session: str = "", digest: str = "", probes: Iterable[Probe] = ()):
+        self.session = session
+        self.digest = digest
+        self._probes = list(probes)
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        for probe in self._probes:
+            reason = probe()
+            if reason:
+                self.cancel(reason)
+                return True
+        return False
+
+    def check(self, op: str = "") -> None:
+        """취소됐으면 Cancelled. op 를 주면 지표에 남긴다."""
+        if self.cancelled:
+            CANCELLED_TOTAL.inc(op=op or "unknown", reason=self.reason)
+            raise Cancelled(self.reason)
+
+
+NEVER = CancelToken()  # 취소되지 않는 기본 토큰 (배치/벤치마크용)
+
+_lock = threading.Lock()
+_by_session: Dict[str, CancelToken] = {}
+
+
+def bind(session: str, digest: str, probes: Iterable[Probe] = ()) -> CancelToken:
+    """세션의 현재 작업 토큰 발급. 같은 세션의 이전 토큰이 다른 digest 면 취소."""
+    token = CancelToken(session, digest, probes)
+    with _lock:
+        previous = _by_session.get(session)
+        _by_session[session] = token
+    if previous is not None and previous.digest != digest:
+        previous.cancel("new_upload")
+    return token
+
+
+def cancel_session(session: str, reason: str = "session_closed") -> None:
+    with _lock:
+        token = _by_session.pop(session, None)
+    if token is not None:
+        token.cancel(reason)
+
+
+def release(token: CancelToken) -> None:
+    with _lock:
+        if _by_session.get(token.session) is token:
+            del _by_session[token.session]
+
+
+def rerun_probe(script_requests) -> Probe:
+    """Streamlit 스크립트 실행 중 들어온 rerun/stop 요청 → "rerun" / "stop".
+    Streamlit 은 다음 st 호출에서야 요청을 처리하므로 긴 연산 중에는 직접 확인해야 한다.
+    ScriptRequests 의 비공개 상태(_state)를 읽으므로, Streamlit 이 바뀌어 읽을 수 없으면 계속 진행으로 본다
+    (requirements.txt 에서 버전 고정, tests/test_cancellation.py 가 설치된 버전으로 확인)."""
+
+    def probe() -> Optional[str]:
+        try:
+            name = script_requests._state.name
+        except Exception:
+            return None
+        return None if name == "CONTINUE" else name.lower()
+
+    return probe
+
+
+# ---------- 타일 처리 ----------
+def strips(height: int, rows: int) -> Iterable[Tuple[int, int]]:
+    for top in range(0, height, rows):
+        yield top, min(height, top + rows)
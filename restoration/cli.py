@@ -0,0 +1,199 @@
+# ============================================================
+# 헤드리스 일괄 복원 CLI (Streamlit / st.secrets 없이 실행)
+#   python -m restoration.cli <입력 폴더> <출력 폴더> --ops denoise upscale
+#   python -m restoration.cli scans/ restored/ --ops denoise colorize upscale --workers 8 --story
+# - 입력 폴더 트리의 PNG/JPEG/BMP/TIFF 를 같은 구조로 출력 폴더에 저장 (앱 배치 모드와 같은 파이프라인)
+# - 진행 기록: <출력 폴더>/manifest.jsonl (파일마다 한 줄, 결과/오류/단계별 시간)
+#   시작할 때 잘린 마지막 줄(강제 종료)은 잘라내고 이어 씀
+#   다시 실행하면 같은 레시피로 이미 성공한 파일(크기/수정 시각 동일, 결과 존재)은 건너뜀
+#   실패한 파일은 --retry-failed 일 때만 다시 시도
+# - 스토리(--story): 메인 프로세스에서 모델 1회 로드 (HF_TOKEN 환경변수, STORY_MODEL_BACKEND=stub 가능)
+# - 종료 코드: 실패한 파일이 있으면 1
+# ============================================================
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from restoration import batch, encoding, ml, scratch
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def scan(root: Path, skip: Optional[Path] = None) -> List[Tuple[str, Path]]:
+    """(root 기준 상대 경로, 실제 경로). 정렬된 순서 → 재실행해도 같은 순서/같은 결과 이름."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        here = Path(dirpath)
+        if skip is not None:  # 출력 폴더가 입력 폴더 안에 있을 때
+            dirnames[:] = [d for d in dirnames if (here / d).resolve() != skip]
+        dirnames.sort()
+        for name in sorted(filenames):
+            rel = (here / name).relative_to(root).as_posix()
+            if batch._is_image(rel):
+                found.append((rel, here / name))
+    return found
+
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    """파일별 마지막 기록."""
+    entries: Dict[str, dict] = {}
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:  # 강제 종료로 잘린 마지막 줄
+                    continue
+                entries[entry["name"]] = entry
+    return entries
+
+
+def repair_manifest(path: Path) -> None:
+    """강제 종료로 잘린 마지막 줄을 잘라냄 → 이어 쓰는 기록이 잘린 조각에 붙지 않게."""
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+def _is_done(entry: Optional[dict], stat: os.stat_result, job: dict, out_dir: Path, retry_failed: bool) -> bool:
+    if not entry or entry.get("recipe") != job["recipe"] or entry.get("stage") != job["stage"]:
+        return False
+    if entry.get("size") != stat.st_size or entry.get("mtime") != int(stat.st_mtime):
+        return False
+    if entry["status"] == "ok":
+        if job["story"] and not entry.get("story"):  # 스토리를 못 남긴 결과는 다시
+            return False
+        return (out_dir / entry["output"]).exists()
+    return not retry_failed
+
+
+def story_writer(max_new_tokens: int) -> Callable[[bytes], Optional[str]]:
+    model = ml.load_gemma(os.getenv("HF_TOKEN"))
+
+    def write(data: bytes) -> Optional[str]:
+        with scratch.STORE.temp_file("cli", data, suffix=".img") as image_path:
+            text, _ = model.generate(ml.story_messages(str(image_path)), max_new_tokens=max_new_tokens)
+        return text
+
+    return write
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def print_summary(results: List[batch.BatchResult], skipped: int, wall: float, workers: int) -> None:
+    ok = [r for r in results if r.ok]
+    print(f"\n완료 {len(ok)} / 실패 {len(results) - len(ok)} / 건너뜀 {skipped} · {wall:.1f}s · workers={workers}"
+          f" · {len(results) / wall if wall else 0:.2f} files/s")
+    steps: Dict[str, List[float]] = {}
+    for r in ok:
+        for step, seconds in r.timings.items():
+            steps.setdefault(step, []).append(seconds)
+    if steps:
+        print("| step | count | p50_s | p95_s | total_s |")
+        print("|---|---|---|---|---|")
+        for step, values in steps.items():
+            print(f"| {step} | {len(values)} | {_percentile(values, 50):.3f} | {_percentile(values, 95):.3f} | {sum(values):.1f} |")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m restoration.cli", description="폴더 단위 일괄 사진 복원")
+    parser.add_argument("src", type=Path, help="입력 폴더 (하위 폴더 포함)")
+    parser.add_argument("dst", type=Path, help="출력 폴더 (입력과 같은 구조)")
+    parser.add_argument("--ops", nargs="+", choices=list(batch.RECIPE_ORDER), default=["denoise", "upscale"],
+                        help="적용 순서는 항상 denoise → colorize → upscale")
+    parser.add_argument("--workers", type=int, default=batch.WORKERS)
+    parser.add_argument("--manifest", type=Path, help=f"기본: <dst>/{MANIFEST_NAME}")
+    parser.add_argument("--retry-failed", action="store_true", help="이전 실행에서 실패한 파일도 다시 처리")
+    parser.add_argument("--stage", default="export", choices=sorted(set(encoding.STAGE_POLICIES) | set(encoding.POLICIES)),
+                        help="인코딩 단계/정책 이름 (restoration/encoding.py, 예: png_optimized)")
+    parser.add_argument("--max-mb", type=float, default=batch.MAX_BYTES / 1024 / 1024, help="파일 크기 한도 (기본 INGEST_MAX_MB)")
+    parser.add_argument("--max-mp", type=float, default=batch.MAX_PIXELS / 1_000_000, help="해상도 한도 (기본 INGEST_MAX_MP)")
+    parser.add_argument("--story", action="store_true", help="결과마다 스토리 .txt 생성")
+    parser.add_argument("--max-new-tokens", type=int, default=int(os.getenv("STORY_MAX_NEW_TOKENS", "250")))
+    args = parser.parse_args(argv)
+
+    src, dst = args.src.resolve(), args.dst.resolve()
+    if not src.is_dir():
+        parser.error(f"입력 폴더가 없습니다: {src}")
+    try:
+        encoding.policy_for(args.stage)  # 단계 이름이면 환경변수로 지정한 정책까지 확인 (워커마다 실패하지 않도록)
+    except ValueError as exc:
+        parser.error(str(exc))
+    dst.mkdir(parents=True, exist_ok=True)
+    manifest_path = args.manifest or dst / MANIFEST_NAME
+    recipe = list(batch.normalize_recipe(args.ops))
+    job = {"recipe": recipe, "stage": args.stage, "story": args.story}
+
+    repair_manifest(manifest_path)
+    previous = load_manifest(manifest_path)
+    todo, stats, skipped = [], {}, 0
+    for rel, path in scan(src, skip=dst):
+        stat = path.stat()
+        if _is_done(previous.get(rel), stat, job, dst, args.retry_failed):
+            skipped += 1
+            continue
+        stats[rel] = stat
+        todo.append(batch.BatchInput(rel, stat.st_size, path.read_bytes))
+    # 이번에 다시 만들 파일의 예전 결과 이름은 재사용, 나머지 이름은 겹치지 않게 예약
+    taken = [e["output"] for rel, e in previous.items() if e.get("status") == "ok" and rel not in stats]
+    print(f"{len(todo)}개 처리 / {skipped}개 건너뜀 → {dst}")
+    if not todo:
+        return 0
+
+    story = story_writer(args.max_new_tokens) if args.story else None
+    width = len(str(len(todo)))
+    started = time.perf_counter()
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+
+        def on_result(result: batch.BatchResult, done: int, total: int) -> None:
+            stat = stats[result.name]
+            old = previous.get(result.name) or {}
+            if result.ok and old.get("output") and old["output"] != result.arcname:
+                (dst / old["output"]).unlink(missing_ok=True)  # 형식이 바뀐 예전 결과 정리
+            manifest.write(json.dumps({
+                "name": result.name,
+                "status": "ok" if result.ok else "failed",
+                "output": result.arcname,
+                "error": result.error,
+                **job,
+                "story": result.story,  # 요청 여부가 아니라 실제로 남긴 경우만 (없으면 다음 실행에서 다시)
+                "size": stat.st_size,
+                "mtime": int(stat.st_mtime),
+                "seconds": round(result.seconds, 4),
+                "timings": result.timings,
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+            }, ensure_ascii=False) + "\n")
+            manifest.flush()  # 중간에 끊겨도 여기까지는 재개 시 건너뜀
+            mark = "ok " if result.ok else "ERR"
+            print(f"[{done:>{width}}/{total}] {mark} {result.name} {result.seconds:.2f}s"
+                  + (f" - {result.error}" if result.error else ""), flush=True)
+
+        results = batch.run_batch(
+            todo, recipe, batch.DirSink(dst, taken), story=story, on_result=on_result, workers=args.workers,
+            stage=args.stage, max_bytes=int(args.max_mb * 1024 * 1024), max_pixels=int(args.max_mp * 1_000_000),
+        )
+    print_summary(results, skipped, time.perf_counter() - started, args.workers)
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# ============================================================
+# 이미지 인코딩 정책
+# - 중간 결과(intermediate): 화면에 한 번 보여주고 곧 버려지므로 빠른 설정 사용
+# - 내보내기(export): 다운로드 시점에만 최적화된 PNG / WebP / JPEG 생성
+#   기본은 무손실(png_optimized) → 복원 결과물이 화질 손실 없이 내려감. 손실 압축(webp, jpeg)은 IMAGE_EXPORT_POLICY 로 선택
+# ============================================================
+import io
+import os
+from dataclasses import dataclass, field
+from typing import Dict
+
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class EncodePolicy:
+    name: str
+    format: str
+    mime: str
+    ext: str
+    params: Dict = field(default_factory=dict)
+
+
+POLICIES: Dict[str, EncodePolicy] = {
+    # 기존 동작(Pillow 기본 압축 레벨 6) - 비교용
+    "png_default": EncodePolicy("png_default", "PNG", "image/png", "png"),
+    "png_store": EncodePolicy("png_store", "PNG", "image/png", "png", {"compress_level": 0}),
+    "png_fast": EncodePolicy("png_fast", "PNG", "image/png", "png", {"compress_level": 1}),
+    "png_optimized": EncodePolicy("png_optimized", "PNG", "image/png", "png", {"optimize": True}),
+    "webp": EncodePolicy("webp", "WEBP", "image/webp", "webp", {"quality": 90, "method": 4}),
+    "webp_lossless": EncodePolicy("webp_lossless", "WEBP", "image/webp", "webp", {"lossless": True, "method": 4}),
+    "jpeg": EncodePolicy("jpeg", "JPEG", "image/jpeg", "jpg", {"quality": 92, "optimize": True}),
+}
+
+# 단계별 기본 정책 (환경변수로 교체 가능)
+STAGE_POLICIES: Dict[str, str] = {
+    "intermediate": os.getenv("IMAGE_INTERMEDIATE_POLICY", "png_fast"),
+    # 사용자가 받는 최종 결과물 → 기본 무손실. 더 작은 파일이 필요하면 webp_lossless, 손실 허용 시 webp / jpeg
+    "export": os.getenv("IMAGE_EXPORT_POLICY", "png_optimized"),
+}
+
+
+def policy_for(stage: str) -> EncodePolicy:
+    name = STAGE_POLICIES.get(stage, stage)
+    if name not in POLICIES:
+        raise ValueError(f"알 수 없는 인코딩 정책: {name}")
+    return POLICIES[name]
+
+
+def encode_image(image: Image.Image, policy: EncodePolicy) -> bytes:
+    if policy.format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format=policy.format, **policy.params)
+    return buf.getvalue()
+
+
+def encode_for_stage(image: Image.Image, stage: str = "intermediate") -> bytes:
+    return encode_image(image, policy_for(stage))
+
+
+def export_bytes(data: bytes) -> bytes:
+    """중간 결과 바이트를 내보내기용 정책으로 다시 인코딩한다."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        return encode_for_stage(image, "export")
@@ -0,0 +1,132 @@
+# ============================================================
+# 랜딩 페이지 Hero(Before/After) 에셋 파이프라인
+# - 원본 before.png / after.png 를 한 번만 디코딩/리사이즈해서 폭별 JPEG, WebP 변형을 만든다.
+# - 결과물은 static/hero/ 에 저장되고 Streamlit 정적 서빙(/<server.baseUrlPath>/app/static/...)으로 내려간다.
+#   URL 은 루트 기준 절대 경로 → 하위 경로 배포(baseUrlPath, 리버스 프록시)나 다른 페이지에서도 같은 파일
+#   → 브라우저가 캐시(ETag/304)하므로 rerun마다 이미지 바이트를 다시 보내지 않음
+# - 미리 빌드해 두려면:  python -m restoration.hero
+# - 빌드 결과의 원본 해시가 일치하면 디코딩 없이 그대로 재사용
+# ============================================================
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BEFORE_PATH = ROOT_DIR / "before.png"  # 복원 전(흑백) 예시
+AFTER_PATH = ROOT_DIR / "after.png"  # 복원 후(컬러) 예시
+HERO_BUILD_DIR = ROOT_DIR / "static" / "hero"
+STATIC_URL_PATH = "app/static/hero"  # baseUrlPath 기준
+
+# 높이 추정 기준 폭(기존 load_examples(max_width=750)과 동일)
+HERO_MAX_WIDTH = 750
+# srcset 변형: 모바일(480) / 데스크톱·레티나(960)
+HERO_WIDTHS = (480, 960)
+VARIANTS = {
+    "jpg": ("JPEG", {"quality": 88, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 82, "method": 6}),
+}
+
+
+def _source_digest() -> str:
+    h = hashlib.sha1()
+    for path in (BEFORE_PATH, AFTER_PATH):
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _shrink(im: Image.Image, max_width: int) -> Image.Image:
+    # 폭 제한 - 비율 유지
+    if im.width > max_width:
+        h = int(im.height * (max_width / im.width))
+        return im.resize((max_width, h), Image.LANCZOS)
+    return im
+
+
+def _estimate_height(width: int, height: int) -> int:
+    # 미리보기 높이 추정: 가로형 기준으로 300~520 사이에서 적당히 잡음
+    shown_h = height * min(1.0, HERO_MAX_WIDTH / max(width, 1))
+    return max(300, min(int(shown_h), 520))
+
+
+def build_hero_assets(out_dir: Path = HERO_BUILD_DIR) -> Dict:
+    """원본을 디코딩해서 폭별 변형을 out_dir에 쓰고 manifest를 반환."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files: Dict = {}
+    height = 0
+    for name, path in (("before", BEFORE_PATH), ("after", AFTER_PATH)):
+        with Image.open(path) as src:
+            full = src.convert("RGB")
+        if name == "after":
+            height = _estimate_height(full.width, full.height)
+        files[name] = {}
+        for width in HERO_WIDTHS:
+            im = _shrink(full, width)
+            for ext, (fmt, params) in VARIANTS.items():
+                buf = io.BytesIO()
+                im.save(buf, format=fmt, **params)
+                data = buf.getvalue()
+                fname = f"{name}-{width}.{ext}"
+                (out_dir / fname).write_bytes(data)
+                files[name].setdefault(ext, []).append(
+                    {"file": fname, "width": im.width, "v": hashlib.sha1(data).hexdigest()[:10]}
+                )
+    manifest = {"height": height, "widths": list(HERO_WIDTHS), "source": _source_digest(), "files": files}
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return manifest
+
+
+def _read_manifest(out_dir: Path) -> Optional[Dict]:
+    manifest_path = out_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("widths") != list(HERO_WIDTHS) or manifest.get("source") != _source_digest():
+        return None
+    for variants in manifest["files"].values():
+        for entries in variants.values():
+            if not all((out_dir / e["file"]).exists() for e in entries):
+                return None
+    return manifest
+
+
+def static_url_prefix(base_url_path: str = "") -> str:
+    """"/<baseUrlPath>/app/static/hero" (baseUrlPath 가 비어 있으면 "/app/static/hero")."""
+    base = base_url_path.strip("/")
+    return f"/{base}/{STATIC_URL_PATH}" if base else f"/{STATIC_URL_PATH}"
+
+
+def _srcset(prefix: str, entries) -> str:
+    # ?v=<해시> : 내용이 바뀌면 URL도 바뀌어 캐시 무효화
+    return ", ".join(f"{prefix}/{e['file']}?v={e['v']} {e['width']}w" for e in entries)
+
+
+def load_hero_assets(base_url_path: str = "") -> Dict:
+    """
+    Hero 비교 위젯용 정적 URL 묶음 (필요하면 첫 호출에서 빌드).
+    base_url_path: Streamlit server.baseUrlPath
+    반환: {"before": {"srcset", "src"}, "after": {...}, "height": px}
+    """
+    manifest = _read_manifest(HERO_BUILD_DIR) or build_hero_assets(HERO_BUILD_DIR)
+    prefix = static_url_prefix(base_url_path)
+    assets: Dict = {"height": manifest["height"]}
+    for name in ("before", "after"):
+        variants = manifest["files"][name]
+        fallback = variants["jpg"][-1]
+        assets[name] = {
+            "srcset": _srcset(prefix, variants["webp"]),
+            "src": f"{prefix}/{fallback['file']}?v={fallback['v']}",
+        }
+    return assets
+
+
+def hero_sources_exist() -> bool:
+    return BEFORE_PATH.exists() and AFTER_PATH.exists()
+
+
+if __name__ == "__main__":
+    build_hero_assets()
+    print(f"hero assets → {HERO_BUILD_DIR}")
@@ -0,0 +1,147 @@
+# ============================================================
+# 업로드 수집(ingest): 한 번 읽으면서 검사 + 해시
+# 1) 크기 확인 (읽기 전, 업로더가 알려준 size) → INGEST_MAX_MB 초과면 거절
+# 2) 헤더 스니핑 (Pillow 는 open 시 헤더만 읽음) → 형식/해상도, 허용 형식·INGEST_MAX_MP 확인
+# 3) 청크 단위 sha1 (BytesIO 는 getvalue() 가 원본 bytes 를 그대로 돌려줌 → 복사본 없음)
+# - 파일 경로/스트림도 같은 함수로 처리 (배치/CLI 용, 청크를 읽으면서 해시)
+# - 메모리 맵으로 읽을 수 있는 형식(BMP/TIFF, restoration/largeimage.py)은 별도 한도
+#   INGEST_MAPPED_MAX_MB (기본 200) / INGEST_MAPPED_MAX_MP (기본 400) → 큰 비압축 스캔 허용
+#   Streamlit 업로더는 파일 전체를 메모리에 받으므로 바이트 한도는 server.maxUploadSize(200) 를 넘지 않게
+#   mapped=True 로 부른 곳(앱 단일 업로드: scratch 로 내려 띠 단위 처리)에서만 적용, 배치/CLI 는 일반 한도
+#   이때 BMP/TIFF 헤더는 largeimage.open_header 로 읽어 Pillow 전역 한도(MAX_IMAGE_PIXELS)를 바꾸지 않음
+# - 일반 경로는 Pillow 기본 decompression bomb 한도를 그대로 따름 (INGEST_MAX_MP 는 그보다 작게 둘 것)
+# ============================================================
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple
+
+from PIL import Image
+
+from restoration import metrics
+from restoration.largeimage import MAPPABLE_FORMATS, NotMappable, open_header
+
+CHUNK = 1024 * 1024
+MAX_BYTES = int(float(os.getenv("INGEST_MAX_MB", "50")) * 1024 * 1024)
+MAX_PIXELS = int(float(os.getenv("INGEST_MAX_MP", "60")) * 1_000_000)
+MAPPED_MAX_BYTES = int(float(os.getenv("INGEST_MAPPED_MAX_MB", "200")) * 1024 * 1024)
+MAPPED_MAX_PIXELS = int(float(os.getenv("INGEST_MAPPED_MAX_MP", "400")) * 1_000_000)
+ALLOWED_FORMATS = {"PNG", "JPEG", "BMP", "TIFF"}
+
+INGEST_TOTAL = metrics.REGISTRY.counter("restoration_ingest_total", "Uploads ingested by outcome")
+
+
+class IngestError(ValueError):
+    """사용자에게 그대로 보여줄 수 있는 거절 사유."""
+
+
+@dataclass(frozen=True)
+class Upload:
+    name: str
+    data: bytes
+    digest: str
+    format: str
+    width: int
+    height: int
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+def _reject(reason: str, message: str):
+    INGEST_TOTAL.inc(outcome=reason)
+    raise IngestError(message)
+
+
+def _open(stream: BinaryIO, mapped: bool) -> Image.Image:
+    if mapped:
+        try:
+            return open_header(stream)
+        except NotMappable:
+            stream.seek(0)
+    return Image.open(stream)
+
+
+def sniff(stream: BinaryIO, mapped: bool = False) -> Tuple[str, int, int]:
+    """(형식, 가로, 세로). 스트림 위치는 처음으로 되돌려 놓는다.
+    mapped=True 면 BMP/TIFF 는 Pillow 한도 없이 헤더만 읽음 (한도는 check_header 가 검사)."""
+    stream.seek(0)
+    try:
+        with _open(stream, mapped) as im:
+            fmt, (w, h) = im.format, im.size
+    except Image.DecompressionBombError:
+        _reject("too_many_pixels", "이미지 해상도가 너무 큽니다.")
+    except Exception:
+        _reject("unsupported", "이미지 파일을 읽을 수 없습니다. PNG / JPEG / BMP / TIFF 파일을 올려주세요.")
+    finally:
+        stream.seek(0)
+    return fmt, w, h
+
+
+def check_header(fmt: str, w: int, h: int, max_pixels: int = MAX_PIXELS) -> None:
+    if fmt not in ALLOWED_FORMATS:
+        _reject("unsupported", f"지원하지 않는 형식입니다({fmt}). PNG / JPEG / BMP / TIFF 파일을 올려주세요.")
+    if w * h > max_pixels:
+        _reject("too_many_pixels", f"해상도가 너무 큽니다({w}x{h}). {max_pixels / 1_000_000:.0f}MP 이하로 올려주세요.")
+
+
+def check_size(size: Optional[int], max_bytes: int = MAX_BYTES) -> None:
+    if size is not None and size > max_bytes:
+        _reject("too_large", f"파일이 너무 큽니다({size / 1024 / 1024:.1f}MB). {max_bytes / 1024 / 1024:.0f}MB 이하로 올려주세요.")
+
+
+def ingest(
+    stream: BinaryIO,
+    name: str,
+    size: Optional[int] = None,
+    max_bytes: int = MAX_BYTES,
+    max_pixels: int = MAX_PIXELS,
+    mapped: bool = False,
+) -> Upload:
+    """mapped=True 면 메모리 맵 가능 형식에 MAPPED_MAX_* 한도 (형식은 헤더를 읽어야 알 수 있으므로 두 단계 검사)."""
+    check_size(size, max(max_bytes, MAPPED_MAX_BYTES) if mapped else max_bytes)
+    fmt, w, h = sniff(stream, mapped)
+    if mapped and fmt in MAPPABLE_FORMATS:
+        max_bytes, max_pixels = max(max_bytes, MAPPED_MAX_BYTES), max(max_pixels, MAPPED_MAX_PIXELS)
+    check_size(size, max_bytes)
+    check_header(fmt, w, h, max_pixels)
+
+    digest = hashlib.sha1()
+    if isinstance(stream, io.BytesIO):
+        # Streamlit UploadedFile 포함. getvalue() 는 공유 버퍼 그대로 (getbuffer() 는 복사를 유발하므로 사용 X)
+        data = stream.getvalue()
+        view = memoryview(data)
+        for start in range(0, len(data), CHUNK):
+            digest.update(view[start:start + CHUNK])
+    else:
+        chunks, total = [], 0
+        while True:
+            chunk = stream.read(CHUNK)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:  # size 를 모르는 스트림은 읽는 도중 거절
+                _reject("too_large", f"파일이 너무 큽니다. {max_bytes / 1024 / 1024:.0f}MB 이하로 올려주세요.")
+            digest.update(chunk)
+            chunks.append(chunk)
+        data = b"".join(chunks)
+    check_size(len(data), max_bytes)
+    INGEST_TOTAL.inc(outcome="ok")
+    return Upload(name, data, digest.hexdigest(), fmt, w, h)
+
+
+def check_unmapped(upload: Upload, max_bytes: int = MAX_BYTES, max_pixels: int = MAX_PIXELS) -> None:
+    """mapped 한도로 받았지만 메모리 맵으로 못 열었을 때(압축 TIFF 등) → 일반 한도로 다시 검사."""
+    check_size(upload.size, max_bytes)
+    check_header(upload.format, upload.width, upload.height, max_pixels)
+
+
+def ingest_path(path: str, max_bytes: int = MAX_BYTES, max_pixels: int = MAX_PIXELS) -> Upload:
+    with open(path, "rb") as f:
+        return ingest(f, os.path.basename(path), os.fstat(f.fileno()).st_size, max_bytes, max_pixels)
@@ -0,0 +1,192 @@
+# ============================================================
+# Kakao OAuth HTTP 클라이언트
+# - 프로세스 공용 requests.Session: keep-alive 커넥션 풀 (kauth / kapi TLS 핸드셰이크 재사용)
+# - urllib3 Retry: 연결 실패는 재시도, 429/5xx 응답은 GET(프로필 조회)만 재시도
+#   (토큰 교환 POST는 인가 코드가 1회용이라 응답을 받은 뒤에는 재시도하지 않음)
+# - 호출별 지연 시간 기록: latency_summary()
+# - OAuth 헬퍼: state 서명/검증, 인가 URL, 토큰 교환, 프로필 조회
+#   (team_project1.py, back/back.py, bench/loadtest.py 가 같은 구현을 사용)
+# ============================================================
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from restoration import metrics
+
+TIMEOUT = (3.05, 10)  # (connect, read)
+POOL_SIZE = 16
+
+_session_lock = threading.Lock()
+_session = None
+
+_latency_lock = threading.Lock()
+_latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=512))
+_outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=1,
+        status=2,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def http_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _record(name: str, seconds: float, outcome: str) -> None:
+    with _latency_lock:
+        _latencies[name].append(seconds)
+        _outcomes[name][outcome] += 1
+    metrics.external_call(f"kakao_{name}", seconds, outcome)
+
+
+def request(name: str, method: str, url: str, **kwargs) -> requests.Response:
+    """공용 세션으로 요청 + 지연 시간 기록. name 은 지표 라벨(token / profile 등)."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    t0 = time.perf_counter()
+    try:
+        response = http_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        _record(name, time.perf_counter() - t0, "error")
+        raise
+    _record(name, time.perf_counter() - t0, str(response.status_code))
+    return response
+
+
+def latency_summary() -> Dict[str, Dict]:
+    """{name: {"count", "p50_ms", "p95_ms", "max_ms", "outcomes"}}"""
+    with _latency_lock:
+        snapshot = {k: sorted(v) for k, v in _latencies.items()}
+        outcomes = {k: dict(v) for k, v in _outcomes.items()}
+    summary = {}
+    for name, values in snapshot.items():
+        if not values:
+            continue
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": values[len(values) // 2] * 1000,
+            "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+            "max_ms": values[-1] * 1000,
+            "outcomes": outcomes.get(name, {}),
+        }
+    return summary
+
+
+# ---------- OAuth 헬퍼 ----------
+STATE_TTL_SEC = 5 * 60
+
+
+@dataclass(frozen=True)
+class OAuthConfig:
+    rest_api_key: str
+    redirect_uri: str
+    state_secret: str
+    authorize_url: str = "https://kauth.kakao.com/oauth/authorize"
+    token_url: str = "https://kauth.kakao.com/oauth/token"
+    userme_url: str = "https://kapi.kakao.com/v2/user/me"
+    state_ttl_sec: int = STATE_TTL_SEC
+
+
+def config_from_env() -> OAuthConfig:
+    # 부하 테스트는 KAKAO_*_URL 로 스텁 서버를 가리킨다 (bench/kakao_stub.py)
+    return OAuthConfig(
+        rest_api_key=os.getenv("KAKAO_REST_API_KEY", "caf4fd09d45864146cb6e75f70c713a1"),
+        redirect_uri=os.getenv("KAKAO_REDIRECT_URI", "https://hackteam32.streamlit.app"),
+        state_secret=os.getenv("KAKAO_STATE_SECRET", "UzdfMyaTkcNsJ2eVnRoKjUIOvWbeAy5E"),
+        authorize_url=os.getenv("KAKAO_AUTH_URL", OAuthConfig.authorize_url),
+        token_url=os.getenv("KAKAO_TOKEN_URL", OAuthConfig.token_url),
+        userme_url=os.getenv("KAKAO_USER_URL", OAuthConfig.userme_url),
+    )
+
+
+def _hmac_sha256(key: str, msg: str) -> str:
+    return hmac.new(key.encode(), msg.encode(), hashlib.sha256).hexdigest()
+
+
+def make_state(secret: str) -> str:
+    """"<발급 시각>.<nonce>.<서명>" 형태의 CSRF 방지용 state."""
+    raw = f"{int(time.time())}.{secrets.token_urlsafe(8)}"
+    return f"{raw}.{_hmac_sha256(secret, raw)}"
+
+
+def verify_state(state: Optional[str], secret: str, ttl_sec: int = STATE_TTL_SEC) -> bool:
+    if not state or state.count(".") != 2:
+        return False
+    ts, nonce, sig = state.split(".")
+    if not hmac.compare_digest(sig, _hmac_sha256(secret, f"{ts}.{nonce}")):
+        return False
+    try:
+        issued = int(ts)
+    except ValueError:
+        return False
+    return time.time() - issued <= ttl_sec
+
+
+def build_auth_url(config: OAuthConfig) -> str:
+    return (
+        f"{config.authorize_url}"
+        f"?client_id={config.rest_api_key}"
+        f"&redirect_uri={config.redirect_uri}"
+        f"&response_type=code"
+        f"&state={make_state(config.state_secret)}"
+    )
+
+
+def exchange_code_for_token(config: OAuthConfig, code: str) -> dict:
+    data = {
+        "grant_type": "authorization_code",
+        "client_id": config.rest_api_key,
+        "redirect_uri": config.redirect_uri,
+        "code": code,
+        "client_secret": config.state_secret,
+    }
+    response = request("token", "POST", config.token_url, data=data)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_user_profile(config: OAuthConfig, access_token: str) -> dict:
+    response = request("profile", "GET", config.userme_url, headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    return response.json()
+
+
+def extract_profile(user_me: dict) -> Tuple[Optional[str], Optional[str]]:
+    """(닉네임, 프로필 이미지 URL). kakao_account.profile 우선, 없으면 properties."""
+    account = (user_me or {}).get("kakao_account", {}) or {}
+    profile = account.get("profile", {}) or {}
+    nickname = profile.get("nickname") or None
+    img = profile.get("profile_image_url") or profile.get("thumbnail_image_url") or None
+    if not nickname or not img:
+        props = (user_me or {}).get("properties", {}) or {}
+        nickname = nickname or props.get("nickname")
+        img = img or props.get("profile_image") or props.get("thumbnail_image")
+    return nickname, img
@@ -0,0 +1,161 @@
+# ============================================================
+# 큰 비압축 TIFF/BMP 를 메모리 맵으로 읽기
+# - 업로드를 scratch 파일로 내려 두고(spool) mmap → 필요한 가로 띠만 그때그때 디코드
+#   (원본 bytes + 디코드된 이미지 + RGB 변환본, 전체 사본 3개를 만들지 않음)
+# - Pillow 헤더에서 'raw' 타일(파일 안 오프셋/행 간격/행 방향)을 읽어 직접 frombuffer
+#   BMP 는 아래→위 순서(orientation -1), TIFF 는 여러 strip 으로 나뉘어 있을 수 있음
+# - 압축(LZW/JPEG 등)·세로 타일·팔레트 외 특수 모드·EXIF 회전이 있으면 NotMappable → 일반 디코드
+# - 헤더는 open_header 로 읽음: Pillow 전역 decompression bomb 한도(Image.MAX_IMAGE_PIXELS)는 건드리지 않고
+#   이 경로에서만 건너뜀 → 해상도 한도는 ingest 의 MAPPED_MAX_PIXELS 로 따로 검사
+# ============================================================
+import math
+import mmap
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import BmpImagePlugin, Image, TiffImagePlugin
+
+from restoration.cancellation import strips
+
+MAPPABLE_FORMATS = {"BMP", "TIFF"}
+MIN_BYTES = int(float(os.getenv("LARGE_UPLOAD_MB", "16")) * 1024 * 1024)
+PREVIEW_SIDE = int(os.getenv("LARGE_PREVIEW_SIDE", "2048"))
+STRIP_ROWS = 256
+
+# rawmode → 픽셀당 바이트 (행 간격이 0 으로 적힌 TIFF 용)
+_RAW_BYTES = {
+    "L": 1, "P": 1, "LA": 2, "I;16": 2, "I;16B": 2,
+    "RGB": 3, "BGR": 3,
+    "RGBA": 4, "RGBX": 4, "BGRA": 4, "BGRX": 4, "CMYK": 4,
+}
+
+# (y0, y1, offset, rawmode, stride, orientation)
+_Tile = Tuple[int, int, int, str, int, int]
+
+
+class NotMappable(ValueError):
+    """mmap 경로로 읽을 수 없는 파일 (일반 디코드로 처리)."""
+
+
+def should_map(fmt: str, size: int) -> bool:
+    return fmt in MAPPABLE_FORMATS and size >= MIN_BYTES
+
+
+def open_header(fp) -> Image.Image:
+    """BMP/TIFF 헤더만 읽은 이미지 (픽셀은 읽지 않음). Image.open 과 달리 decompression bomb 검사 없음.
+    fp: 경로 또는 seek 가능한 스트림. 둘 다 아니면 NotMappable."""
+    for factory in (BmpImagePlugin.BmpImageFile, TiffImagePlugin.TiffImageFile):
+        if hasattr(fp, "seek"):
+            fp.seek(0)
+        try:
+            return factory(fp)
+        except (SyntaxError, OSError):
+            continue
+    raise NotMappable("BMP/TIFF 가 아님")
+
+
+def _layout(im: Image.Image) -> List[_Tile]:
+    if im.getexif().get(0x0112, 1) != 1:
+        raise NotMappable("EXIF 회전 정보가 있음")
+    w = im.width
+    tiles = []
+    for tile in im.tile:
+        decoder, (x0, y0, x1, y1), offset, args = tile[:4]
+        if decoder != "raw" or x0 != 0 or x1 != w:
+            raise NotMappable(f"비압축 가로 strip 이 아님: {decoder}")
+        if isinstance(args, str):
+            args = (args, 0, 1)
+        rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+        if rawmode not in _RAW_BYTES:
+            raise NotMappable(f"지원하지 않는 rawmode: {rawmode}")
+        tiles.append((y0, y1, offset, rawmode, stride or w * _RAW_BYTES[rawmode], orientation or 1))
+    if not tiles:
+        raise NotMappable("타일 정보 없음")
+    return tiles
+
+
+class MappedImage:
+    """mmap 된 비압축 이미지. strip(top, bottom) 은 해당 행만 RGB 로 디코드."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open_header(self.path) as im:
+            self.format = im.format
+            self.mode = im.mode
+            self.size = im.size
+            self._tiles = _layout(im)  # getpalette() 가 load() 를 부르면 tile 정보가 비므로 먼저
+            self._palette = im.getpalette() if im.mode == "P" else None
+        end = max(offset + stride * (y1 - y0) for y0, y1, offset, _, stride, _ in self._tiles)
+        if end > self.path.stat().st_size:
+            raise NotMappable("파일이 헤더보다 짧음")
+        os.utime(self.path)  # 사용 중인 파일이 scratch TTL 로 지워지지 않도록
+        self._file = open(self.path, "rb")
+        self._map: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    def _decode(self, tile: _Tile, top: int, bottom: int) -> Image.Image:
+        y0, y1, offset, rawmode, stride, orientation = tile
+        # 아래→위로 저장된 경우 파일 안에서는 bottom 쪽 행이 먼저 나옴
+        first = (top - y0) if orientation > 0 else (y1 - bottom)
+        start = offset + first * stride
+        rows = bottom - top
+        view = memoryview(self._map)[start:start + rows * stride]
+        piece = Image.frombuffer(self.mode, (self.width, rows), view, "raw", rawmode, stride, orientation)
+        if self._palette is not None:
+            piece.putpalette(self._palette)
+        # mmap 을 참조하지 않는 RGB 사본으로 바꾼 뒤 참조를 끊어야 close() 가능
+        out = piece.convert("RGB") if piece.mode != "RGB" else piece.copy()
+        del piece
+        view.release()
+        return out
+
+    def strip(self, top: int, bottom: int) -> Image.Image:
+        if self._map is None:
+            raise ValueError("닫힌 이미지")
+        out = Image.new("RGB", (self.width, bottom - top))
+        for tile in self._tiles:
+            t, b = max(top, tile[0]), min(bottom, tile[1])
+            if t < b:
+                out.paste(self._decode(tile, t, b), (0, t - top))
+        return out
+
+    def crop(self, box: Tuple[int, int, int, int]) -> Image.Image:
+        x0, y0, x1, y1 = box
+        piece = self.strip(y0, y1)
+        return piece if (x0, x1) == (0, self.width) else piece.crop((x0, 0, x1, y1 - y0))
+
+    def to_image(self, rows: int = STRIP_ROWS) -> Image.Image:
+        """전체 RGB 이미지 (띠 단위로 채워서 사본은 결과 하나뿐)."""
+        out = Image.new("RGB", self.size)
+        for top, bottom in strips(self.height, rows):
+            out.paste(self.strip(top, bottom), (0, top))
+        return out
+
+    def preview(self, max_side: int = PREVIEW_SIDE) -> Image.Image:
+        """긴 변 max_side 이하 축소본. factor 배수 행씩 읽어 box 평균(reduce) → 띠 경계 이음새 없음."""
+        factor = max(1, math.ceil(max(self.size) / max_side))
+        rows = factor * max(1, STRIP_ROWS // factor)
+        out = Image.new("RGB", (math.ceil(self.width / factor), math.ceil(self.height / factor)))
+        for top, bottom in strips(self.height, rows):
+            out.paste(self.strip(top, bottom).reduce(factor), (0, top // factor))
+        return out
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __enter__(self) -> "MappedImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,154 @@
+# ============================================================
+# 메모리 계측 (OOM 대비)
+# - track(op, session): 단계별 RSS 전/후, 프로세스 최고 RSS(high-water mark) 증가분,
+#   tracemalloc 최대 할당(파이썬 힙: bytes / BytesIO 복사본 등. Pillow 픽셀 버퍼는 RSS 쪽에 잡힘)
+# - 결과는 /metrics 히스토그램/게이지 + INFO 레벨 JSON 한 줄 로그(logger "restoration.memory")
+#   핸들러는 앱이 붙임 (team_project1.py configure_logging, RESTORATION_LOG_LEVEL 로 조정)
+# - 세션별 보관 바이트(원본 + 히스토리 + 현재 이미지)는 합계/최댓값/세션 수 게이지로만 노출
+#   (세션 ID 를 라벨로 쓰면 시계열이 무한히 늘어남)
+# - tracemalloc(파이썬 힙 최대 할당)은 모든 할당을 느리게 하므로 MEMORY_TRACEMALLOC=1 일 때만 (기본: RSS 만 기록)
+# ============================================================
+import json
+import logging
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from restoration import metrics
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+SESSION_TTL_SEC = 60 * 60  # 이 시간 동안 갱신이 없는 세션 보관량은 집계에서 제외
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_MB = 1024 * 1024
+BYTE_BUCKETS = tuple(x * _MB for x in (1, 4, 16, 64, 128, 256, 512, 1024, 2048, 4096))
+
+STAGE_RSS_DELTA = metrics.REGISTRY.histogram(
+    "restoration_stage_rss_delta_bytes", "RSS growth across a pipeline step (after - before, >= 0)", BYTE_BUCKETS
+)
+STAGE_HWM_GROWTH = metrics.REGISTRY.histogram(
+    "restoration_stage_rss_hwm_growth_bytes", "Process peak-RSS growth caused by a pipeline step", BYTE_BUCKETS
+)
+STAGE_PEAK_ALLOC = metrics.REGISTRY.histogram(
+    "restoration_stage_peak_alloc_bytes", "tracemalloc peak Python allocation during a pipeline step", BYTE_BUCKETS
+)
+PROCESS_RSS = metrics.REGISTRY.gauge("restoration_process_rss_bytes", "Resident set size of the app process")
+PROCESS_HWM = metrics.REGISTRY.gauge("restoration_process_rss_peak_bytes", "Peak resident set size of the app process")
+SESSION_RETAINED = metrics.REGISTRY.gauge(
+    "restoration_session_retained_bytes", "Image bytes held in session state (stat=sum|max)"
+)
+SESSIONS_TRACKED = metrics.REGISTRY.gauge("restoration_sessions_tracked", "Sessions with retained image bytes")
+
+_trace_lock = threading.Lock()
+_trace_users = 0
+_retained_lock = threading.Lock()
+_retained: Dict[str, Tuple[int, float]] = {}  # session → (bytes, 갱신 시각)
+
+
+# ---------- RSS ----------
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    # Linux ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _trace_start() -> None:
+    global _trace_users
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _trace_users += 1
+        tracemalloc.reset_peak()
+
+
+def _trace_stop() -> int:
+    """이 구간의 최대 할당량. 동시에 다른 단계가 돌면 그 할당까지 합쳐진 프로세스 기준 값."""
+    global _trace_users
+    with _trace_lock:
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        _trace_users -= 1
+        if _trace_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return peak
+
+
+@contextmanager
+def track(op: str, session: Optional[str] = None):
+    """with track("upscale", session_id()): ...  → yield 된 dict 에 측정값이 채워진다."""
+    info: Dict = {"op": op}
+    rss_before = rss_bytes()
+    hwm_before = peak_rss_bytes()
+    if TRACEMALLOC:
+        _trace_start()
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        peak_alloc = _trace_stop() if TRACEMALLOC else None
+        rss_after = rss_bytes()
+        hwm_after = peak_rss_bytes()
+        info.update({
+            "session": (session or "")[:12],
+            "seconds": round(time.perf_counter() - t0, 4),
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "rss_delta": rss_after - rss_before,
+            "hwm_growth": hwm_after - hwm_before,
+            "peak_alloc": peak_alloc,
+        })
+        STAGE_RSS_DELTA.observe(max(0, rss_after - rss_before), op=op)
+        STAGE_HWM_GROWTH.observe(hwm_after - hwm_before, op=op)
+        if peak_alloc is not None:
+            STAGE_PEAK_ALLOC.observe(peak_alloc, op=op)
+        PROCESS_RSS.set(rss_after)
+        PROCESS_HWM.set(hwm_after)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "memory", **info}, ensure_ascii=False))
+
+
+# ---------- 세션 보관량 ----------
+def retained_bytes(rstate: Optional[Dict]) -> int:
+    """세션 상태의 restoration dict 가 붙잡고 있는 이미지 바이트 (같은 객체는 1번만 셈)."""
+    if not rstate:
+        return 0
+    seen = {}
+    for blob in (rstate.get("original_bytes"), rstate.get("current_bytes")):
+        if blob:
+            seen[id(blob)] = len(blob)
+    for entry in rstate.get("history") or []:
+        if entry.get("bytes"):
+            seen[id(entry["bytes"])] = len(entry["bytes"])
+    return sum(seen.values())
+
+
+def set_session_retained(session: str, nbytes: int) -> None:
+    now = time.monotonic()
+    with _retained_lock:
+        if nbytes:
+            _retained[session] = (nbytes, now)
+        else:
+            _retained.pop(session, None)
+        for sid in [s for s, (_, ts) in _retained.items() if now - ts > SESSION_TTL_SEC]:
+            del _retained[sid]
+        values = [b for b, _ in _retained.values()]
+    SESSION_RETAINED.set(sum(values), stat="sum")
+    SESSION_RETAINED.set(max(values, default=0), stat="max")
+    SESSIONS_TRACKED.set(len(values))
+    PROCESS_RSS.set(rss_bytes())
+
+
+def drop_session(session: str) -> None:
+    set_session_retained(session, 0)
@@ -0,0 +1,280 @@
+# ============================================================
+# 지표(metrics) 수집 + Prometheus 텍스트 노출
+# - 파이프라인 단계(decode / upscale / denoise / colorize / encode / model_load / generate)
+#   히스토그램 + 카운터, 라벨: op, size(이미지 크기 구간)
+# - 캐시 요청/미스, 외부 호출(Kakao) 지연
+# - start_server(): 127.0.0.1:METRICS_PORT 에서 GET /metrics (기본 9464, 빈 값이면 비활성)
+# ============================================================
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# 이미지 크기 구간(메가픽셀 상한) → 라벨
+SIZE_BUCKETS = ((1.0, "lt1mp"), (4.0, "1-4mp"), (12.0, "4-12mp"), (50.0, "12-50mp"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def render(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_fmt_labels(key)} {value}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_fmt_labels(key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._values: Dict[LabelKey, list] = {}  # key → [bucket_counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            row[idx] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                yield f"{self.name}_bucket{_fmt_labels(key, [('le', repr(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_fmt_labels(key, [('le', '+Inf')])} {row[-1]}"
+            yield f"{self.name}_sum{_fmt_labels(key)} {row[-2]}"
+            yield f"{self.name}_count{_fmt_labels(key)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("restoration_stage_seconds", "Pipeline stage latency in seconds")
+STAGE_TOTAL = REGISTRY.counter("restoration_stage_total", "Pipeline stage executions by outcome")
+STAGE_MEGAPIXELS = REGISTRY.counter("restoration_stage_megapixels_total", "Megapixels processed per stage")
+CACHE_REQUESTS = REGISTRY.counter("restoration_cache_requests_total", "Cache lookups")
+CACHE_MISSES = REGISTRY.counter("restoration_cache_misses_total", "Cache misses (value computed)")
+EXTERNAL_SECONDS = REGISTRY.histogram("restoration_external_call_seconds", "External HTTP call latency")
+
+
+# ---------- 헬퍼 ----------
+def size_bucket(pixels: Optional[int]) -> str:
+    if not pixels:
+        return "unknown"
+    mp = pixels / 1_000_000
+    for limit, label in SIZE_BUCKETS:
+        if mp < limit:
+            return label
+    return "gte50mp"
+
+
+def pixels_of(obj) -> Optional[int]:
+    from restoration.largeimage import MappedImage  # 순환 import 방지 (largeimage → cancellation → metrics)
+
+    if isinstance(obj, (Image.Image, MappedImage)):
+        return obj.width * obj.height
+    return None
+
+
+@contextmanager
+def stage(op: str, pixels: Optional[int] = None):
+    """with stage("upscale", pixels=w*h): ...  (크기를 나중에 알게 되면 yield 된 dict["pixels"] 갱신)"""
+    info = {"pixels": pixels}
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield info
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        bucket = size_bucket(info["pixels"])
+        STAGE_SECONDS.observe(elapsed, op=op, size=bucket)
+        STAGE_TOTAL.inc(op=op, size=bucket, outcome=outcome)
+        if info["pixels"]:
+            STAGE_MEGAPIXELS.inc(info["pixels"] / 1_000_000, op=op)
+
+
+def timed_stage(op: str):
+    """첫 번째 인자(또는 반환값)가 PIL 이미지면 그 크기로 size 라벨을 붙이는 데코레이터."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(op, pixels_of(args[0]) if args else None) as info:
+                result = fn(*args, **kwargs)
+                if info["pixels"] is None:
+                    info["pixels"] = pixels_of(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def cache_lookup(cache: str) -> None:
+    CACHE_REQUESTS.inc(cache=cache)
+
+
+def cache_miss(cache: str) -> None:
+    CACHE_MISSES.inc(cache=cache)
+
+
+def external_call(target: str, seconds: float, outcome: str) -> None:
+    EXTERNAL_SECONDS.observe(seconds, target=target, outcome=outcome)
+
+
+# ---------- HTTP 노출 ----------
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """프로세스당 1회만 기동. 포트 사용 중이면 경고만 남기고 None."""
+    global _server
+    if port is None:
+        raw = os.getenv("METRICS_PORT", "9464")
+        if not raw:
+            return None
+        port = int(raw)
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        try:
+            server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as exc:
+            logger.warning("metrics server를 %s:%s 에 띄우지 못했습니다: %s", host, port, exc)
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        _server = server
+        return server.server_address[1]
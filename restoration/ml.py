@@ -0,0 +1,214 @@
+# ============================================================
+# torch / transformers 지연 로딩
+# - 모듈 import 시점에는 아무것도 불러오지 않는다 (랜딩 페이지 첫 페인트에 영향 X)
+# - 스토리 생성 시 처음 필요할 때 import, 또는 ML_PRELOAD=1 이면 백그라운드 스레드에서 미리 import
+# - STORY_MODEL_BACKEND=stub : 부하 테스트/벤치마크용 가짜 모델 (torch 불필요)
+# - STORY_MODEL_SERVER=unix:///run/story.sock 또는 http://127.0.0.1:8765 : 호스트 공용 모델 서버에 위임
+#   (restoration/modelserver.py, 앱 프로세스가 여러 개여도 모델 메모리는 호스트당 한 번)
+# - 모든 백엔드 generate(messages, max_new_tokens, cancel) → (텍스트, GenerationStats)
+# ============================================================
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from restoration.cancellation import NEVER, CancelToken
+from restoration.telemetry import GenerationStats, record
+
+MODEL_ID = os.getenv("STORY_MODEL_ID", "google/gemma-3n-E2B-it")
+MODEL_BACKEND = os.getenv("STORY_MODEL_BACKEND", "gemma")
+MODEL_SERVER = os.getenv("STORY_MODEL_SERVER", "")
+
+_preload_lock = threading.Lock()
+_preload_thread = None
+
+
+def _import_ml_stack():
+    import torch
+    import transformers
+
+    return torch, transformers
+
+
+@lru_cache(maxsize=1)
+def get_device():
+    """(device, dtype) - 최초 호출 시에만 CUDA/MPS 확인."""
+    torch, _ = _import_ml_stack()
+    if torch.cuda.is_available():
+        return torch.device("cuda"), torch.bfloat16  # 최신 GPU에서 권장
+    if torch.backends.mps.is_available():
+        return torch.device("mps"), torch.float16  # 맥 MPS는 fp16 권장
+    return torch.device("cpu"), torch.float32  # CPU는 fp32 안전
+
+
+class _TokenTimer:
+    """generate(streamer=...) 훅. 첫 put() 은 프롬프트, 두 번째부터 생성 토큰."""
+
+    def __init__(self):
+        self.puts = 0
+        self.first_token = None
+
+    def put(self, value):
+        self.puts += 1
+        if self.puts == 2:
+            self.first_token = time.perf_counter()
+
+    def end(self):
+        pass
+
+
+def _stop_on_cancel(torch, cancel: CancelToken):
+    """StoppingCriteria: 디코드 스텝마다 취소 토큰 확인 → 최대 1 스텝 안에 생성 중단."""
+
+    def criteria(input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), cancel.cancelled, dtype=torch.bool, device=input_ids.device)
+
+    return criteria
+
+
+def _image_items(messages) -> List:
+    return [c["image"] for m in messages for c in m.get("content", []) if c.get("type") == "image"]
+
+
+STORY_PROMPT = "이 이미지를 보고 너는 어떤 느낌이 드는지 한국어로 설명해줘."
+
+
+def story_messages(image_path: str, prompt: str = STORY_PROMPT) -> List[dict]:
+    """스토리 생성용 chat 메시지 (이미지는 경로 그대로 → processor 가 읽어 전처리)."""
+    return [
+        {"role": "system", "content": [{"type": "text", "text": "You are a helpful assistant."}]},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": str(image_path)},
+                {"type": "text", "text": prompt},
+            ],
+        },
+    ]
+
+
+class GemmaStoryModel:
+    def __init__(self, model, processor):
+        self.model = model
+        self.processor = processor
+
+    def generate(
+        self, messages, max_new_tokens: int = 250, cancel: Optional[CancelToken] = None
+    ) -> Tuple[str, GenerationStats]:
+        torch, transformers = _import_ml_stack()
+        cancel = cancel or NEVER
+        from PIL import Image
+
+        stats = GenerationStats(MODEL_ID, str(self.model.device), str(self.model.dtype).replace("torch.", ""), max_new_tokens)
+        t0 = time.perf_counter()
+        text = self.processor.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)
+        t1 = time.perf_counter()
+        text_ids = self.processor.tokenizer(text)["input_ids"]
+        t2 = time.perf_counter()
+        images = [Image.open(i).convert("RGB") if isinstance(i, str) else i for i in _image_items(messages)]
+        inputs = self.processor(text=text, images=images or None, return_tensors="pt")
+        inputs = inputs.to(self.model.device, dtype=self.model.dtype)
+        t3 = time.perf_counter()
+        stats.template_s = t1 - t0
+        stats.tokenize_s = t2 - t1
+        # processor() 는 이미지 전처리 + 이미지 토큰 확장 + 재토크나이즈를 한 번에 함 → 텍스트 토크나이즈 몫을 뺀 값
+        stats.image_preprocess_s = max(0.0, (t3 - t2) - stats.tokenize_s)
+
+        input_len = inputs["input_ids"].shape[-1]
+        timer = _TokenTimer()
+        cancel.check("generate")
+        stopping = transformers.StoppingCriteriaList([_stop_on_cancel(torch, cancel)])
+        with torch.inference_mode():
+            out = self.model.generate(
+                **inputs, max_new_tokens=max_new_tokens, do_sample=False, streamer=timer, stopping_criteria=stopping
+            )
+        t4 = time.perf_counter()
+        cancel.check("generate")
+        generated = out[0][input_len:]
+
+        first = timer.first_token or t4
+        stats.prefill_s = first - t3
+        stats.decode_s = t4 - first
+        stats.ttft_s = first - t0
+        stats.total_s = t4 - t0
+        stats.input_tokens = int(input_len)
+        stats.image_tokens = max(0, int(input_len) - len(text_ids))
+        stats.output_tokens = int(generated.shape[-1])
+        record(stats)
+        return self.processor.decode(generated, skip_special_tokens=True), stats
+
+
+class StubStoryModel:
+    """Gemma 호출 형태만 흉내내는 가짜 모델. 토큰당 STUB_TOKEN_DELAY 초만큼 대기."""
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+
+    def generate(
+        self, messages, max_new_tokens: int = 250, cancel: Optional[CancelToken] = None
+    ) -> Tuple[str, GenerationStats]:
+        cancel = cancel or NEVER
+        words = ["오래된", "사진", "속", "장면이", "다시", "숨을", "쉬는", "듯합니다."]
+        stats = GenerationStats("stub", "cpu", "none", max_new_tokens)
+        t0 = time.perf_counter()
+        prompt = " ".join(c.get("text", "") for m in messages for c in m.get("content", []))
+        stats.input_tokens = len(prompt.split()) + 256 * len(_image_items(messages))
+        stats.image_tokens = 256 * len(_image_items(messages))
+        out = []
+        first = None
+        for i in range(max_new_tokens):
+            cancel.check("generate")
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            if first is None:
+                first = time.perf_counter()
+            out.append(words[i % len(words)])
+        end = time.perf_counter()
+        first = first or end
+        stats.prefill_s = stats.ttft_s = first - t0
+        stats.decode_s = end - first
+        stats.total_s = end - t0
+        stats.output_tokens = len(out)
+        record(stats)
+        return " ".join(out), stats
+
+
+def load_gemma(hf_token=None):
+    """STORY_MODEL_SERVER 가 있으면 서버 클라이언트 (모델은 서버가 이미 들고 있음), 없으면 이 프로세스에 로드."""
+    if MODEL_SERVER:
+        from restoration.modelserver import RemoteStoryModel
+
+        return RemoteStoryModel(MODEL_SERVER)
+    return load_local(hf_token)
+
+
+def load_local(hf_token=None):
+    if MODEL_BACKEND == "stub":
+        return StubStoryModel(float(os.getenv("STUB_TOKEN_DELAY", "0.002")))
+    _, transformers = _import_ml_stack()
+    device, dtype = get_device()
+    # CUDA 는 accelerate 가 배치(device_map), MPS/CPU 는 로드 후 직접 이동
+    on_cuda = device.type == "cuda"
+    model = transformers.Gemma3nForConditionalGeneration.from_pretrained(
+        MODEL_ID,
+        use_auth_token=hf_token,
+        torch_dtype=dtype,
+        device_map="auto" if on_cuda else None,
+    ).eval()
+    if not on_cuda:
+        model = model.to(device)
+    processor = transformers.AutoProcessor.from_pretrained(MODEL_ID, token=hf_token)
+    return GemmaStoryModel(model, processor)
+
+
+def preload_in_background() -> None:
+    """ML_PRELOAD=1 일 때 torch/transformers import를 데몬 스레드로 미리 진행."""
+    global _preload_thread
+    if os.getenv("ML_PRELOAD", "0") != "1":
+        return
+    with _preload_lock:
+        if _preload_thread is not None:
+            return
+        _preload_thread = threading.Thread(target=_import_ml_stack, name="ml-preload", daemon=True)
+        _preload_thread.start()
@@ -0,0 +1,289 @@
+# ============================================================
+# 호스트 공용 스토리 모델 서버
+# - Streamlit 프로세스를 여러 개 띄우면 프로세스마다 @st.cache_resource 로 Gemma 를 따로 올림 (수 GB × N)
+#   → 모델은 이 서버 프로세스 하나만 들고, 앱은 STORY_MODEL_SERVER 로 붙는 얇은 클라이언트 (restoration/ml.py)
+#   python -m restoration.modelserver --socket /run/restoration/story.sock
+#   python -m restoration.modelserver --port 8765            # 127.0.0.1 에만 열림
+#   STORY_MODEL_SERVER=unix:///run/restoration/story.sock streamlit run team_project1.py
+# - 요청은 chat 메시지(JSON) 그대로, 이미지는 scratch 파일 경로로 전달 (같은 호스트라 바이트 복사 없음)
+#   서버는 scratch 폴더(SCRATCH_DIR, 앱과 같은 값) 밖의 경로는 거부
+# - 동시 생성 수/대기열은 서버 프로세스의 STORY_GATE (restoration/admission.py) 가 호스트 전체 기준으로 제한
+#   대기열이 가득 차면 503 → 클라이언트에서 ServerBusy
+# - 취소: 클라이언트가 요청 id 로 /cancel → 서버 쪽 CancelToken 취소 (대기 중이면 대기열에서 빠지고,
+#   생성 중이면 다음 디코드 스텝에서 중단) → 409
+# - GET /health (모델/대기열 상태), GET /metrics (서버 프로세스 지표)
+# ============================================================
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from restoration import metrics, scratch
+from restoration.admission import STORY_GATE, ServerBusy
+from restoration.cancellation import NEVER, CancelToken, Cancelled
+from restoration.telemetry import GenerationStats, record
+
+REQUEST_TIMEOUT_SEC = float(os.getenv("STORY_SERVER_TIMEOUT_SEC", "600"))
+POLL_SEC = 0.25  # 클라이언트가 취소 여부를 확인하는 간격
+
+_STATS_FIELDS = {f.name for f in fields(GenerationStats)}
+
+
+class ModelServerError(RuntimeError):
+    """모델 서버 연결 실패 / 오류 응답."""
+
+
+# ---------- 서버 ----------
+class _Jobs:
+    """요청 id → CancelToken. /cancel 이 /generate 보다 먼저 와도 같은 토큰을 공유."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, CancelToken] = {}
+
+    def token(self, job_id: str) -> CancelToken:
+        with self._lock:
+            return self._tokens.setdefault(job_id, CancelToken(session=job_id))
+
+    def cancel(self, job_id: str, reason: str) -> None:
+        self.token(job_id).cancel(reason)
+
+    def done(self, job_id: str) -> None:
+        with self._lock:
+            self._tokens.pop(job_id, None)
+
+
+def _check_images(messages: List[dict], root: Path) -> None:
+    for m in messages:
+        for c in m.get("content", []):
+            if c.get("type") != "image":
+                continue
+            path = Path(str(c.get("image", ""))).resolve()
+            if root not in path.parents:
+                raise ValueError(f"scratch 폴더 밖의 이미지 경로: {path}")
+            if not path.is_file():
+                raise ValueError(f"이미지 파일이 없습니다: {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "restoration-story/1"
+
+    # 서버 객체(self.server)에 model / jobs / scratch_root 를 붙여 둔다
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # 클라이언트가 먼저 끊음
+            pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._reply(200, {"model": type(self.server.model).__name__, "gate": STORY_GATE.stats()})
+        elif path == "/metrics":
+            body = metrics.REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            req = self._body()
+        except (ValueError, json.JSONDecodeError) as exc:
+            self._reply(400, {"error": f"잘못된 요청: {exc}"})
+            return
+        path = self.path.split("?", 1)[0]
+        if path == "/cancel":
+            self.server.jobs.cancel(str(req.get("id", "")), str(req.get("reason") or "client_cancel"))
+            self._reply(200, {"ok": True})
+        elif path == "/generate":
+            self._generate(req)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def _generate(self, req: dict) -> None:
+        job_id = str(req.get("id") or uuid.uuid4().hex)
+        messages = req.get("messages") or []
+        max_new_tokens = int(req.get("max_new_tokens", 250))
+        try:
+            _check_images(messages, self.server.scratch_root)
+        except ValueError as exc:
+            self._reply(400, {"error": str(exc)})
+            return
+        jobs = self.server.jobs
+        token = jobs.token(job_id)
+        ticket = None
+        try:
+            ticket = STORY_GATE.enter(job_id)
+            while not STORY_GATE.wait(ticket, timeout=0.5):
+                token.check("server_queue")
+            with STORY_GATE.slot(ticket):
+                text, stats = self.server.model.generate(messages, max_new_tokens=max_new_tokens, cancel=token)
+            self._reply(200, {"text": text, "stats": stats.to_dict()})
+        except ServerBusy:
+            self._reply(503, {"error": "busy"})
+        except Cancelled as exc:
+            self._reply(409, {"cancelled": exc.reason})
+        except Exception as exc:  # 한 요청 실패가 서버를 죽이지 않도록
+            self._reply(500, {"error": f"{type(exc).__name__}: {exc}"})
+        finally:
+            if ticket is not None:
+                STORY_GATE.cancel(ticket)  # 대기 중 취소된 경우 대기열에서 제거 (반납된 티켓이면 무시)
+            jobs.done(job_id)
+
+    def log_message(self, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(model, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765):
+    if socket_path:
+        Path(socket_path).unlink(missing_ok=True)  # 지난 실행이 남긴 소켓 파일
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.model = model
+    server.jobs = _Jobs()
+    server.scratch_root = scratch.STORE.base.resolve()  # 앱 프로세스별 폴더는 모두 이 아래
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m restoration.modelserver", description="호스트 공용 스토리 모델 서버")
+    parser.add_argument("--socket", help="Unix 소켓 경로 (주면 TCP 대신 사용)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("STORY_SERVER_PORT", "8765")))
+    args = parser.parse_args(argv)
+
+    from restoration import ml
+
+    with metrics.stage("model_load"):
+        model = ml.load_local(os.getenv("HF_TOKEN"))
+    server = make_server(model, args.socket, args.host, args.port)
+    where = f"unix://{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # systemd/docker stop 에도 소켓 파일 정리
+    print(f"스토리 모델 서버 {type(model).__name__} → {where} (STORY_MODEL_SERVER={where})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+
+
+# ---------- 클라이언트 ----------
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+# 응답을 기다리는 동안 호출 스레드는 취소 토큰을 확인해야 하므로 요청은 별도 스레드에서
+_requests = ThreadPoolExecutor(max_workers=16, thread_name_prefix="story-client")
+
+
+class RemoteStoryModel:
+    """GemmaStoryModel 과 같은 generate() 인터페이스. url: unix:///경로 또는 http://127.0.0.1:포트"""
+
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT_SEC):
+        self.url = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        self._unix = parts.path if parts.scheme == "unix" else None
+        self._netloc = parts.netloc
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self._unix:
+            return _UnixConnection(self._unix, timeout)
+        return http.client.HTTPConnection(self._netloc, timeout=timeout)
+
+    def _call(self, method: str, path: str, payload: Optional[dict] = None, timeout: Optional[float] = None) -> Tuple[int, dict]:
+        conn = self._connection(timeout or self.timeout)
+        try:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read() or b"{}")
+        except (OSError, http.client.HTTPException, json.JSONDecodeError) as exc:
+            raise ModelServerError(f"모델 서버({self.url})에 연결할 수 없습니다: {exc}") from exc
+        finally:
+            conn.close()
+
+    def health(self) -> dict:
+        _, payload = self._call("GET", "/health", timeout=5)
+        return payload
+
+    def generate(
+        self, messages, max_new_tokens: int = 250, cancel: Optional[CancelToken] = None
+    ) -> Tuple[str, GenerationStats]:
+        cancel = cancel or NEVER
+        cancel.check("generate")
+        job_id = uuid.uuid4().hex
+        payload = {"id": job_id, "messages": messages, "max_new_tokens": max_new_tokens}
+        start = time.perf_counter()
+        future = _requests.submit(self._call, "POST", "/generate", payload)
+        status, body, outcome = 0, {}, "error"
+        try:
+            while True:
+                try:
+                    status, body = future.result(timeout=POLL_SEC)
+                    break
+                except FutureTimeout:
+                    if cancel.cancelled:
+                        self._call("POST", "/cancel", {"id": job_id, "reason": cancel.reason}, timeout=5)
+                        outcome = "cancelled"
+                        cancel.check("generate")
+            outcome = {200: "ok", 409: "cancelled", 503: "busy"}.get(status, "error")
+        finally:
+            metrics.external_call("model_server", time.perf_counter() - start, outcome)
+        if status == 409:
+            raise Cancelled(body.get("cancelled") or "cancelled")
+        if status == 503:
+            raise ServerBusy("model_server")
+        if status != 200:
+            raise ModelServerError(f"모델 서버 오류 {status}: {body.get('error')}")
+        stats = GenerationStats(**{k: v for k, v in body["stats"].items() if k in _STATS_FIELDS})
+        record(stats)  # 앱 프로세스 /metrics 에도 같은 생성 지표
+        return body["text"], stats
+
+
+if __name__ == "__main__":
+    main()
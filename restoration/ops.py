@@ -0,0 +1,85 @@
+# ============================================================
+# 복원 연산 (Streamlit 의존성 없음)
+# - 앱(team_project1.py), 벤치마크, 배치 작업이 같은 구현을 import 해서 사용
+# - 각 연산은 metrics 단계 지표(op, 이미지 크기 구간)를 남긴다
+# - cancel 토큰을 넘기면 가로 띠(STRIP_ROWS 행) 단위로 처리하면서 띠마다 취소 여부 확인
+#   (띠 위아래로 필터 반경만큼 여백을 붙여 처리 → 통째로 처리한 결과와 동일)
+# - MappedImage(restoration/largeimage.py) 를 넘기면 항상 띠 단위 → 필요한 행만 mmap 에서 디코드
+# ============================================================
+import io
+from typing import Callable, Optional, Union
+
+from PIL import Image, ImageFilter, ImageOps
+
+from restoration import metrics
+from restoration.cancellation import NEVER, CancelToken, strips
+from restoration.encoding import encode_for_stage
+from restoration.largeimage import MappedImage
+
+STRIP_ROWS = 256
+UPSCALE_MARGIN = 4  # LANCZOS 지지 반경 3px + 여유
+DENOISE_MARGIN = 3  # MedianFilter(3) 1px + SMOOTH_MORE(5x5) 2px
+
+Source = Union[Image.Image, MappedImage]
+
+
+# ---------- 바이트 ↔ PIL ----------
+@metrics.timed_stage("decode")
+def image_from_bytes(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGB")
+
+
+@metrics.timed_stage("encode")
+def image_to_bytes(image: Image.Image, stage: str = "intermediate") -> bytes:
+    # 중간 결과는 빠른 PNG, 다운로드용은 export 정책 (restoration/encoding.py)
+    return encode_for_stage(image, stage)
+
+
+# ---------- 복원 알고리즘(샘플 자리표시자) ----------
+@metrics.timed_stage("colorize")
+def colorize_image(image: Image.Image) -> Image.Image:
+    gray = image.convert("L")
+    return ImageOps.colorize(gray, black="#1e1e1e", white="#f8efe3", mid="#88a6c6").convert("RGB")
+
+
+def _by_strips(
+    image: Source,
+    fn: Callable[[Image.Image], Image.Image],
+    scale: int,
+    margin: int,
+    cancel: CancelToken,
+    op: str,
+) -> Image.Image:
+    w, h = image.size
+    out = Image.new("RGB" if isinstance(image, MappedImage) else image.mode, (w * scale, h * scale))
+    for top, bottom in strips(h, STRIP_ROWS):
+        cancel.check(op)
+        t, b = max(0, top - margin), min(h, bottom + margin)
+        piece = fn(image.crop((0, t, w, b)))
+        out.paste(piece.crop((0, (top - t) * scale, w * scale, (bottom - t) * scale)), (0, top * scale))
+    return out
+
+
+def _upscale(image: Image.Image) -> Image.Image:
+    w, h = image.size
+    return image.resize((w * 2, h * 2), Image.LANCZOS)
+
+
+def _denoise(image: Image.Image) -> Image.Image:
+    return image.filter(ImageFilter.MedianFilter(3)).filter(ImageFilter.SMOOTH_MORE)
+
+
+@metrics.timed_stage("upscale")
+def upscale_image(image: Source, cancel: Optional[CancelToken] = None) -> Image.Image:
+    if cancel is None and not isinstance(image, MappedImage):
+        return _upscale(image)
+    return _by_strips(image, _upscale, 2, UPSCALE_MARGIN, cancel or NEVER, "upscale")
+
+
+@metrics.timed_stage("denoise")
+def denoise_image(image: Source, cancel: Optional[CancelToken] = None) -> Image.Image:
+    if cancel is None and not isinstance(image, MappedImage):
+        return _denoise(image)
+    return _by_strips(image, _denoise, 1, DENOISE_MARGIN, cancel or NEVER, "denoise")
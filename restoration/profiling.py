@@ -0,0 +1,157 @@
+# ============================================================
+# 온디맨드 프로파일링 (관리자용)
+# - 켜는 방법: 환경변수 PROFILING=1 (전체 세션) 또는 ?profile=<PROFILE_SECRET> (해당 세션만, ?profile=off 로 끔)
+# - 세션 스크립트 실행: cProfile → <PROFILE_DIR>/<시각>-<세션>-<op>.prof      (snakeviz 로 열람)
+# - load_model / generate: torch.profiler → ...-<op>.trace.json (chrome://tracing, Perfetto)
+#   가짜 모델(stub)/모델 서버 모드이거나 torch 가 없으면 cProfile 로 대체
+#   (이 경우 torch 를 import 하지 않음 → 프로파일링 자체가 ML 스택 로딩으로 수치를 왜곡하지 않도록)
+# - PROFILE_DIR 은 최근 PROFILE_KEEP 개 파일만 유지 (오래된 것부터 삭제)
+# ============================================================
+import cProfile
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+_rotate_lock = threading.Lock()
+# cProfile 은 스레드당 하나만 활성화 가능 → 스크립트 전체를 잡는 중이면 안쪽 구간은 중첩하지 않음
+_active = threading.local()
+
+
+def env_enabled() -> bool:
+    return os.getenv("PROFILING", "0") == "1"
+
+
+def query_toggle(value: Optional[str], secret: Optional[str]) -> Optional[bool]:
+    """?profile= 값 해석. 비밀값 일치 → True, "off" → False, 그 외(없음/불일치) → None(변경 없음)."""
+    if not value:
+        return None
+    if value == "off":
+        return False
+    if secret and hmac.compare_digest(value, secret):
+        return True
+    return None
+
+
+def trace_path(session: str, op: str, suffix: str) -> Path:
+    safe_session = re.sub(r"[^A-Za-z0-9_-]", "", session or "nosession")[:12] or "nosession"
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    return PROFILE_DIR / f"{stamp}-{safe_session}-{op}{suffix}"
+
+
+def _rotate() -> None:
+    with _rotate_lock:
+        try:
+            files = sorted((p for p in PROFILE_DIR.iterdir() if p.is_file()), key=lambda p: p.stat().st_mtime)
+        except FileNotFoundError:
+            return
+        for old in files[: max(0, len(files) - PROFILE_KEEP)]:
+            old.unlink(missing_ok=True)
+
+
+# ---------- cProfile ----------
+class ScriptProfile:
+    """begin()/end() 로 나눠 쓰는 cProfile (Streamlit 스크립트 최상단/최하단에서 호출)."""
+
+    def __init__(self, session: str, op: str):
+        self.session = session
+        self.op = op
+        self.profiler = cProfile.Profile()
+
+    def start(self) -> "ScriptProfile":
+        self.profiler.enable()
+        _active.profile = self
+        return self
+
+    def stop(self) -> Optional[Path]:
+        self.profiler.disable()
+        if getattr(_active, "profile", None) is self:
+            _active.profile = None
+        path = trace_path(self.session, self.op, ".prof")
+        try:
+            self.profiler.dump_stats(path)
+        except OSError as exc:
+            logger.warning("프로파일 저장 실패 %s: %s", path, exc)
+            return None
+        _rotate()
+        return path
+
+
+def begin(session: str, op: str = "script", enabled: bool = True) -> Optional[ScriptProfile]:
+    # st.stop()/st.rerun() 으로 end() 에 도달하지 못한 이전 실행이 남아 있으면 먼저 저장
+    stale = getattr(_active, "profile", None)
+    if stale is not None:
+        stale.stop()
+    return ScriptProfile(session, op).start() if enabled else None
+
+
+def end(profile: Optional[ScriptProfile]) -> Optional[Path]:
+    if profile is None or getattr(_active, "profile", None) is not profile:
+        return None
+    return profile.stop()
+
+
+@contextmanager
+def cprofile(session: str, op: str, enabled: bool = True):
+    if not enabled or getattr(_active, "profile", None) is not None:
+        yield
+        return
+    profile = ScriptProfile(session, op).start()
+    try:
+        yield
+    finally:
+        profile.stop()
+
+
+# ---------- torch.profiler ----------
+def _uses_torch() -> bool:
+    """이미 torch 가 올라와 있거나, 이 프로세스에서 Gemma 를 직접 돌리는 설정일 때만 True."""
+    if "torch" in sys.modules:
+        return True
+    from restoration import ml  # torch 를 import 하지 않는 모듈
+
+    return ml.MODEL_BACKEND != "stub" and not ml.MODEL_SERVER
+
+
+@contextmanager
+def torch_profile(session: str, op: str, enabled: bool = True):
+    """모델 로드/생성 구간. 이 프로세스가 torch 를 쓰지 않는 구성이면 cProfile 로 대신 기록."""
+    if not enabled:
+        yield
+        return
+    if not _uses_torch():
+        with cprofile(session, op):
+            yield
+        return
+    try:
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+    except ImportError:
+        with cprofile(session, op):
+            yield
+        return
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    with profile(activities=activities, record_shapes=True, profile_memory=True) as prof:
+        yield
+    path = trace_path(session, op, ".trace.json")
+    try:
+        prof.export_chrome_trace(str(path))
+    except OSError as exc:
+        logger.warning("torch trace 저장 실패 %s: %s", path, exc)
+        return
+    _rotate()
@@ -0,0 +1,121 @@
+# ============================================================
+# 사용자별 요청 속도 제한 (token bucket, 프로세스 공용)
+# - 키: 카카오 로그인 사용자는 "kakao:<id>", 게스트는 "guest:<세션 ID>"
+# - 등급(tier)별 / 작업 종류(op: story, image)별 버킷
+#   환경변수 RATE_LIMIT_<TIER>_<OP>="<용량>/<초>" 로 조정 (예: RATE_LIMIT_GUEST_STORY="3/600")
+#   용량만큼 연속 요청 가능, 이후에는 <초>/<용량> 마다 1회씩 회복
+# - 이미지 작업 비용은 메가픽셀에 비례(image_cost) → 큰 사진 반복 처리로 CPU 독점 방지
+# - 배치 한 번의 장수 한도: BATCH_MAX_FILES_<TIER> (기본: BATCH_MAX_FILES, 500장)
+#   배치는 장당 1씩 이미지 버킷에서 차감. 용량보다 큰 배치는 버킷이 가득 찼을 때만 통과하고 버킷을 비움
+#   → 기간(<초>)당 큰 배치 1번. 등급별로 더 좁히려면 BATCH_MAX_FILES_GUEST=20 처럼 지정
+# ============================================================
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from restoration import metrics
+
+RATE_LIMITED = metrics.REGISTRY.counter("restoration_rate_limited_total", "Requests rejected by the rate limiter")
+
+# (용량, 기간 초)
+DEFAULT_LIMITS: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("guest", "story"): (3, 600),
+    ("guest", "image"): (20, 600),
+    ("kakao", "story"): (10, 600),
+    ("kakao", "image"): (60, 600),
+}
+MAX_BUCKETS = 10000
+IMAGE_COST_MP = 4.0  # 4MP 당 비용 1
+
+
+def _parse(raw: str) -> Tuple[float, float]:
+    capacity, period = raw.split("/", 1)
+    return float(capacity), float(period)
+
+
+def load_limits() -> Dict[Tuple[str, str], Tuple[float, float]]:
+    limits = dict(DEFAULT_LIMITS)
+    for (tier, op) in DEFAULT_LIMITS:
+        raw = os.getenv(f"RATE_LIMIT_{tier.upper()}_{op.upper()}")
+        if raw:
+            limits[(tier, op)] = _parse(raw)
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period if period > 0 else math.inf
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        # now 는 잠금 전에 읽으므로 방금 만든 버킷의 updated 보다 이를 수 있음 → 시간을 되돌리지 않음
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """가능하면 차감하고 0 반환, 아니면 다시 시도할 수 있을 때까지 남은 초."""
+        self._refill(now)
+        cost = min(cost, self.capacity)  # 용량보다 큰 요청도 가득 찬 버킷이면 통과
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[Tuple[str, str], Tuple[float, float]]):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def acquire(self, key: str, tier: str, op: str, cost: float = 1.0) -> float:
+        """허용이면 0.0, 거부면 retry-after 초. 정의되지 않은 (tier, op) 는 제한 없음."""
+        limit = self.limits.get((tier, op))
+        if limit is None:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((key, op))
+            if bucket is None:
+                bucket = self._buckets[(key, op)] = TokenBucket(*limit)
+            self._buckets.move_to_end((key, op))
+            wait = bucket.take(cost, now)
+            self._evict()
+        if wait:
+            RATE_LIMITED.inc(tier=tier, op=op)
+        return wait
+
+    def _evict(self) -> None:
+        # 오래 안 쓴 버킷부터 정리 (지워진 사용자는 다음 요청 때 가득 찬 버킷으로 다시 시작)
+        while len(self._buckets) > MAX_BUCKETS:
+            self._buckets.popitem(last=False)
+
+
+def batch_max_files(tier: str, default: int) -> int:
+    raw = os.getenv(f"BATCH_MAX_FILES_{tier.upper()}")
+    return int(raw) if raw else default
+
+
+def identity(kakao_profile: Optional[dict], session_id: str) -> Tuple[str, str]:
+    """(key, tier)"""
+    kakao_id = (kakao_profile or {}).get("id")
+    if kakao_id:
+        return f"kakao:{kakao_id}", "kakao"
+    return f"guest:{session_id}", "guest"
+
+
+def image_cost(pixels: Optional[int]) -> float:
+    if not pixels:
+        return 1.0
+    return max(1.0, math.ceil(pixels / 1_000_000 / IMAGE_COST_MP))
+
+
+LIMITER = RateLimiter(load_limits())
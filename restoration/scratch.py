@@ -0,0 +1,234 @@
+# ============================================================
+# 임시 파일(scratch) 저장소
+# - 위치: SCRATCH_DIR (기본 <시스템 임시폴더>/restoration-scratch)/<프로세스 폴더>/<세션 폴더>
+#   앱 워커 여러 개와 모델 서버가 SCRATCH_DIR 을 같이 써도, 각 프로세스는 자기가 만든 폴더만 정리
+#   (다른 워커의 세션은 그 프로세스의 Runtime 에서만 보이므로 남의 폴더를 지우면 안 됨)
+#   프로세스 폴더는 종료 시(atexit) 삭제
+# - 용량 한도 SCRATCH_QUOTA_MB (기본 1024, 프로세스 폴더 기준) + 디스크 여유 SCRATCH_MIN_FREE_MB (기본 512, 디스크 전체)
+#   → 워커 N 개면 최대 N × 한도까지 쓸 수 있으므로 한도는 워커 수로 나눠 잡고, 디스크 여유 검사가 호스트 전체 안전장치
+#   → 넘으면 오래된 파일부터 지우고, 그래도 안 되면 ScratchFull
+# - 백그라운드 스위퍼: SCRATCH_TTL_SEC (기본 1800) 지난 파일 삭제, 끝난 세션 폴더 통째로 삭제
+# - temp_file(): with 블록이 끝나면 바로 삭제되는 경로 (NamedTemporaryFile(delete=False) 대체)
+# ============================================================
+import atexit
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from restoration import metrics
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+SCRATCH_BYTES = metrics.REGISTRY.gauge("restoration_scratch_bytes", "Bytes stored in the scratch area")
+SCRATCH_FILES = metrics.REGISTRY.gauge("restoration_scratch_files", "Files stored in the scratch area")
+SCRATCH_REMOVED = metrics.REGISTRY.counter("restoration_scratch_removed_total", "Scratch files removed by reason")
+
+
+class ScratchFull(OSError):
+    """용량 한도/디스크 여유 부족."""
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "", name or "")[:64] or "nosession"
+
+
+class ScratchStore:
+    def __init__(self, base: Path, quota_bytes: int, min_free_bytes: int, ttl_sec: float, owner: Optional[str] = None):
+        self.base = Path(base)  # 여러 프로세스 공용 (모델 서버는 이 아래 경로만 받음)
+        self.root = self.base / (owner or f"proc-{os.getpid()}-{uuid.uuid4().hex[:8]}")  # 이 프로세스 전용
+        self.quota_bytes = quota_bytes
+        self.min_free_bytes = min_free_bytes
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._usage: Optional[int] = None  # 최초 사용 시 1회 스캔, 이후 증감만 반영
+        self._files = 0
+        self._sweeper: Optional[threading.Thread] = None
+
+    # ---------- 조회 ----------
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.rglob("*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _ensure_usage(self) -> None:
+        if self._usage is None:
+            entries = self._scan()
+            self._usage = sum(size for _, size, _ in entries)
+            self._files = len(entries)
+            self._publish()
+
+    def _publish(self) -> None:
+        SCRATCH_BYTES.set(self._usage or 0)
+        SCRATCH_FILES.set(self._files)
+
+    def usage(self) -> int:
+        with self._lock:
+            self._ensure_usage()
+            return self._usage
+
+    def session_dir(self, session: str) -> Path:
+        path = self.root / _safe(session)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # ---------- 쓰기 ----------
+    def _remove(self, path: Path, reason: str) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        self._usage = max(0, (self._usage or 0) - size)
+        self._files = max(0, self._files - 1)
+        SCRATCH_REMOVED.inc(reason=reason)
+
+    def _free_disk(self) -> int:
+        path = self.root
+        while not path.exists() and path != path.parent:  # 아직 만들기 전이면 있는 상위 폴더 기준
+            path = path.parent
+        return shutil.disk_usage(path).free
+
+    def _make_room(self, nbytes: int) -> None:
+        def short() -> bool:
+            return self._usage + nbytes > self.quota_bytes or self._free_disk() - nbytes < self.min_free_bytes
+
+        if not short():
+            return
+        if nbytes > self.quota_bytes:
+            raise ScratchFull(f"scratch 한도({self.quota_bytes} bytes)보다 큰 파일: {nbytes} bytes")
+        for _, _, path in sorted(self._scan()):
+            if not short():
+                return
+            self._remove(path, "quota")
+        if short():
+            raise ScratchFull(f"scratch 공간 부족: {nbytes} bytes 요청, 사용 중 {self._usage} bytes")
+
+    def write(self, session: str, data: bytes, suffix: str = "") -> Path:
+        with self._lock:
+            self._ensure_usage()
+            self._make_room(len(data))
+            path = self.session_dir(session) / f"{uuid.uuid4().hex}{suffix}"
+            path.write_bytes(data)
+            self._usage += len(data)
+            self._files += 1
+            self._publish()
+        return path
+
+    def new_path(self, session: str, suffix: str = "") -> Path:
+        """조금씩 써 나갈 파일(배치 결과 ZIP 등)의 경로. 다 쓴 뒤 adopt() 로 사용량에 반영."""
+        with self._lock:
+            self._ensure_usage()
+        return self.session_dir(session) / f"{uuid.uuid4().hex}{suffix}"
+
+    def adopt(self, path: Path) -> Path:
+        path = Path(path)
+        nbytes = path.stat().st_size
+        with self._lock:
+            self._usage += nbytes
+            self._files += 1
+            try:
+                if nbytes > self.quota_bytes:
+                    raise ScratchFull(f"scratch 한도({self.quota_bytes} bytes)보다 큰 파일: {nbytes} bytes")
+                self._make_room(0)  # 이미 쓴 파일이므로 나머지(오래된 파일)를 정리
+            except ScratchFull:
+                self._remove(path, "quota")
+                raise
+            finally:
+                self._publish()
+        return path
+
+    def delete(self, path: Path) -> None:
+        with self._lock:
+            self._ensure_usage()
+            self._remove(Path(path), "released")
+            self._publish()
+
+    @contextmanager
+    def temp_file(self, session: str, data: bytes, suffix: str = "") -> Iterator[Path]:
+        path = self.write(session, data, suffix)
+        try:
+            yield path
+        finally:
+            self.delete(path)
+
+    # ---------- 정리 ----------
+    def drop_session(self, session: str, reason: str = "session_end") -> None:
+        path = self.root / _safe(session)
+        with self._lock:
+            self._ensure_usage()
+            for file in list(path.glob("*")) if path.exists() else []:
+                self._remove(file, reason)
+            shutil.rmtree(path, ignore_errors=True)
+            self._publish()
+
+    def sweep(self, is_active: Optional[Callable[[str], bool]] = None) -> None:
+        """TTL 지난 파일 삭제 + (is_active 가 주어지면) 끝난 세션 폴더 삭제. 이 프로세스 폴더 안만 본다."""
+        cutoff = time.time() - self.ttl_sec
+        if not self.root.exists():
+            return
+        for session_path in [p for p in self.root.iterdir() if p.is_dir()]:
+            if is_active is not None and not is_active(session_path.name):
+                self.drop_session(session_path.name)
+                continue
+            with self._lock:
+                self._ensure_usage()
+                for file in list(session_path.glob("*")):
+                    try:
+                        expired = file.stat().st_mtime < cutoff
+                    except FileNotFoundError:
+                        continue
+                    if expired:
+                        self._remove(file, "ttl")
+                self._publish()
+                try:
+                    session_path.rmdir()  # 비어 있을 때만 성공
+                except OSError:
+                    pass
+
+    def start_sweeper(self, interval: float = 60.0, is_active: Optional[Callable[[str], bool]] = None) -> None:
+        """프로세스당 1회. is_active(session) 로 끝난 세션을 판단 (앱은 Runtime.is_active_session)."""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def loop():
+                while True:
+                    try:
+                        self.sweep(is_active)
+                    except Exception:  # 스위퍼가 죽으면 안 됨
+                        logger.exception("scratch sweep 실패")
+                    time.sleep(interval)
+
+            self._sweeper = threading.Thread(target=loop, name="scratch-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def close(self) -> None:
+        """프로세스 종료 시 이 프로세스 폴더 통째로 삭제."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+STORE = ScratchStore(
+    Path(os.getenv("SCRATCH_DIR") or Path(tempfile.gettempdir()) / "restoration-scratch"),
+    quota_bytes=int(os.getenv("SCRATCH_QUOTA_MB", "1024")) * _MB,
+    min_free_bytes=int(os.getenv("SCRATCH_MIN_FREE_MB", "512")) * _MB,
+    ttl_sec=float(os.getenv("SCRATCH_TTL_SEC", "1800")),
+)
+atexit.register(STORE.close)
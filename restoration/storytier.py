@@ -0,0 +1,86 @@
+# ============================================================
+# 단계별(tiered) 스토리
+# - 1단계 템플릿: workflow.build_story() (작업 이력 기반, 모델 없이 즉시) → 바로 화면에 표시
+# - 2단계 모델: Gemma 결과가 나오면 같은 자리에서 교체
+# - 모델 단계를 건너뛰고 템플릿만 쓰는 경우 (decide() 의 사유)
+#   model_not_loaded : 아직 모델 로드 전 (이번 요청은 템플릿, 로드는 백그라운드로 시작 → 다음 요청부터 모델)
+#   queue_full       : 스토리 대기열이 가득 참 (앱 STORY_GATE 또는 모델 서버의 호스트 대기열)
+#   slo              : 예상 완료 시간(앞선 요청 수 × 최근 생성 시간 p50) > STORY_SLO_SEC
+#   server_down      : 모델 서버(STORY_MODEL_SERVER) 응답 없음
+# - STORY_MODE: tiered(기본) / model(항상 모델만 기다림, 이전 동작) / template(모델 사용 안 함)
+# ============================================================
+import math
+import os
+import statistics
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from restoration import metrics
+from restoration.telemetry import recent_totals
+
+MODE = os.getenv("STORY_MODE", "tiered")
+SLO_SEC = float(os.getenv("STORY_SLO_SEC", "30"))
+
+STORY_TIER_TOTAL = metrics.REGISTRY.counter("restoration_story_tier_total", "Story requests by served tier and reason")
+
+_ready = threading.Event()
+_warm_lock = threading.Lock()
+_warm_thread: Optional[threading.Thread] = None
+
+
+def mark_ready() -> None:
+    _ready.set()
+
+
+def model_ready() -> bool:
+    return _ready.is_set()
+
+
+def warm(load: Callable[[], object], prepare: Optional[Callable[[threading.Thread], None]] = None) -> None:
+    """모델 로드를 데몬 스레드로 한 번만 시작 (load 가 끝나면 mark_ready 는 load 쪽에서).
+    prepare(thread): 시작 전 훅 (앱은 여기서 ScriptRunContext 를 붙임)."""
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is not None and (_warm_thread.is_alive() or _ready.is_set()):
+            return
+        _warm_thread = threading.Thread(target=load, name="story-model-warm", daemon=True)
+        if prepare is not None:
+            prepare(_warm_thread)
+        _warm_thread.start()
+
+
+def expected_seconds(gate: Dict, max_new_tokens: int) -> Optional[float]:
+    """지금 줄을 서면 결과까지 걸릴 예상 시간. 최근 생성 기록이 없으면 None (판단 보류)."""
+    totals = recent_totals(max_new_tokens)
+    if not totals:
+        return None
+    per_run = statistics.median(totals)
+    # 앞선 요청(실행 중 + 대기) 이 max_concurrent 개씩 빠진 뒤 내 차례
+    rounds = math.floor((gate["running"] + gate["waiting"]) / max(1, gate["max_concurrent"]))
+    return per_run * (rounds + 1)
+
+
+def _saturated(gate: Dict) -> bool:
+    return gate["waiting"] >= gate["max_queue"]
+
+
+def decide(gates, max_new_tokens: int, slo_sec: float = SLO_SEC) -> Tuple[bool, str]:
+    """(모델 단계 실행 여부, 사유). gates: 확인할 대기열 상태들 (STORY_GATE.stats() 형식)."""
+    if MODE == "template":
+        return False, "mode"
+    if not model_ready():
+        return False, "model_not_loaded"
+    worst = None
+    for gate in gates:
+        if _saturated(gate):
+            return False, "queue_full"
+        eta = expected_seconds(gate, max_new_tokens)
+        if eta is not None:
+            worst = eta if worst is None else max(worst, eta)
+    if worst is not None and worst > slo_sec:
+        return False, "slo"
+    return True, "ok"
+
+
+def count(tier: str, reason: str) -> None:
+    STORY_TIER_TOTAL.inc(tier=tier, reason=reason)
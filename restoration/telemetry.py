@@ -0,0 +1,151 @@
+# ============================================================
+# 스토리 생성 텔레메트리
+# - 생성 1회당 GenerationStats: 템플릿/토크나이즈/이미지 전처리/prefill(TTFT)/decode 시간,
+#   입력·이미지·출력 토큰 수, decode tokens/s, device/dtype, max_new_tokens 도달 여부
+# - 최근 기록을 (모델, device, dtype, max_new_tokens) 프로필별로 집계: summary()
+# - /metrics 히스토그램 + GENERATION_LOG=<경로> 이면 JSONL 로도 누적
+#   python -m restoration.telemetry generation.jsonl   # 오프라인 프로필 비교
+# ============================================================
+import json
+import os
+import sys
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Iterable, List, Optional
+
+from restoration import metrics
+
+GENERATION_LOG = os.getenv("GENERATION_LOG", "")
+HISTORY_SIZE = 500
+
+TTFT_SECONDS = metrics.REGISTRY.histogram("restoration_generate_ttft_seconds", "Time to first generated token")
+DECODE_TPS = metrics.REGISTRY.histogram(
+    "restoration_generate_decode_tokens_per_second",
+    "Decode throughput after the first token",
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320),
+)
+OUTPUT_TOKENS = metrics.REGISTRY.histogram(
+    "restoration_generate_output_tokens", "Generated tokens per call", buckets=(16, 32, 64, 128, 192, 256, 384, 512, 1024)
+)
+INPUT_TOKENS = metrics.REGISTRY.histogram(
+    "restoration_generate_input_tokens", "Prompt tokens per call (text + image)", buckets=(64, 128, 256, 512, 1024, 2048, 4096)
+)
+
+
+@dataclass
+class GenerationStats:
+    model: str
+    device: str
+    dtype: str
+    max_new_tokens: int
+    template_s: float = 0.0
+    tokenize_s: float = 0.0
+    image_preprocess_s: float = 0.0
+    prefill_s: float = 0.0  # generate 시작 → 첫 토큰 (= TTFT 중 모델 구간)
+    decode_s: float = 0.0
+    ttft_s: float = 0.0  # 호출 시작(전처리 포함) → 첫 토큰
+    total_s: float = 0.0
+    input_tokens: int = 0
+    image_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def decode_tps(self) -> float:
+        # 첫 토큰은 prefill 에 포함되므로 나머지 토큰 기준
+        return (self.output_tokens - 1) / self.decode_s if self.decode_s > 0 and self.output_tokens > 1 else 0.0
+
+    @property
+    def hit_limit(self) -> bool:
+        return self.output_tokens >= self.max_new_tokens
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        d["decode_tps"] = round(self.decode_tps, 2)
+        d["hit_limit"] = self.hit_limit
+        return d
+
+
+_lock = threading.Lock()
+_records: Deque[Dict] = deque(maxlen=HISTORY_SIZE)
+
+
+def record(stats: GenerationStats) -> None:
+    row = stats.to_dict()
+    with _lock:
+        _records.append(row)
+    labels = {"model": stats.model, "device": stats.device}
+    TTFT_SECONDS.observe(stats.ttft_s, **labels)
+    if stats.decode_tps:
+        DECODE_TPS.observe(stats.decode_tps, **labels)
+    OUTPUT_TOKENS.observe(stats.output_tokens, **labels)
+    INPUT_TOKENS.observe(stats.input_tokens, **labels)
+    if GENERATION_LOG:
+        try:
+            with open(GENERATION_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+
+def _pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def summarize(rows: Iterable[Dict]) -> List[Dict]:
+    """프로필(모델, device, dtype, max_new_tokens)별 집계."""
+    groups: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        key = (row["model"], row["device"], row["dtype"], row["max_new_tokens"])
+        groups.setdefault(key, []).append(row)
+    out = []
+    for (model, device, dtype, limit), items in groups.items():
+        out_tokens = [r["output_tokens"] for r in items]
+        out.append({
+            "model": model,
+            "device": device,
+            "dtype": dtype,
+            "max_new_tokens": limit,
+            "count": len(items),
+            "ttft_p50_s": _pct([r["ttft_s"] for r in items], 0.5),
+            "ttft_p95_s": _pct([r["ttft_s"] for r in items], 0.95),
+            "decode_tps_p50": _pct([r["decode_tps"] for r in items], 0.5),
+            "total_p95_s": _pct([r["total_s"] for r in items], 0.95),
+            "input_tokens_p50": _pct([r["input_tokens"] for r in items], 0.5),
+            "output_tokens_p50": _pct(out_tokens, 0.5),
+            "output_tokens_p95": _pct(out_tokens, 0.95),
+            # 상한에 자주 걸리면 문장이 잘리는 중 → max_new_tokens 상향 검토, 거의 안 걸리면 p95 근처로 하향
+            "hit_limit_rate": sum(1 for r in items if r["hit_limit"]) / len(items),
+        })
+    return out
+
+
+def recent_totals(max_new_tokens: Optional[int] = None, last: int = 50) -> List[float]:
+    """최근 생성의 total_s (max_new_tokens 를 주면 같은 상한만). 지연 예측용."""
+    with _lock:
+        rows = [r for r in _records if max_new_tokens is None or r["max_new_tokens"] == max_new_tokens]
+    return [r["total_s"] for r in rows[-last:]]
+
+
+def summary() -> List[Dict]:
+    with _lock:
+        rows = list(_records)
+    return summarize(rows)
+
+
+def _main(paths: List[str]) -> None:
+    rows = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    cols = ["model", "device", "dtype", "max_new_tokens", "count", "ttft_p50_s", "ttft_p95_s", "decode_tps_p50",
+            "total_p95_s", "input_tokens_p50", "output_tokens_p50", "output_tokens_p95", "hit_limit_rate"]
+    print("| " + " | ".join(cols) + " |")
+    print("|" + "---|" * len(cols))
+    for row in summarize(rows):
+        print("| " + " | ".join(f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in cols) + " |")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:] or ([GENERATION_LOG] if GENERATION_LOG else []))
@@ -0,0 +1,92 @@
+# ============================================================
+# 복원 워크플로우 상태 (Streamlit 의존성 없음)
+# - 세션 상태는 평범한 dict: 앱은 st.session_state.restoration 에 담아서 이 함수들에 넘긴다
+#   (team_project1.py, back/back.py 공용)
+# - 업로드 초기화 / 히스토리 추가 / 작업 반복 제한 / 상태 문자열 / 템플릿 스토리
+# ============================================================
+import textwrap
+from datetime import datetime
+from typing import Dict, Optional
+
+MAX_REPEAT = 3  # 고급 옵션(반복 허용) 시 작업별 최대 횟수
+
+
+def _counts() -> Dict[str, int]:
+    return {"color": 0, "upscale": 0, "denoise": 0, "story": 0}
+
+
+def new_state(**extra) -> Dict:
+    """빈 상태. extra 는 앱별 추가 필드 (file_name, photo_type 등)."""
+    state = {
+        "upload_digest": None,
+        "original_bytes": None,
+        "description": "",
+        "current_bytes": None,
+        "counts": _counts(),
+        "history": [],
+        "story": None,
+    }
+    state.update(extra)
+    return state
+
+
+def reset(state: Dict, upload_digest: str, original_bytes: bytes, description: str = "", **extra) -> None:
+    """새 업로드로 상태 초기화 (작업 횟수/히스토리/스토리 비움)."""
+    state.update({
+        "upload_digest": upload_digest,
+        "original_bytes": original_bytes,
+        "description": description,
+        "current_bytes": original_bytes,
+        "counts": _counts(),
+        "history": [],
+        "story": None,
+    })
+    state.update(extra)
+
+
+def add_history_entry(state: Dict, label: str, image_bytes: bytes, note: Optional[str] = None) -> None:
+    state["history"].append({
+        "label": label,
+        "bytes": image_bytes,
+        "status": dict(state["counts"]),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "file_name": state.get("file_name"),
+        "note": note,
+    })
+    state["current_bytes"] = image_bytes
+
+
+def can_run_operation(state: Dict, op: str, allow_repeat: bool) -> bool:
+    count = state["counts"].get(op, 0)
+    return (count < MAX_REPEAT) if allow_repeat else (count == 0)
+
+
+def format_status(counts: Dict[str, int]) -> str:
+    return (
+        f"[컬러화 {'✔' if counts.get('color') else '✖'} / "
+        f"해상도 {counts.get('upscale', 0)}회 / 노이즈 {counts.get('denoise', 0)}회]"
+    )
+
+
+def build_story(description: str, counts: Dict[str, int], photo_type: str = "") -> str:
+    """작업 이력으로 만드는 템플릿 스토리 (모델 없이 즉시)."""
+    base = description.strip() or "이 사진"
+    lines = [f"{base}은(는) 조심스럽게 복원 과정을 거치고 있습니다."]
+    if photo_type == "흑백":
+        if counts.get("color"):
+            lines.append("흑백으로 남아 있던 순간에 색을 덧입히자 잊혔던 온기와 공기가 되살아났습니다.")
+        else:
+            lines.append("아직 색을 입히지 못한 채 시간 속에서 기다리고 있습니다.")
+    if counts.get("upscale"):
+        lines.append(
+            f"세부 묘사를 살리기 위해 해상도 보정을 {counts['upscale']}회 반복하며 흐릿했던 윤곽을 또렷하게 다듬었습니다."
+        )
+    if counts.get("denoise"):
+        lines.append(
+            f"잡음을 정리하는 과정도 {counts['denoise']}회 진행되어 사진 속 인물의 표정과 배경이 한층 차분해졌습니다."
+        )
+    if not counts.get("upscale") and not counts.get("denoise") and counts.get("color"):
+        lines.append("색만 더했을 뿐인데도 장면의 감정이 살아 움직이는 듯합니다.")
+    lines.append("복원된 이미지를 바라보는 지금, 사진 속 이야기가 현재의 우리에게 말을 건네는 듯합니다.")
+    lines.append("이 장면이 전하고 싶은 메시지가 있다면, 그것은 기억을 계속 이어가자는 마음일지도 모릅니다.")
+    return "\n\n".join(textwrap.fill(line, width=46) for line in lines)
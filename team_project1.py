@@ -13,38 +13,79 @@ from typing import Tuple
 # 2. 카톡 로그아웃 1번 내용과 동일.
 
 import streamlit.components.v1 as components
-import base64, tempfile, io, os, time, hmac, hashlib, secrets
-from pathlib import Path
+import base64, io, logging, os, time
 import requests
 import streamlit as st
 from PIL import Image
-from transformers import pipeline, Gemma3nForConditionalGeneration
-import torch
+from restoration import kakao as kakao_http
+from restoration import memory, metrics, profiling
+from restoration import batch, cancellation, largeimage, ratelimit, scratch, storytier, workflow
+from restoration.admission import STORY_GATE, ServerBusy
+from restoration.cancellation import CancelToken, Cancelled
+from restoration.ingest import IngestError, check_unmapped, ingest
+from restoration.hero import hero_sources_exist, load_hero_assets
+from restoration.ml import MODEL_SERVER, load_gemma, preload_in_background, story_messages
+from restoration.modelserver import ModelServerError
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import warnings
 
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
-if torch.cuda.is_available():
-    DEVICE = torch.device("cuda")
-    TENSOR_DTYPE = torch.bfloat16     # 최신 GPU에서 권장
-elif torch.backends.mps.is_available():
-    DEVICE = torch.device("mps")
-    TENSOR_DTYPE = torch.float16      # 맥 MPS는 fp16 권장
-else:
-    DEVICE = torch.device("cpu")
-    TENSOR_DTYPE = torch.float32      # CPU는 fp32 안전
-
-HF_TOKEN = st.secrets["HF_TOKEN"]
-
-@st.cache_resource
+# torch / transformers 는 스토리 생성 시점에 지연 import (restoration/ml.py)
+# → 랜딩 페이지는 ML 스택 없이 바로 렌더링
+# STORY_MODEL_SERVER 가 있으면 모델 대신 호스트 공용 모델 서버 클라이언트 (restoration/modelserver.py)
+@st.cache_resource(show_spinner=False)
 def load_model():
-    return Gemma3nForConditionalGeneration.from_pretrained(
-    "google/gemma-3n-E2B-it",
-    use_auth_token=HF_TOKEN,
-    torch_dtype=torch.bfloat16,
-    device_map="auto",
-)
+    with metrics.stage("model_load"), profiling.torch_profile(session_id(), "model_load", enabled=profiling_on()):
+        model = load_gemma(st.secrets.get("HF_TOKEN"))
+    storytier.mark_ready()
+    return model
+
+
+# ---------- 프로파일링 (restoration/profiling.py) ----------
+def session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+def profiling_on() -> bool:
+    return profiling.env_enabled() or bool(st.session_state.get("profiling"))
+
+
+# ---------- 취소 토큰 (restoration/cancellation.py) ----------
+def cancel_token(rstate: dict, scope: str = "") -> CancelToken:
+    """현재 세션 + 업로드에 묶인 토큰. rerun/중지 요청, 세션 종료, 업로드 변경 시 취소로 본다.
+    scope 가 다르면(예: "batch") 같은 세션의 단일 사진 작업과 별개 토큰."""
+    sid = session_id()
+    digest = rstate.get("upload_digest") or ""
+    probes = [lambda: "new_upload" if (rstate.get("upload_digest") or "") != digest else None]
+    requests_ = getattr(get_script_run_ctx(), "script_requests", None)
+    if requests_ is not None:
+        # 스크립트 실행 중 들어온 rerun/stop 요청 (Streamlit 은 다음 st 호출에서야 처리하므로 직접 확인)
+        probes.append(cancellation.rerun_probe(requests_))
+    if Runtime.exists():
+        runtime = Runtime.instance()
+        probes.append(lambda: None if runtime.is_active_session(sid) else "session_closed")
+    return cancellation.bind(f"{sid}:{scope}" if scope else sid, digest, probes)
+
+
+# ---------- 사용자별 속도 제한 (restoration/ratelimit.py) ----------
+def rate_limited(op: str, cost: float = 1.0) -> bool:
+    """카카오 id(로그인) 또는 게스트 세션 기준 token bucket. 초과면 안내 후 True."""
+    key, tier = ratelimit.identity(st.session_state.get("kakao_profile"), session_id())
+    wait = ratelimit.LIMITER.acquire(key, tier, op, cost)
+    if wait:
+        hint = " 카카오 로그인 시 한도가 늘어납니다." if tier == "guest" else ""
+        st.warning(f"요청이 너무 잦습니다. 약 {int(wait) + 1}초 후 다시 시도해주세요.{hint}")
+    return bool(wait)
+
+
+def pixel_count(data: bytes) -> int:
+    # 헤더만 읽음 (디코딩 X)
+    w, h = Image.open(io.BytesIO(data)).size
+    return w * h
 
 # ------------------------------
 # [설정] 페이지 레이아웃
@@ -52,101 +93,38 @@ def load_model():
 #  - 사이드바는 기본 접힘 상태
 # ------------------------------
 st.set_page_config(layout="wide", initial_sidebar_state="collapsed")
+# Prometheus 지표: http://127.0.0.1:9464/metrics (METRICS_PORT, 프로세스당 1회 기동)
+metrics.start_server()
+
+
+# restoration.* 로그(메모리 단계 JSON 한 줄 등) → stderr. 앱/서버가 이미 logging 을 설정했으면 그대로 둠
+def configure_logging() -> None:
+    app_logger = logging.getLogger("restoration")
+    if not app_logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        app_logger.addHandler(handler)
+    if app_logger.level == logging.NOTSET:
+        app_logger.setLevel(os.getenv("RESTORATION_LOG_LEVEL", "INFO").upper())
+
+
+configure_logging()
+
+# 관리자 프로파일링: PROFILING=1 또는 ?profile=<PROFILE_SECRET> (이 세션만, ?profile=off 로 해제)
+_profile_toggle = profiling.query_toggle(st.query_params.get("profile"), os.getenv("PROFILE_SECRET"))
+if "profile" in st.query_params:
+    del st.query_params["profile"]  # 비밀값이 주소창/공유 링크에 남지 않게
+if _profile_toggle is not None:
+    st.session_state["profiling"] = _profile_toggle
+_script_profile = profiling.begin(session_id(), enabled=profiling_on())
+
+# 임시 파일 스위퍼: TTL 지난 파일 + 끝난 세션 폴더 정리 (프로세스당 1회 기동)
+if Runtime.exists():
+    scratch.STORE.start_sweeper(is_active=Runtime.instance().is_active_session)
 # ================================
-# Kakao OAuth 설정
+# Kakao OAuth 설정 (state 서명/토큰 교환/프로필 조회: restoration/kakao.py, back/back.py 와 공용)
 # ================================
-REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "caf4fd09d45864146cb6e75f70c713a1")
-REDIRECT_URI = os.getenv("KAKAO_REDIRECT_URI", "https://hackteam32.streamlit.app")
-STATE_SECRET = os.getenv("KAKAO_STATE_SECRET", "UzdfMyaTkcNsJ2eVnRoKjUIOvWbeAy5E")
-
-KAKAO_AUTH_URL = "https://kauth.kakao.com/oauth/authorize"
-KAKAO_TOKEN_URL = "https://kauth.kakao.com/oauth/token"
-KAKAO_USER_URL = "https://kapi.kakao.com/v2/user/me"
-
-#REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "caf4fd09d45864146cb6e75f70c713a1")
-#REDIRECT_URI = os.getenv("KAKAO_REDIRECT_URI", "https://hackteam32.streamlit.app")
-#STATE_SECRET = os.getenv("KAKAO_STATE_SECRET", "UzdfMyaTkcNsJ2eVnRoKjUIOvWbeAy5E")
-# or os.getenv("OAUTH_STATE_SECRET")
-# or (REST_API_KEY or "dev-secret")
-
-AUTHORIZE_URL = "https://kauth.kakao.com/oauth/authorize"
-TOKEN_URL = "https://kauth.kakao.com/oauth/token"
-USERME_URL = "https://kapi.kakao.com/v2/user/me"
-STATE_TTL_SEC = 5 * 60
-
-
-def _hmac_sha256(key: str, msg: str) -> str:
-    return hmac.new(key.encode(), msg.encode(), hashlib.sha256).hexdigest()
-
-
-def make_state() -> str:
-    ts = str(int(time.time()))
-    nonce = secrets.token_urlsafe(8)
-    raw = f"{ts}.{nonce}"
-    sig = _hmac_sha256(STATE_SECRET, raw)
-    return f"{raw}.{sig}"
-
-
-def verify_state(state: str) -> bool:
-    if not state or state.count(".") != 2:
-        return False
-    ts, nonce, sig = state.split(".")
-    expected = _hmac_sha256(STATE_SECRET, f"{ts}.{nonce}")
-    if not hmac.compare_digest(sig, expected):
-        return False
-    try:
-        ts_i = int(ts)
-    except ValueError:
-        return False
-    if time.time() - ts_i > STATE_TTL_SEC:
-        return False
-    return True
-
-
-def build_auth_url() -> str:
-    state = make_state()
-    return (
-        f"{AUTHORIZE_URL}"
-        f"?client_id={REST_API_KEY}"
-        f"&redirect_uri={REDIRECT_URI}"
-        f"&response_type=code"
-        f"&state={state}"
-    )
-
-
-def exchange_code_for_token(code: str) -> dict:
-    data = {
-        "grant_type": "authorization_code",
-        "client_id": REST_API_KEY,
-        "redirect_uri": REDIRECT_URI,
-        "code": code,
-        "client_secret": STATE_SECRET
-    }
-    response = requests.post(TOKEN_URL, data=data, timeout=10)
-    response.raise_for_status()
-    return response.json()
-
-
-def get_user_profile(access_token: str) -> dict:
-    response = requests.get(
-        USERME_URL,
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=10,
-    )
-    response.raise_for_status()
-    return response.json()
-
-
-def extract_profile(user_me: dict):
-    account = (user_me or {}).get("kakao_account", {}) or {}
-    profile = account.get("profile", {}) or {}
-    nickname = profile.get("nickname") or None
-    img = profile.get("profile_image_url") or profile.get("thumbnail_image_url") or None
-    if not nickname or not img:
-        props = (user_me or {}).get("properties", {}) or {}
-        nickname = nickname or props.get("nickname")
-        img = img or props.get("profile_image") or props.get("thumbnail_image")
-    return nickname, img
+KAKAO = kakao_http.config_from_env()
 
 
 # ------------------------------[ 2) 콜백/로그아웃 처리 ]------------------------
@@ -175,13 +153,13 @@ state = _first_param("state")
 if error:
     st.error(f"카카오 인증 에러: {error}\n{error_description or ''}")
 elif code:
-    if not verify_state(state):
+    if not kakao_http.verify_state(state, KAKAO.state_secret, KAKAO.state_ttl_sec):
         st.error("state 검증 실패(CSRF/만료). 다시 시도해주세요.")
     else:
         try:
-            token_json = exchange_code_for_token(code)
+            token_json = kakao_http.exchange_code_for_token(KAKAO, code)
             st.session_state.kakao_token = token_json
-            st.session_state.kakao_profile = get_user_profile(token_json["access_token"])
+            st.session_state.kakao_profile = kakao_http.get_user_profile(KAKAO, token_json["access_token"])
 
             # === 팝업 창이면 토큰을 부모창으로 전달 ===
             if hasattr(st, "query_params"):
@@ -189,56 +167,23 @@ elif code:
             else:
                 st.experimental_set_query_params()
             st.rerun()
-        except requests.HTTPError as exc:
+        except requests.RequestException as exc:
             st.exception(exc)
 
 # ------------------------------
-# [경로] 예시 이미지 파일 경로 (수정 지점)
-#  - 너가 가진 Before/After 샘플로 교체해서 쓰면 됨
-# ------------------------------
-BEFORE_PATH = Path("before.png")  # 복원 전(흑백) 예시
-AFTER_PATH = Path("after.png")  # 복원 후(컬러) 예시
-
-
-# ------------------------------
-# [유틸] PIL 이미지 → data URI(base64)
-#  - HTML <img src="data:..."> 로 바로 박아 넣기 위해 사용
-# ------------------------------
-def pil_to_data_uri(img: Image.Image, fmt: str = "JPEG", quality: int = 90) -> str:
-    buf = io.BytesIO()
-    img.save(buf, format=fmt, quality=quality)
-    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-    mime = "image/png" if fmt.upper() == "PNG" else "image/jpeg"
-    return f"data:{mime};base64,{b64}"
-
-
-# ------------------------------
-# [유틸] 예시 이미지 로드 + 가벼운 리사이즈
-#  - 너무 큰 이미지는 성능/메모리 고려해서 폭을 제한
-#  - 반환: (before_img, after_img, 추천_높이_px)
+# [에셋] Hero Before/After 예시 이미지
+#  - 디코딩/리사이즈/JPEG·WebP 인코딩은 1회만 (restoration/hero.py → static/hero/)
+#  - 이미지는 정적 URL(srcset)로 참조 → 브라우저 캐시, rerun마다 재전송 없음
+#  - 미리 빌드: python -m restoration.hero
+#  - 반환: {"before": {"srcset", "src"}, "after": {...}, "height": 추천_높이_px}
 # ------------------------------
-def load_examples(max_width: int = 300):
-    if not BEFORE_PATH.exists() or not AFTER_PATH.exists():
-        st.error("예시 이미지가 없습니다. before.jpg, after.jpg 를 넣어주세요.")
-        st.stop()
-
-    before = Image.open(BEFORE_PATH).convert("RGB")
-    after = Image.open(AFTER_PATH).convert("RGB")
-
-    # 폭 제한 - 비율 유지
-    def shrink(im: Image.Image) -> Image.Image:
-        if im.width > max_width:
-            h = int(im.height * (max_width / im.width))
-            return im.resize((max_width, h))
-        return im
-
-    before = shrink(before)
-    after = shrink(after)
-
-    # 미리보기 높이 추정: 가로형 기준으로 300~520 사이에서 적당히 잡음
-    est_h = int(after.height * min(1.0, 800 / max(after.width, 1)))  # 폭 900 기준 비율
-    est_h = max(300, min(est_h, 520))
-    return before, after, est_h
+@st.cache_resource(show_spinner=False)
+def load_examples():
+    metrics.cache_miss("hero_assets")
+    if not hero_sources_exist():
+        return None
+    # 루트 기준 절대 URL (하위 경로 배포 시 server.baseUrlPath 포함)
+    return load_hero_assets(st.get_option("server.baseUrlPath") or "")
 
 
 # ------------------------------
@@ -430,7 +375,12 @@ input[type="range"]{
 # ------------------------------
 # [데이터] 예시 이미지 로드
 # ------------------------------
-before_img, after_img, hero_h = load_examples(max_width=750)
+metrics.cache_lookup("hero_assets")
+hero_assets = load_examples()
+if hero_assets is None:
+    st.error("예시 이미지가 없습니다. before.png, after.png 를 넣어주세요.")
+    st.stop()
+hero_h = hero_assets["height"]
 st.markdown("""
 <style>
 
@@ -585,7 +535,7 @@ st.markdown(f"""
 # [우측 비교 위젯] Before/After 슬라이더
 # ------------------------------
 
-def render_compare(before_b64: str, after_b64: str, start: int = 50, height_px: int = 400):
+def render_compare(before: dict, after: dict, start: int = 50, height_px: int = 400):
     html = f"""
 <style>
 
@@ -641,8 +591,8 @@ def render_compare(before_b64: str, after_b64: str, start: int = 50, height_px:
 <div class="compare-wrap" id="compare-box">
   <span class="badge before">Before</span>
   <span class="badge after">After</span>
-  <img class="hero-img before" src="{before_b64}" />
-  <img class="hero-img after"  src="{after_b64}" style="clip-path: inset(0 {100 - start}% 0 0);" />
+  <img class="hero-img before" src="{before['src']}" srcset="{before['srcset']}" sizes="100vw" alt="Before" />
+  <img class="hero-img after"  src="{after['src']}" srcset="{after['srcset']}" sizes="100vw" alt="After" style="clip-path: inset(0 {100 - start}% 0 0);" />
   <div class="hero-divider" id="divider" style="left:{start}%"></div>
 </div>
 
@@ -735,10 +685,6 @@ input[type="range"]{
 </style>
 """, unsafe_allow_html=True)
 
-# 데이터 URI 변환
-before_b64 = pil_to_data_uri(before_img, fmt="JPEG", quality=90)
-after_b64 = pil_to_data_uri(after_img, fmt="JPEG", quality=90)
-
 # ------------------------------
 # [레이아웃] 좌(텍스트) / 우(미리보기)
 # ------------------------------
@@ -765,7 +711,7 @@ with st.container():
             # (사이드바 프로필 영역은 기존 그대로 유지)
             with st.sidebar:
                 profile = st.session_state["kakao_profile"]
-                nickname, img = extract_profile(profile)
+                nickname, img = kakao_http.extract_profile(profile)
 
                 # 사이드바 헤더 숨김(필요 시)
                 st.markdown("""
@@ -820,7 +766,7 @@ with st.container():
 
         else:
             # ===== 로그인 전: 카카오 + 게스트 두 버튼 =====
-            login_url = build_auth_url()
+            login_url = kakao_http.build_auth_url(KAKAO)
             st.markdown(
                 f'''
                 <div class="left-stack">
@@ -844,7 +790,7 @@ with st.container():
             """, unsafe_allow_html=True)
 
     with right_col:
-        render_compare(before_b64, after_b64, start=50, height_px=hero_h)
+        render_compare(hero_assets["before"], hero_assets["after"], start=50, height_px=hero_h)
 # --- 게스트 모드 버튼 클릭 시 복원 섹션으로 스무스 스크롤 ---
 st.markdown("""
 <script>
@@ -888,13 +834,14 @@ st.markdown("""
 #   맨 아래에 이 블록만 한 번 넣으세요.
 
 from typing import Dict, Optional
-from datetime import datetime
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageOps
 import textwrap
 import io
-import hashlib
 import base64
 import streamlit as st
+from restoration.encoding import export_bytes, policy_for
+from restoration.ops import denoise_image, image_from_bytes, image_to_bytes, upscale_image
+from restoration.workflow import format_status
 
 def open_image(uploaded, check=False) -> Image.Image:
     """
@@ -917,78 +864,67 @@ def open_image(uploaded, check=False) -> Image.Image:
     return img
 # ---------- 세션 상태 ----------
 def ensure_restoration_state() -> Dict:
+    # 상태 dict 조작은 restoration/workflow.py (back/back.py 와 공용)
     if "restoration" not in st.session_state:
-        st.session_state.restoration = {
-            "upload_digest": None,
-            "original_bytes": None,
-            "description": "",
-            "current_bytes": None,
-            "counts": {"upscale": 0, "denoise": 0, "story": 0},
-            "history": [],
-            "story": None,
-            "file_name": None,  # 업로드 파일명
-        }
+        st.session_state.restoration = workflow.new_state(
+            file_name=None,  # 업로드 파일명
+            upload_file_id=None,  # 이미 검사/해시한 업로드 (restoration/ingest.py)
+            upload_info=None,  # 헤더에서 읽은 형식/해상도
+            source_path=None,  # 큰 TIFF/BMP 원본의 scratch 경로 (restoration/largeimage.py)
+        )
     return st.session_state.restoration
 
-# ---------- 바이트 ↔ PIL ----------
-def image_from_bytes(data: bytes) -> Image.Image:
-    image = Image.open(io.BytesIO(data))
-    image = ImageOps.exif_transpose(image)
-    return image.convert("RGB")
-
-def image_to_bytes(image: Image.Image) -> bytes:
-    buf = io.BytesIO()
-    image.save(buf, format="PNG")
-    return buf.getvalue()
-
-# ---------- 복원 알고리즘(샘플 자리표시자) ----------
-def colorize_image(image: Image.Image) -> Image.Image:
-    gray = image.convert("L")
-    return ImageOps.colorize(gray, black="#1e1e1e", white="#f8efe3", mid="#88a6c6").convert("RGB")
+# ---------- 바이트 ↔ PIL / 복원 알고리즘 ----------
+# image_from_bytes, image_to_bytes, colorize_image, upscale_image, denoise_image 는
+# restoration/ops.py (Streamlit 없이 import 가능 → 벤치마크/배치 작업과 공유)
 
-def upscale_image(image: Image.Image) -> Image.Image:
-    w, h = image.size
-    return image.resize((w * 2, h * 2), Image.LANCZOS)
-
-def denoise_image(image: Image.Image) -> Image.Image:
-    return image.filter(ImageFilter.MedianFilter(3)).filter(ImageFilter.SMOOTH_MORE)
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_export_bytes(data: bytes) -> bytes:
+    # 스토리 영역은 rerun마다 다시 그려지므로 export 인코딩은 결과당 1회만
+    metrics.cache_miss("export")
+    with metrics.stage("export_encode"):
+        return export_bytes(data)
 
 # ---------- 상태/히스토리 ----------
-def format_status(c: Dict[str, int]) -> str:
-    return f"[컬러화 {'✔' if c['color'] else '✖'} / 해상도 {c['upscale']}회 / 노이즈 {c['denoise']}회]"
-
 def add_history_entry(label: str, image_bytes: bytes, note: Optional[str] = None) -> None:
-    r = ensure_restoration_state()
-    entry = {
-        "label": label,
-        "bytes": image_bytes,
-        "status": dict(r["counts"]),
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "file_name": r.get("file_name"),
-        "note": note,
-    }
-    r["history"].append(entry)
-    r["current_bytes"] = image_bytes
+    workflow.add_history_entry(ensure_restoration_state(), label, image_bytes, note)
 
-def reset_restoration(upload_digest: str, original_bytes: bytes, description: str, file_name: str) -> None:
-    r = ensure_restoration_state()
-    r.update({
-        "upload_digest": upload_digest,
-        "original_bytes": original_bytes,
-        "description": description,
-        "current_bytes": original_bytes,
-        "counts": {"color": 0, "upscale": 0, "denoise": 0, "story": 0},
-        "history": [],
-        "story": None,
-        "file_name": file_name,
-    })
+def spool_large_upload(upload) -> Tuple[bytes, Optional[str]]:
+    """큰 비압축 TIFF/BMP 는 scratch 파일로 내려 두고 화면/스토리용 축소본만 메모리에 둔다.
+    (미리보기 bytes, 원본 경로). mmap 으로 못 여는 파일이면 원본 bytes 그대로."""
+    try:
+        path = scratch.STORE.write(session_id(), upload.data, suffix="." + upload.format.lower())
+    except scratch.ScratchFull:
+        return upload.data, None
+    try:
+        with largeimage.MappedImage(path) as src:
+            preview = image_to_bytes(src.preview())
+    except largeimage.NotMappable:
+        scratch.STORE.delete(path)
+        return upload.data, None
+    return preview, str(path)
+
+def working_image(r: Dict):
+    """원본에 대한 첫 작업이면 mmap 원본(띠 단위 디코드), 아니면 현재 결과 bytes 디코드."""
+    path = r.get("source_path")
+    if path and not r["history"]:
+        try:
+            return largeimage.MappedImage(path)
+        except (FileNotFoundError, largeimage.NotMappable):
+            r["source_path"] = None  # scratch TTL 로 지워졌으면 미리보기로 계속
+    return image_from_bytes(r["current_bytes"])
 
-# ---------- 스토리 ----------
+def working_pixels(r: Dict) -> int:
+    info = r.get("upload_info")
+    if r.get("source_path") and not r["history"] and info:
+        return info["width"] * info["height"]
+    return pixel_count(r["current_bytes"])
+
+def reset_restoration(upload_digest: str, original_bytes: bytes, description: str, file_name: str) -> None:
+    workflow.reset(ensure_restoration_state(), upload_digest, original_bytes, description, file_name=file_name)
 
 def can_run_operation(op: str, allow_repeat: bool) -> bool:
-    r = ensure_restoration_state()
-    cnt = r["counts"].get(op, 0)
-    return (cnt < 3) if allow_repeat else (cnt == 0)
+    return workflow.can_run_operation(ensure_restoration_state(), op, allow_repeat)
 
 # ---------- 버튼 액션(하드가드 포함: 고급옵션 OFF면 1회 제한) ----------
 def run_upscale() -> None:
@@ -996,55 +932,67 @@ def run_upscale() -> None:
     if not can_run_operation("upscale", allow_repeat):
         return
     r = ensure_restoration_state()
-    img = image_from_bytes(r["current_bytes"])
-    out = upscale_image(img)
-    r["counts"]["upscale"] += 1
-    r["story"] = None
-    add_history_entry("해상도 업", image_to_bytes(out), note="ESRGAN 대체 알고리즘(샘플)으로 2배 업스케일했습니다.")
+    if rate_limited("image", ratelimit.image_cost(working_pixels(r))):
+        return
+    token = cancel_token(r)
+    try:
+        with memory.track("upscale", session_id()):
+            img = working_image(r)
+            try:
+                out = upscale_image(img, cancel=token)
+            finally:
+                img.close()
+            r["counts"]["upscale"] += 1
+            r["story"] = None
+            add_history_entry("해상도 업", image_to_bytes(out), note="ESRGAN 대체 알고리즘(샘플)으로 2배 업스케일했습니다.")
+    except Cancelled:
+        return  # 버려진 작업: 이어지는 rerun 이 화면을 다시 그림
+    finally:
+        cancellation.release(token)
 
 def run_denoise() -> None:
     allow_repeat = st.session_state.get("allow_repeat", False)
     if not can_run_operation("denoise", allow_repeat):
         return
     r = ensure_restoration_state()
-    img = image_from_bytes(r["current_bytes"])
-    out = denoise_image(img)
-    r["counts"]["denoise"] += 1
-    r["story"] = None
-    add_history_entry("노이즈 제거", image_to_bytes(out), note="NAFNet 대체 필터(샘플)로 노이즈를 완화했습니다.")
-
-
-def run_story_generation():
+    if rate_limited("image", ratelimit.image_cost(working_pixels(r))):
+        return
+    token = cancel_token(r)
+    try:
+        with memory.track("denoise", session_id()):
+            img = working_image(r)
+            try:
+                out = denoise_image(img, cancel=token)
+            finally:
+                img.close()
+            r["counts"]["denoise"] += 1
+            r["story"] = None
+            add_history_entry("노이즈 제거", image_to_bytes(out), note="NAFNet 대체 필터(샘플)로 노이즈를 완화했습니다.")
+    except Cancelled:
+        return  # 버려진 작업: 이어지는 rerun 이 화면을 다시 그림
+    finally:
+        cancellation.release(token)
+
+
+STORY_MAX_NEW_TOKENS = int(os.getenv("STORY_MAX_NEW_TOKENS", "250"))
+STORY_QUEUE_TIMEOUT_SEC = int(os.getenv("STORY_QUEUE_TIMEOUT_SEC", "120"))
+
+
+def run_story_generation(cancel: Optional[CancelToken] = None, image_bytes: Optional[bytes] = None):
     r = ensure_restoration_state()
-    if not r.get("current_bytes"):
+    image_bytes = image_bytes or r.get("current_bytes")  # 배치 모드는 결과 이미지를 직접 넘김
+    if not image_bytes:
         return None
 
-    # 1) 세션 상태에서 이미지 불러오기
-    pil_img = Image.open(io.BytesIO(r["current_bytes"])).convert("RGB")
-
-    # 2) 임시 파일에 저장 (경로 확보)
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    pil_img.save(tmp_file.name)
-
-    # 3) 메시지 구성 (이미지 경로 직접 넣기)
-    messages = [
-        {
-            "role": "system",
-            "content": [{"type": "text", "text": "You are a helpful assistant."}]
-        },
-        {
-            "role": "user",
-            "content": [
-                {"type": "image", "image": tmp_file.name},   # ✅ 경로 직접 삽입
-                {"type": "text", "text": "이 이미지를 보고 너는 어떤 느낌이 드는지 한국어로 설명해줘."}
-            ]
-        }
-    ]
-    # 4) 모델 호출 (images 파라미터 필요 없음!)
-    pipe = load_model()
-    output = pipe(text=messages, max_new_tokens=250)
-
-    return output[0]["generated_text"][-1]["content"]
+    # 1) 현재 이미지를 세션 scratch 폴더에 그대로 기록 (재인코딩 X, 생성이 끝나면 즉시 삭제)
+    with scratch.STORE.temp_file(session_id(), image_bytes, suffix=".img") as image_path:
+        # 2) 메시지 구성 (이미지 경로 직접 넣기, CLI 와 같은 프롬프트: restoration/ml.py)
+        messages = story_messages(str(image_path))
+        # 3) 모델 호출 (processor 가 이미지 경로를 읽어 전처리) → (텍스트, GenerationStats)
+        model = load_model()
+        with metrics.stage("generate", pixels=pixel_count(image_bytes)), \
+                profiling.torch_profile(session_id(), "generate", enabled=profiling_on()):
+            return model.generate(messages, max_new_tokens=STORY_MAX_NEW_TOKENS, cancel=cancel)
 
 # ---------- 섹션 CSS ----------
 st.markdown(
@@ -1110,40 +1058,145 @@ st.markdown("<div id='restore-app'></div>", unsafe_allow_html=True)
 st.markdown("<div style='height: 10rem'></div>", unsafe_allow_html=True)
 st.markdown("<h1 id='restore-title'>📌 사진 복원 + 스토리 생성</h1>", unsafe_allow_html=True)
 
-# ---------- 업로드 ----------
-st.subheader("1. 사진 업로드")
-rstate = ensure_restoration_state()
-# 사진 유형 라디오 제거 → 사용자 설명만 입력
-description = st.text_input(
-    "사진에 대한 간단한 설명",
-    key="photo_description",
-    placeholder="예: 1970년대 외할아버지의 결혼식"
-)
+# ---------- 워크플로우 섹션 ----------
+# 업로드/옵션/결과/히스토리/스토리는 하나의 st.fragment 안에서 그려진다.
+# → 버튼·체크박스 클릭 시 이 영역만 rerun (OAuth 처리, Hero, CSS, render_compare 는 건너뜀)
+def upload_section() -> None:
+    st.subheader("1. 사진 업로드")
+    rstate = ensure_restoration_state()
+    # 사진 유형 라디오 제거 → 사용자 설명만 입력
+    description = st.text_input(
+        "사진에 대한 간단한 설명",
+        key="photo_description",
+        placeholder="예: 1970년대 외할아버지의 결혼식"
+    )
 
-uploaded_file = st.file_uploader(
-    "사진 파일 업로드",
-    type=["png", "jpg", "jpeg", "bmp", "tiff"],
-    key="photo_uploader"
-)
+    uploaded_file = st.file_uploader(
+        "사진 파일 업로드",
+        type=["png", "jpg", "jpeg", "bmp", "tiff"],
+        key="photo_uploader"
+    )
 
-if uploaded_file is not None:
-    file_bytes = uploaded_file.getvalue()
-    digest = hashlib.sha1(file_bytes).hexdigest()
-    if rstate["upload_digest"] != digest:
-        # photo_type 대신 ""(빈 문자열) 전달
-        reset_restoration(digest, file_bytes, "", uploaded_file.name)
-        ensure_restoration_state()["current_bytes"] = file_bytes
-    else:
+    if uploaded_file is not None:
+        # 같은 업로드(file_id)면 검사/해시 생략 → rerun 마다 sha1 을 다시 계산하지 않음
+        if rstate.get("upload_file_id") != uploaded_file.file_id:
+            try:
+                # BMP/TIFF 는 메모리 맵 한도(INGEST_MAPPED_MAX_*)까지 받고, 실제로 맵 못 하면 일반 한도로 재검사
+                upload = ingest(uploaded_file, uploaded_file.name, size=uploaded_file.size, mapped=True)
+                original, source_path = upload.data, None
+                same = rstate["upload_digest"] == upload.digest
+                if not same and largeimage.should_map(upload.format, upload.size):
+                    original, source_path = spool_large_upload(upload)
+                if source_path is None and not (same and rstate.get("source_path")):
+                    check_unmapped(upload)
+            except IngestError as exc:
+                st.error(str(exc))
+                return
+            rstate["upload_file_id"] = uploaded_file.file_id
+            if rstate["upload_digest"] != upload.digest:
+                if rstate.get("source_path"):
+                    scratch.STORE.delete(rstate["source_path"])
+                # photo_type 대신 ""(빈 문자열) 전달
+                reset_restoration(upload.digest, original, "", upload.name)
+                rstate["source_path"] = source_path
+                rstate["upload_info"] = {"format": upload.format, "width": upload.width, "height": upload.height}
+                return
         rstate["description"] = description
 
-# ---------- 옵션 ----------
-allow_repeat = st.checkbox("고급 옵션(실험적) - 동일 작업 반복 허용 (최대 3회)", key="allow_repeat")
-if allow_repeat:
-    st.warning("⚠ 동일 작업 반복은 처리 시간이 길어지거나 이미지 손상을 유발할 수 있습니다.")
 
-if rstate["original_bytes"] is None:
-    st.info("사진을 업로드하면 복원 옵션이 활성화됩니다.")
-else:
+def queued_story_generation():
+    """입장 제어(STORY_GATE) 통과 후 생성. 대기 중에는 스피너 대신 대기열 순번을 실시간 표시."""
+    if rate_limited("story"):
+        return None
+    try:
+        ticket = STORY_GATE.enter(session_id())
+    except ServerBusy:
+        st.warning("지금은 스토리 생성 요청이 많아 서버가 바쁩니다. 잠시 후 다시 시도해주세요.")
+        return None
+    status = st.empty()
+    token = cancel_token(ensure_restoration_state())
+    try:
+        deadline = time.monotonic() + STORY_QUEUE_TIMEOUT_SEC
+        while not STORY_GATE.wait(ticket, timeout=0.5):
+            if token.cancelled:
+                return None
+            pos = STORY_GATE.position(ticket)
+            status.info(f"⏳ 스토리 생성 대기열 {pos}번째입니다 (앞에 {pos - 1}명). 차례가 되면 자동으로 시작합니다.")
+            if time.monotonic() > deadline:
+                STORY_GATE.cancel(ticket, outcome="timeout")
+                status.warning("대기 시간이 길어 요청을 취소했습니다. 잠시 후 다시 시도해주세요.")
+                return None
+        status.empty()
+        with STORY_GATE.slot(ticket), st.spinner("🧠 Gemma가 이미지를 해석/평가하는 중..."):
+            with memory.track("story", session_id()):
+                return run_story_generation(cancel=token)
+    except Cancelled:
+        return None
+    except ServerBusy:  # 공용 모델 서버(STORY_MODEL_SERVER)의 호스트 대기열이 가득 참
+        st.warning("지금은 스토리 생성 요청이 많아 서버가 바쁩니다. 잠시 후 다시 시도해주세요.")
+        return None
+    except ModelServerError as exc:
+        st.error(f"스토리 모델 서버에 문제가 있습니다: {exc}")
+        return None
+    finally:
+        cancellation.release(token)
+        # 대기 중 rerun/세션 종료로 빠져나가면 대기열에서 제거 (이미 반납된 티켓이면 아무것도 안 함)
+        STORY_GATE.cancel(ticket)
+
+
+# ---------- 단계별 스토리 (restoration/storytier.py): 템플릿 즉시 → 모델 결과로 교체 ----------
+STORY_TEMPLATE_NOTES = {
+    "ok": "⚡ 작업 이력으로 바로 만든 스토리입니다. Gemma 스토리가 준비되면 이 자리에서 바뀝니다.",
+    "model_not_loaded": "모델을 준비하는 중이라 템플릿 스토리를 먼저 보여드립니다. 잠시 후 다시 누르면 Gemma 스토리를 받을 수 있습니다.",
+    "queue_full": "지금은 스토리 생성 요청이 많아 템플릿 스토리로 대신합니다.",
+    "slo": "예상 대기 시간이 길어 템플릿 스토리로 대신합니다.",
+    "server_down": "스토리 모델 서버에 연결할 수 없어 템플릿 스토리로 대신합니다.",
+    "model_skipped": "Gemma 스토리를 받지 못해 템플릿 스토리를 유지합니다.",
+}
+
+
+def story_plan() -> Tuple[bool, str]:
+    """모델 단계를 돌릴지 결정. 모델이 아직 없으면 이번엔 템플릿만, 로드는 백그라운드로 시작."""
+    if storytier.MODE == "template":
+        return False, "mode"
+    if not storytier.model_ready():
+        if MODEL_SERVER:
+            load_model()  # 서버 모드: 클라이언트만 만들므로 즉시
+        else:
+            # 로드 스레드에도 현재 세션 컨텍스트 (st.secrets / 세션 상태 접근, 컨텍스트 없음 경고 방지)
+            ctx = get_script_run_ctx()
+            storytier.warm(load_model, prepare=lambda thread: add_script_run_ctx(thread, ctx))
+        if not storytier.model_ready():
+            return False, "model_not_loaded"
+    gates = [STORY_GATE.stats()]
+    model = load_model()
+    if hasattr(model, "health"):  # 모델 서버의 호스트 대기열도 확인
+        try:
+            gates.append(model.health()["gate"])
+        except ModelServerError:
+            return False, "server_down"
+    return storytier.decide(gates, STORY_MAX_NEW_TOKENS)
+
+
+def template_story(rstate: Dict, reason: str) -> Dict:
+    text = workflow.build_story(rstate["description"], rstate["counts"])
+    return {"text": text, "tier": "template", "reason": reason, "spent": None}
+
+
+def upgrade_story(rstate: Dict, slot) -> None:
+    """템플릿이 이미 보이는 상태에서 모델 스토리를 생성해 같은 자리(slot)를 교체."""
+    result = queued_story_generation()
+    if result:
+        story_text, gen = result
+        rstate["story"] = {"text": story_text, "tier": "model", "spent": gen.total_s, "telemetry": gen.to_dict()}
+    else:
+        rstate["story"]["reason"] = "model_skipped"
+    with slot.container():
+        story_body(rstate)
+
+
+def options_section(rstate: Dict, allow_repeat: bool) -> bool:
+    """반환값: 이번 실행에서 스토리를 모델로 업그레이드해야 하면 True (스토리 섹션을 그린 뒤 실행)."""
     st.subheader("2. 복원 옵션")
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -1156,11 +1209,21 @@ else:
             run_denoise()
     with c3:
         if st.button("스토리 생성", key="btn_story", use_container_width=True):
-            story_text = run_story_generation()
-            if story_text:
-                rstate["story"] = {"text": story_text}
-
-    st.divider()
+            if storytier.MODE == "model":
+                result = queued_story_generation()
+                if result:
+                    story_text, gen = result
+                    rstate["story"] = {"text": story_text, "tier": "model", "spent": gen.total_s, "telemetry": gen.to_dict()}
+                storytier.count("model", "mode")
+                return False
+            use_model, reason = story_plan()
+            rstate["story"] = template_story(rstate, reason)
+            storytier.count("model" if use_model else "template", reason)
+            return use_model
+    return False
+
+
+def results_section(rstate: Dict) -> None:
     col_a, col_b = st.columns(2)
 
     with col_a:
@@ -1172,98 +1235,304 @@ else:
         st.markdown("<h3 class='col-title'>복원 결과</h3>", unsafe_allow_html=True)
         if rstate["history"]:
             latest = rstate["history"][-1]
-            last_img = st.image(latest["bytes"], use_container_width=True, caption=latest["label"])
+            st.image(latest["bytes"], use_container_width=True, caption=latest["label"])
             st.markdown(f"<div class='img-cap'>{format_status(latest['status'])}</div>", unsafe_allow_html=True)
             if latest.get("note"):
                 st.markdown(f"*{latest['note']}*")
         else:
             st.info("아직 수행된 복원 작업이 없습니다.")
 
-    # ---------- 전체 작업 히스토리: 파일명 기준 가로 나열 ----------
-    if len(rstate["history"]) > 1:
-        with st.expander("전체 작업 히스토리"):
-            groups: Dict[str, list] = {}
-            for e in rstate["history"]:
-                fname = e.get("file_name") or rstate.get("file_name") or "현재 업로드"
-                groups.setdefault(fname, []).append(e)
-
-            for fname, entries in groups.items():
-                st.markdown(f"**{fname}**")
-                cards_html = []
-                for e in entries:
-                    b64 = base64.b64encode(e["bytes"]).decode("ascii")
-                    uri = f"data:image/png;base64,{b64}"
-                    title = e["label"]
-                    meta = f"{e['timestamp']} · {format_status(e['status'])}"
-                    card = ('<div class="history-card">'
-                           f'<img src="{uri}" alt="{title}"/>'
-                           f'<div class="history-title">{title}</div>'
-                           f'<div class="history-meta">{meta}</div>'
-                           '</div>')
-                    cards_html.append(card)
-                row_html = "<div class='history-row'>" + "".join(cards_html) + "</div>"
-                st.markdown(row_html, unsafe_allow_html=True)
-
-    # ---------- 스토리 ----------
-    # ---------- 스토리 ----------
-    if rstate.get("story"):
-        st.subheader("스토리")
-        info = rstate["story"]
-
-        # 맨 아래 스크롤 앵커
-        st.markdown(f'<div id="story-bottom"></div>', unsafe_allow_html=True)
-
-        import base64, html, time
-
-        orig_bytes = rstate["original_bytes"]
-        last_bytes = (rstate["history"][-1]["bytes"] if rstate["history"] else rstate["current_bytes"] or orig_bytes)
-
-        b64_orig = base64.b64encode(orig_bytes).decode("ascii")
-        b64_last = base64.b64encode(last_bytes).decode("ascii")
-        fname = (rstate.get("file_name") or "image").rsplit("/", 1)[-1]
-        dn_orig = f"original_{fname}".replace(" ", "_")
-        dn_last = f"restored_{fname}".replace(" ", "_")
-
-        with st.spinner("🧠 Gemma가 이미지를 해석/평가하는 중..."):
-            t0 = time.time()
-            story_text = run_story_generation()
-            spent = time.time() - t0
-
-        story_html = story_text.replace("\n", "<br>")
-
-        lane_html = f"""
-        <style>
-          .story-lane {{
-            display:flex; gap:16px; align-items:flex-start; margin-top:8px;
-            overflow-x:auto; padding:8px 2px;
-          }}
-          .story-card, .story-img {{
-            border:1px solid #e5e7eb; border-radius:12px; background:#fff;
-          }}
-          .story-card {{
-            flex: 1 1 50%; padding:14px; min-width: 320px; white-space:pre-wrap; line-height:1.6;
-          }}
-          .story-img {{
-            flex: 0 0 340px; text-decoration:none; color:inherit; padding:10px; text-align:center;
-          }}
-          .story-img img {{ width:100%; border-radius:8px; display:block; }}
-          .story-img .dl {{ margin-top:6px; font-size:.9rem; color:#6b7280; }}
-        </style>
-
-        <div class="story-lane">
-          <div class="story-card">{story_html}</div>
-          <a class="story-img" href="data:image/png;base64,{b64_orig}" download="{dn_orig}">
-            <img src="data:image/png;base64,{b64_orig}" alt="원본 이미지"/>
-            <div class="dl">원본 다운로드</div>
-          </a>
-          <a class="story-img" href="data:image/png;base64,{b64_last}" download="{dn_last}">
-            <img src="data:image/png;base64,{b64_last}" alt="복원 이미지"/>
-            <div class="dl">복원본 다운로드</div>
-          </a>
-        </div>
-        """
-        st.markdown(lane_html, unsafe_allow_html=True)
-        st.caption(f"소요 시간: {spent:.2f}s")
+
+# ---------- 전체 작업 히스토리: 파일명 기준 가로 나열 ----------
+def history_section(rstate: Dict) -> None:
+    if len(rstate["history"]) <= 1:
+        return
+    with st.expander("전체 작업 히스토리"):
+        groups: Dict[str, list] = {}
+        for e in rstate["history"]:
+            fname = e.get("file_name") or rstate.get("file_name") or "현재 업로드"
+            groups.setdefault(fname, []).append(e)
+
+        for fname, entries in groups.items():
+            st.markdown(f"**{fname}**")
+            cards_html = []
+            for e in entries:
+                b64 = base64.b64encode(e["bytes"]).decode("ascii")
+                uri = f"data:image/png;base64,{b64}"
+                title = e["label"]
+                meta = f"{e['timestamp']} · {format_status(e['status'])}"
+                card = ('<div class="history-card">'
+                       f'<img src="{uri}" alt="{title}"/>'
+                       f'<div class="history-title">{title}</div>'
+                       f'<div class="history-meta">{meta}</div>'
+                       '</div>')
+                cards_html.append(card)
+            row_html = "<div class='history-row'>" + "".join(cards_html) + "</div>"
+            st.markdown(row_html, unsafe_allow_html=True)
+
+
+# ---------- 스토리 ----------
+def story_section(rstate: Dict):
+    """스토리 카드를 그리고 그 자리(st.empty)를 반환 → 모델 스토리가 나오면 upgrade_story 가 교체."""
+    if not rstate.get("story"):
+        return None
+    st.subheader("스토리")
+
+    # 맨 아래 스크롤 앵커
+    st.markdown(f'<div id="story-bottom"></div>', unsafe_allow_html=True)
+    slot = st.empty()
+    with slot.container():
+        story_body(rstate)
+    original_download(rstate)
+    return slot
+
+
+def original_download(rstate: Dict) -> None:
+    """scratch 에 내려 둔 큰 원본 파일. 배치 ZIP 과 같이 누를 때만 download_button 을 만든다."""
+    path = rstate.get("source_path")
+    if not path or not os.path.exists(path):
+        return
+    fname = (rstate.get("file_name") or "image").rsplit("/", 1)[-1]
+    if st.button(f"원본 다운로드 ({os.path.getsize(path) / 1024 / 1024:.0f}MB)", key="btn_original_prepare"):
+        with open(path, "rb") as f:
+            st.download_button("⬇ 원본 저장", f, file_name=f"original_{fname}".replace(" ", "_"),
+                               key="btn_original_download", on_click="ignore", type="primary")
+
+
+def story_body(rstate: Dict) -> None:
+    info = rstate["story"]
+    orig_bytes = rstate["original_bytes"]
+    last_bytes = (rstate["history"][-1]["bytes"] if rstate["history"] else rstate["current_bytes"] or orig_bytes)
+
+    # 다운로드용 복원본만 export 정책으로 최적화 인코딩
+    export_policy = policy_for("export")
+    b64_orig = base64.b64encode(orig_bytes).decode("ascii")
+    metrics.cache_lookup("export")
+    b64_last = base64.b64encode(cached_export_bytes(last_bytes)).decode("ascii")
+    fname = (rstate.get("file_name") or "image").rsplit("/", 1)[-1]
+    dn_orig = f"original_{fname}".replace(" ", "_")
+    if rstate.get("source_path"):
+        # 큰 TIFF/BMP: original_bytes 는 축소 미리보기 → 원본은 카드 아래 버튼으로 scratch 파일에서 내려줌
+        orig_card = f"""<div class="story-img">
+        <img src="data:image/png;base64,{b64_orig}" alt="원본 이미지 (미리보기)"/>
+        <div class="dl">원본 미리보기</div>
+      </div>"""
+    else:
+        orig_card = f"""<a class="story-img" href="data:image/png;base64,{b64_orig}" download="{dn_orig}">
+        <img src="data:image/png;base64,{b64_orig}" alt="원본 이미지"/>
+        <div class="dl">원본 다운로드</div>
+      </a>"""
+    dn_last = f"restored_{fname.rsplit('.', 1)[0]}.{export_policy.ext}".replace(" ", "_")
+
+    story_html = info["text"].replace("\n", "<br>")
+
+    lane_html = f"""
+    <style>
+      .story-lane {{
+        display:flex; gap:16px; align-items:flex-start; margin-top:8px;
+        overflow-x:auto; padding:8px 2px;
+      }}
+      .story-card, .story-img {{
+        border:1px solid #e5e7eb; border-radius:12px; background:#fff;
+      }}
+      .story-card {{
+        flex: 1 1 50%; padding:14px; min-width: 320px; white-space:pre-wrap; line-height:1.6;
+      }}
+      .story-img {{
+        flex: 0 0 340px; text-decoration:none; color:inherit; padding:10px; text-align:center;
+      }}
+      .story-img img {{ width:100%; border-radius:8px; display:block; }}
+      .story-img .dl {{ margin-top:6px; font-size:.9rem; color:#6b7280; }}
+    </style>
+
+    <div class="story-lane">
+      <div class="story-card">{story_html}</div>
+      {orig_card}
+      <a class="story-img" href="data:{export_policy.mime};base64,{b64_last}" download="{dn_last}">
+        <img src="data:{export_policy.mime};base64,{b64_last}" alt="복원 이미지"/>
+        <div class="dl">복원본 다운로드</div>
+      </a>
+    </div>
+    """
+    st.markdown(lane_html, unsafe_allow_html=True)
+    if info.get("spent") is not None:
+        gen = info.get("telemetry") or {}
+        detail = (f" · 첫 토큰 {gen['ttft_s']:.2f}s · {gen['decode_tps']:.1f} tok/s · 출력 {gen['output_tokens']} 토큰"
+                  if gen else "")
+        st.caption(f"소요 시간: {info['spent']:.2f}s{detail}")
+    elif info.get("tier") == "template" and info.get("reason") in STORY_TEMPLATE_NOTES:
+        st.caption(STORY_TEMPLATE_NOTES[info["reason"]])
+
+
+@st.fragment
+def restoration_workflow() -> None:
+    # 전체 rerun 중에는 스크립트 프로파일에 포함되고, 프래그먼트 단독 rerun 일 때만 따로 기록
+    with profiling.cprofile(session_id(), "fragment", enabled=profiling_on()):
+        _restoration_workflow()
+    # 세션이 붙잡고 있는 이미지 바이트 → /metrics (합계/최댓값)
+    memory.set_session_retained(session_id(), memory.retained_bytes(st.session_state.get("restoration")))
+
+
+def _restoration_workflow() -> None:
+    upload_section()
+    rstate = ensure_restoration_state()
+
+    # ---------- 옵션 ----------
+    allow_repeat = st.checkbox("고급 옵션(실험적) - 동일 작업 반복 허용 (최대 3회)", key="allow_repeat")
+    if allow_repeat:
+        st.warning("⚠ 동일 작업 반복은 처리 시간이 길어지거나 이미지 손상을 유발할 수 있습니다.")
+
+    if rstate["original_bytes"] is None:
+        st.info("사진을 업로드하면 복원 옵션이 활성화됩니다.")
+        return
+    upgrade = options_section(rstate, allow_repeat)
+    st.divider()
+    results_section(rstate)
+    history_section(rstate)
+    slot = story_section(rstate)
+    if upgrade and slot is not None:
+        upgrade_story(rstate, slot)
+
+
+restoration_workflow()
+
+
+# ---------- 배치 모드: 여러 장/ZIP → 같은 작업 → 결과 ZIP (restoration/batch.py) ----------
+BATCH_OP_LABELS = {"denoise": "노이즈 제거", "colorize": "컬러화", "upscale": "해상도 업(2배)"}
+
+
+def batch_story(data: bytes, token: CancelToken) -> Optional[str]:
+    """배치 결과 한 장의 스토리. 한도 초과/대기열 가득/대기 시간 초과면 건너뜀(None)."""
+    key, tier = ratelimit.identity(st.session_state.get("kakao_profile"), session_id())
+    if ratelimit.LIMITER.acquire(key, tier, "story"):
+        return None
+    try:
+        ticket = STORY_GATE.enter(session_id())
+    except ServerBusy:
+        return None
+    try:
+        deadline = time.monotonic() + STORY_QUEUE_TIMEOUT_SEC
+        while not STORY_GATE.wait(ticket, timeout=0.5):
+            token.check("story")
+            if time.monotonic() > deadline:
+                STORY_GATE.cancel(ticket, outcome="timeout")
+                return None
+        with STORY_GATE.slot(ticket):
+            result = run_story_generation(cancel=token, image_bytes=data)
+        return result[0] if result else None
+    except (ServerBusy, ModelServerError):
+        return None
+    finally:
+        STORY_GATE.cancel(ticket)
+
+
+def run_batch_job(files, recipe, with_story: bool) -> None:
+    bstate = st.session_state.setdefault("batch", {})
+    try:
+        inputs = batch.expand((f.name, f) for f in files)
+    except IngestError as exc:
+        st.error(str(exc))
+        return
+    if not inputs:
+        st.warning("처리할 이미지가 없습니다. PNG / JPEG / BMP / TIFF 또는 이를 담은 ZIP 을 올려주세요.")
+        return
+    # 배치 장수는 등급별 한도 이내 (기본: BATCH_MAX_FILES) → 장당 1씩 이미지 한도에서 차감
+    _, tier = ratelimit.identity(st.session_state.get("kakao_profile"), session_id())
+    max_files = min(batch.MAX_FILES, ratelimit.batch_max_files(tier, batch.MAX_FILES))
+    if len(inputs) > max_files:
+        more = tier == "guest" and ratelimit.batch_max_files("kakao", batch.MAX_FILES) > max_files
+        st.error(f"한 번에 {max_files}장까지 처리할 수 있습니다." + (" (로그인하면 한도가 늘어납니다)" if more else ""))
+        return
+    if rate_limited("image", len(inputs)):
+        return
+    if bstate.get("zip_path"):
+        scratch.STORE.delete(bstate.pop("zip_path"))
+
+    progress = st.progress(0.0, text=f"0/{len(inputs)}장 처리 중… (다른 버튼을 누르면 중단됩니다)")
+
+    out_path = scratch.STORE.new_path(session_id(), ".zip")
+    token = cancel_token(bstate, scope="batch")
+    story = (lambda data: batch_story(data, token)) if with_story else None
+    started, kept, done = time.perf_counter(), False, []
+
+    def on_result(result: batch.BatchResult, count: int, total: int) -> None:
+        done.append(result)
+        progress.progress(count / total, text=f"{count}/{total}장 완료 · 방금: {result.name}")
+
+    try:
+        try:
+            with memory.track("batch", session_id()):
+                results = batch.run_batch(inputs, recipe, batch.ZipSink(out_path), story=story, on_result=on_result, cancel=token)
+            partial = False
+        except Cancelled:
+            # run_batch 가 끝나면서 ZIP 을 닫으므로 그때까지 끝난 결과는 온전한 ZIP 으로 남음
+            results, partial = done, True
+            if not any(r.ok for r in results):
+                return
+        scratch.STORE.adopt(out_path)
+        kept = True
+    except (scratch.ScratchFull, FileNotFoundError):  # 한도 초과 / 결과 파일이 정리됨
+        st.error("서버 임시 공간이 부족해 결과를 보관할 수 없습니다. 잠시 후 다시 시도해주세요.")
+        return
+    finally:
+        cancellation.release(token)
+        if not kept:
+            out_path.unlink(missing_ok=True)
+    bstate.update({
+        "zip_path": str(out_path),
+        "ok": sum(r.ok for r in results),
+        "failed": [(r.name, r.error) for r in results if not r.ok],
+        "seconds": time.perf_counter() - started,
+        "partial": partial,
+    })
+
+
+def batch_download(bstate: Dict) -> None:
+    path = bstate.get("zip_path")
+    if not path:
+        return
+    if not os.path.exists(path):  # scratch TTL 로 정리됨
+        bstate.pop("zip_path")
+        st.info("배치 결과 보관 시간이 지났습니다. 다시 실행해주세요.")
+        return
+    st.success(f"{bstate['ok']}장 완료 ({bstate['seconds']:.1f}초)")
+    if bstate["failed"]:
+        with st.expander(f"실패 {len(bstate['failed'])}장"):
+            st.markdown("\n".join(f"- {name}: {error}" for name, error in bstate["failed"]))
+    if bstate.get("partial"):
+        st.warning("배치가 중간에 멈춰 완료된 사진만 ZIP 에 담겨 있습니다.")
+    # download_button 은 ZIP 전체를 메모리(미디어 파일 관리자)에 올리므로 누를 때 한 번만 만든다
+    # → 다음 rerun 에서 버튼이 사라지면 메모리에서도 빠짐 (평소에는 scratch 파일로만 보관)
+    if st.button(f"결과 ZIP 받기 ({os.path.getsize(path) / 1024 / 1024:.1f}MB)", key="btn_batch_prepare"):
+        with open(path, "rb") as f:
+            st.download_button("⬇ 결과 ZIP 저장", f, file_name="restored.zip", mime="application/zip",
+                               key="btn_batch_download", on_click="ignore", type="primary")
+
+
+@st.fragment
+def batch_workflow() -> None:
+    with st.expander("📦 여러 장 한꺼번에 복원 (배치 모드)"):
+        files = st.file_uploader(
+            "사진 여러 장 또는 ZIP 파일",
+            type=["png", "jpg", "jpeg", "bmp", "tif", "tiff", "zip"],
+            accept_multiple_files=True,
+            key="batch_uploader",
+        )
+        recipe = st.multiselect(
+            "적용할 작업 (노이즈 제거 → 컬러화 → 해상도 업 순서로 적용)",
+            list(batch.RECIPE_ORDER),
+            default=["denoise", "upscale"],
+            format_func=BATCH_OP_LABELS.get,
+            key="batch_recipe",
+        )
+        with_story = st.checkbox("사진마다 스토리도 생성 (느림, 스토리 요청 한도 안에서만)", key="batch_with_story")
+        if st.button("배치 시작", key="btn_batch", disabled=not files or not recipe):
+            run_batch_job(files, recipe, with_story)
+        batch_download(st.session_state.setdefault("batch", {}))
+
+
+batch_workflow()
+
 if st.session_state.get("scroll_to_story"):
     st.markdown("""
     <script>
@@ -1278,3 +1547,8 @@ st.markdown("<div style='height: 15rem'></div>", unsafe_allow_html=True)
 
 # =====================[ 추가 블록 끝 ]====================
 st.markdown("<div id='#c33b860f'></div>", unsafe_allow_html=True)
+
+profiling.end(_script_profile)
+
+# 첫 페인트 이후 ML 스택 미리 불러오기 (ML_PRELOAD=1 일 때만)
+preload_in_background()
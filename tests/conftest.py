@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# restoration/ 와 bench/ 를 설치 없이 import
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from restoration.admission import AdmissionController, ServerBusy
+
+
+def test_admits_immediately_while_slots_free():
+    gate = AdmissionController("t", max_concurrent=2, max_queue=2)
+    a, b = gate.enter("a"), gate.enter("b")
+    assert a.admitted and b.admitted
+    c = gate.enter("c")
+    assert not c.admitted
+    assert gate.stats() == {"running": 2, "waiting": 1, "max_concurrent": 2, "max_queue": 2}
+
+
+def test_rejects_when_queue_full():
+    gate = AdmissionController("t", max_concurrent=1, max_queue=1)
+    gate.enter("a")
+    gate.enter("b")
+    with pytest.raises(ServerBusy):
+        gate.enter("c")
+
+
+def test_fifo_order_and_positions():
+    gate = AdmissionController("t", max_concurrent=1, max_queue=8)
+    running = gate.enter("run")
+    waiting = [gate.enter(str(i)) for i in range(4)]
+    assert [gate.position(t) for t in waiting] == [1, 2, 3, 4]
+    assert gate.position(running) == 0
+
+    # 뒤의 티켓은 앞 티켓이 입장하기 전에는 자리가 나도 입장할 수 없음
+    gate.release(running)
+    assert not gate.wait(waiting[1], timeout=0.05)
+    order = []
+    for ticket in waiting:
+        assert gate.wait(ticket, timeout=1)
+        order.append(ticket.owner)
+        gate.release(ticket)
+    assert order == ["0", "1", "2", "3"]
+
+
+def test_threads_are_admitted_in_arrival_order():
+    gate = AdmissionController("t", max_concurrent=1, max_queue=8)
+    first = gate.enter("first")
+    tickets = [gate.enter(str(i)) for i in range(5)]
+    order, lock = [], threading.Lock()
+
+    def worker(ticket):
+        assert gate.wait(ticket, timeout=5)
+        with gate.slot(ticket):
+            with lock:
+                order.append(ticket.owner)
+
+    # 나중에 들어온 티켓의 스레드부터 시작해도 순서는 대기열 순서
+    threads = [threading.Thread(target=worker, args=(t,)) for t in reversed(tickets)]
+    for thread in threads:
+        thread.start()
+    gate.release(first)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["0", "1", "2", "3", "4"]
+    assert gate.stats()["running"] == 0
+
+
+def test_cancel_removes_waiter_and_moves_queue():
+    gate = AdmissionController("t", max_concurrent=1, max_queue=8)
+    running = gate.enter("run")
+    a, b = gate.enter("a"), gate.enter("b")
+    gate.cancel(a)
+    assert gate.position(b) == 1
+    gate.release(running)
+    assert gate.wait(b, timeout=1)
+    gate.cancel(b)  # 입장한 티켓의 cancel 은 release
+    assert gate.stats() == {"running": 0, "waiting": 0, "max_concurrent": 1, "max_queue": 8}
+
+
+def test_slot_releases_on_error():
+    gate = AdmissionController("t", max_concurrent=1, max_queue=1)
+    ticket = gate.enter()
+    with pytest.raises(RuntimeError):
+        with gate.slot(ticket):
+            raise RuntimeError("boom")
+    assert gate.stats()["running"] == 0
+    gate.release(ticket)  # 두 번 반납해도 무시
+    assert gate.stats()["running"] == 0
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from PIL import Image, ImageChops
+
+from restoration import cancellation, ops
+from restoration.cancellation import Cancelled, CancelToken
+from restoration.ml import StubStoryModel
+
+
+def test_cancel_keeps_first_reason():
+    token = CancelToken()
+    assert not token.cancelled
+    token.cancel("rerun")
+    token.cancel("session_closed")
+    assert token.cancelled and token.reason == "rerun"
+    with pytest.raises(Cancelled) as exc:
+        token.check("test")
+    assert exc.value.reason == "rerun"
+
+
+def test_probe_cancels_token():
+    state = {"reason": None}
+    token = CancelToken(probes=[lambda: state["reason"]])
+    token.check("test")
+    state["reason"] = "upload_changed"
+    assert token.cancelled
+    assert token.reason == "upload_changed"
+
+
+def test_bind_cancels_previous_token_on_new_digest():
+    first = cancellation.bind("s-bind", "d1")
+    same = cancellation.bind("s-bind", "d1")
+    assert not first.cancelled  # 같은 업로드로 다시 bind (rerun) 하면 유지
+    other = cancellation.bind("s-bind", "d2")
+    assert same.cancelled and same.reason == "new_upload"
+    cancellation.cancel_session("s-bind")
+    assert other.reason == "session_closed"
+
+
+def test_release_only_drops_current_token():
+    old = cancellation.bind("s-release", "d1")
+    current = cancellation.bind("s-release", "d2")
+    cancellation.release(old)  # 이미 교체된 토큰 → 현재 토큰은 그대로
+    cancellation.cancel_session("s-release")
+    assert current.reason == "session_closed"
+
+    token = cancellation.bind("s-release", "d3")
+    cancellation.release(token)
+    cancellation.cancel_session("s-release")
+    assert not token.cancelled
+
+
+def test_strips_cover_height():
+    assert list(cancellation.strips(5, 2)) == [(0, 2), (2, 4), (4, 5)]
+    assert list(cancellation.strips(0, 2)) == []
+
+
+def test_image_op_stops_between_strips():
+    image = Image.new("RGB", (16, ops.STRIP_ROWS * 4))
+    checks = []
+
+    def probe():
+        checks.append(1)
+        return "rerun" if len(checks) >= 2 else None
+
+    with pytest.raises(Cancelled):
+        ops.denoise_image(image, cancel=CancelToken(probes=[probe]))
+    assert len(checks) == 2  # 두 번째 띠 앞에서 중단, 나머지 띠는 처리하지 않음
+
+
+@pytest.mark.parametrize("op,whole", [(ops.upscale_image, ops._upscale), (ops.denoise_image, ops._denoise)])
+def test_image_op_by_strips_matches_whole_image(op, whole):
+    # 띠 경계(margin)를 포함해 전체 이미지 연산과 픽셀 단위로 같아야 함
+    size = (37, ops.STRIP_ROWS * 2 + 7)
+    image = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    out = op(image, cancel=CancelToken())
+    expected = whole(image)
+    assert out.size == expected.size
+    assert ImageChops.difference(out, expected).getbbox() is None
+
+
+def test_stub_generation_stops_on_cancel():
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return "client_cancel" if len(calls) > 3 else None
+
+    with pytest.raises(Cancelled) as exc:
+        StubStoryModel().generate([], max_new_tokens=100, cancel=CancelToken(probes=[probe]))
+    assert exc.value.reason == "client_cancel"
+    assert len(calls) == 4
+
+
+def test_rerun_probe_reads_streamlit_requests():
+    # 비공개 속성을 읽으므로 고정된 Streamlit 버전(requirements.txt)에서 실제로 동작하는지 확인
+    script_requests = pytest.importorskip("streamlit.runtime.scriptrunner_utils.script_requests")
+    requests_ = script_requests.ScriptRequests()
+    token = CancelToken(probes=[cancellation.rerun_probe(requests_)])
+    assert not token.cancelled
+    requests_.request_rerun(script_requests.RerunData())
+    assert token.cancelled and token.reason == "rerun"
+
+    requests_ = script_requests.ScriptRequests()
+    probe = cancellation.rerun_probe(requests_)
+    requests_.request_stop()
+    assert probe() == "stop"
+
+
+def test_rerun_probe_continues_when_state_unreadable():
+    assert cancellation.rerun_probe(object())() is None
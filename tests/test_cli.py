@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from restoration import cli
+
+
+@pytest.fixture
+def folders(tmp_path):
+    src, dst = tmp_path / "scans", tmp_path / "restored"
+    (src / "album").mkdir(parents=True)
+    Image.new("RGB", (24, 16), "red").save(src / "a.png")
+    Image.new("RGB", (24, 16), "blue").save(src / "album" / "b.jpg")
+    (src / "broken.png").write_bytes(b"not an image")
+    (src / "notes.txt").write_text("무시")
+    return src, dst
+
+
+def _run(src, dst, *extra) -> int:
+    return cli.main([str(src), str(dst), "--ops", "denoise", "--workers", "1", *extra])
+
+
+def _lines(dst):
+    with open(dst / cli.MANIFEST_NAME, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_first_run_writes_outputs_and_manifest(folders):
+    src, dst = folders
+    assert _run(src, dst) == 1  # broken.png 실패
+    entries = {e["name"]: e for e in _lines(dst)}
+    assert set(entries) == {"a.png", "album/b.jpg", "broken.png"}
+    assert entries["broken.png"]["status"] == "failed"
+    for name in ("a.png", "album/b.jpg"):
+        assert entries[name]["status"] == "ok"
+        assert (dst / entries[name]["output"]).is_file()
+
+
+def test_rerun_skips_finished_files(folders):
+    src, dst = folders
+    _run(src, dst)
+    assert _run(src, dst) == 0
+    assert len(_lines(dst)) == 3
+
+
+def test_rerun_redoes_changed_or_missing_results(folders):
+    src, dst = folders
+    _run(src, dst)
+    first = {e["name"]: e for e in _lines(dst)}
+    (dst / first["a.png"]["output"]).unlink()
+    stat = os.stat(src / "album" / "b.jpg")
+    os.utime(src / "album" / "b.jpg", (stat.st_atime, stat.st_mtime + 10))
+    _run(src, dst)
+    assert [e["name"] for e in _lines(dst)[3:]] == ["a.png", "album/b.jpg"]
+    assert (dst / first["a.png"]["output"]).is_file()
+
+
+def test_retry_failed_and_recipe_change(folders):
+    src, dst = folders
+    _run(src, dst)
+    _run(src, dst, "--retry-failed")
+    assert [e["name"] for e in _lines(dst)[3:]] == ["broken.png"]
+    cli.main([str(src), str(dst), "--ops", "denoise", "upscale", "--workers", "1"])
+    assert sorted(e["name"] for e in _lines(dst)[4:]) == ["a.png", "album/b.jpg", "broken.png"]  # 레시피가 바뀌면 전부 다시
+
+
+def test_resume_past_torn_manifest_line(folders):
+    src, dst = folders
+    _run(src, dst)
+    with open(dst / cli.MANIFEST_NAME, "a", encoding="utf-8") as f:
+        f.write('{"name": "album/b.jpg", "sta')  # 강제 종료로 잘린 줄
+    entries = cli.load_manifest(dst / cli.MANIFEST_NAME)
+    assert entries["album/b.jpg"]["status"] == "ok"
+
+    stat = os.stat(src / "album" / "b.jpg")
+    os.utime(src / "album" / "b.jpg", (stat.st_atime, stat.st_mtime + 10))
+    assert _run(src, dst) == 0
+    lines = _lines(dst)  # 모든 줄이 온전한 JSON (잘린 조각에 붙지 않음)
+    assert [e["name"] for e in lines[3:]] == ["album/b.jpg"]
+
+    assert _run(src, dst) == 0  # 세 번째 실행: 더 할 일 없음
+    assert len(_lines(dst)) == len(lines)
+
+
+def test_unknown_stage_rejected_before_processing(folders):
+    src, dst = folders
+    with pytest.raises(SystemExit) as exc:
+        _run(src, dst, "--stage", "png_optimised")
+    assert exc.value.code == 2
+    assert not (dst / cli.MANIFEST_NAME).exists()
+
+
+def test_manifest_records_story_actually_written(folders, monkeypatch):
+    src, dst = folders
+    texts = {"story": None}
+    monkeypatch.setattr(cli, "story_writer", lambda max_new_tokens: lambda data: texts["story"])
+    _run(src, dst, "--story")
+    assert not any(e["story"] for e in _lines(dst))
+
+    texts["story"] = "옛날 옛적에"
+    _run(src, dst, "--story")  # 스토리가 없던 파일은 다시
+    redone = _lines(dst)[3:]
+    assert sorted(e["name"] for e in redone) == ["a.png", "album/b.jpg"]
+    assert all(e["story"] for e in redone)
+    assert len(list(dst.rglob("*.txt"))) == 2
+    assert _run(src, dst, "--story") == 0
+
+
+def test_output_inside_input_is_not_scanned(folders):
+    src, _ = folders
+    dst = src / "out"
+    _run(src, dst)
+    _run(src, dst, "--retry-failed")
+    assert not any(e["name"].startswith("out/") for e in _lines(dst))
@@ -0,0 +1,46 @@
+import io
+import os
+
+import pytest
+from PIL import Image, ImageChops
+
+from restoration import encoding
+
+LOSSLESS = {"png_default", "png_store", "png_fast", "png_optimized", "webp_lossless"}
+
+
+def _noise(size=(64, 48)) -> Image.Image:
+    return Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+
+
+def _roundtrip(image: Image.Image, policy) -> Image.Image:
+    with Image.open(io.BytesIO(encoding.encode_image(image, policy))) as out:
+        assert out.format == policy.format
+        return out.convert("RGB")
+
+
+def test_export_is_lossless_by_default():
+    if os.getenv("IMAGE_EXPORT_POLICY"):
+        pytest.skip("IMAGE_EXPORT_POLICY 로 지정됨")
+    policy = encoding.policy_for("export")
+    assert policy.name in LOSSLESS
+    image = _noise()
+    assert ImageChops.difference(_roundtrip(image, policy), image).getbbox() is None
+
+
+@pytest.mark.parametrize("name", sorted(LOSSLESS))
+def test_lossless_policies_roundtrip(name):
+    image = _noise()
+    assert ImageChops.difference(_roundtrip(image, encoding.POLICIES[name]), image).getbbox() is None
+
+
+def test_export_bytes_reencodes_with_export_policy():
+    buf = io.BytesIO()
+    _noise().save(buf, format="PNG", compress_level=1)
+    with Image.open(io.BytesIO(encoding.export_bytes(buf.getvalue()))) as out:
+        assert out.format == encoding.policy_for("export").format
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        encoding.policy_for("png_optimised")
@@ -0,0 +1,23 @@
+import pytest
+
+from restoration import hero
+
+
+@pytest.mark.parametrize("base,expected", [
+    ("", "/app/static/hero"),
+    ("photos", "/photos/app/static/hero"),
+    ("/photos/", "/photos/app/static/hero"),
+    ("team/photos", "/team/photos/app/static/hero"),
+])
+def test_static_url_prefix(base, expected):
+    assert hero.static_url_prefix(base) == expected
+
+
+@pytest.mark.skipif(not hero.hero_sources_exist(), reason="before.png / after.png 없음")
+def test_asset_urls_are_absolute(tmp_path, monkeypatch):
+    monkeypatch.setattr(hero, "HERO_BUILD_DIR", tmp_path)
+    assets = hero.load_hero_assets("photos")
+    for name in ("before", "after"):
+        assert assets[name]["src"].startswith("/photos/app/static/hero/")
+        for candidate in assets[name]["srcset"].split(", "):
+            assert candidate.startswith("/photos/app/static/hero/")
@@ -0,0 +1,90 @@
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+from restoration import ingest
+from restoration.ingest import IngestError
+
+
+def _encode(fmt: str, size=(40, 30), mode="RGB") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, (10, 20, 30)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+class _Stream(io.RawIOBase):
+    """BytesIO 가 아닌 스트림 (파일 / 소켓처럼 청크로만 읽힘)."""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, pos, whence=0):
+        return self._buf.seek(pos, whence)
+
+    def readinto(self, b):
+        chunk = self._buf.read(len(b))
+        b[:len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG", "BMP", "TIFF"])
+def test_accepts_allowed_formats(fmt):
+    data = _encode(fmt)
+    upload = ingest.ingest(io.BytesIO(data), f"a.{fmt.lower()}", len(data))
+    assert (upload.format, upload.width, upload.height) == (fmt, 40, 30)
+    assert upload.digest == hashlib.sha1(data).hexdigest()
+    assert upload.data == data
+
+
+def test_non_bytesio_stream_hashes_the_same():
+    data = _encode("PNG")
+    upload = ingest.ingest(_Stream(data), "a.png")
+    assert upload.digest == hashlib.sha1(data).hexdigest()
+    assert upload.size == len(data)
+
+
+def test_rejects_declared_size_before_reading():
+    class Unreadable(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("읽기 전에 거절되어야 함")
+
+    with pytest.raises(IngestError, match="너무 큽니다"):
+        ingest.ingest(Unreadable(b""), "big.png", size=11, max_bytes=10)
+
+
+def test_rejects_unknown_size_stream_while_reading():
+    data = _encode("BMP", size=(200, 200))
+    with pytest.raises(IngestError, match="너무 큽니다"):
+        ingest.ingest(_Stream(data), "a.bmp", max_bytes=len(data) - 1)
+
+
+def test_rejects_too_many_pixels():
+    data = _encode("PNG", size=(100, 100))
+    with pytest.raises(IngestError, match="해상도"):
+        ingest.ingest(io.BytesIO(data), "a.png", len(data), max_pixels=100 * 100 - 1)
+
+
+def test_rejects_disallowed_format():
+    data = _encode("GIF", mode="P")
+    with pytest.raises(IngestError, match="GIF"):
+        ingest.ingest(io.BytesIO(data), "a.gif", len(data))
+
+
+def test_rejects_garbage():
+    with pytest.raises(IngestError, match="읽을 수 없습니다"):
+        ingest.ingest(io.BytesIO(b"not an image"), "a.png", 12)
+
+
+def test_ingest_path(tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(_encode("PNG"))
+    upload = ingest.ingest_path(str(path))
+    assert (upload.name, upload.format) == ("a.png", "PNG")
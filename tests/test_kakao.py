@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from bench.kakao_stub import KakaoStub
+from restoration import kakao
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs) -> KakaoStub:
+        server = KakaoStub(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    # 테스트마다 새 커넥션 풀 (연결 수를 스텁 단위로 셈)
+    monkeypatch.setattr(kakao, "_session", None)
+    yield
+    if kakao._session is not None:
+        kakao._session.close()
+
+
+def _config(server: KakaoStub) -> kakao.OAuthConfig:
+    return kakao.OAuthConfig(
+        rest_api_key="key",
+        redirect_uri="http://localhost/callback",
+        state_secret="secret",
+        token_url=server.token_url,
+        userme_url=server.user_url,
+    )
+
+
+# ---------- 재시도 ----------
+def test_profile_get_retried_on_503(stub):
+    server = stub(fail_first=1)
+    user_me = kakao.get_user_profile(_config(server), "tok-abc")
+    assert kakao.extract_profile(user_me)[0] == "user-ok-abc"  # 토큰 끝 6자리
+    assert server.stats["profile"] == 2
+    assert server.stats["failed"] == 1
+
+
+def test_profile_gives_up_after_status_retries(stub):
+    server = stub(fail_first=10)
+    with pytest.raises(requests.HTTPError):
+        kakao.get_user_profile(_config(server), "tok-abc")
+    assert server.stats["profile"] == 3  # 처음 + status 재시도 2번
+
+
+def test_token_post_not_retried_after_response(stub):
+    server = stub(fail_token=1)
+    with pytest.raises(requests.HTTPError):
+        kakao.exchange_code_for_token(_config(server), "code1")
+    assert server.stats["token"] == 1
+    # 인가 코드는 1회용 → 다음 교환은 새 요청으로
+    assert kakao.exchange_code_for_token(_config(server), "code2")["access_token"] == "tok-code2"
+    assert server.stats["token"] == 2
+
+
+# ---------- 커넥션 풀 ----------
+def test_pooled_session_reuses_connection(stub):
+    server = stub()
+    config = _config(server)
+    for i in range(5):
+        token = kakao.exchange_code_for_token(config, f"c{i}")["access_token"]
+        kakao.get_user_profile(config, token)
+    assert server.stats["token"] == 5
+    assert server.stats["profile"] == 5
+    assert server.stats["connections"] == 1
+    assert kakao.http_session() is kakao.http_session()
@@ -0,0 +1,155 @@
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageChops
+
+from restoration import ingest, largeimage
+from restoration.ingest import IngestError
+from restoration.largeimage import MappedImage, NotMappable
+
+SIZE = (301, 517)  # 홀수 폭 → BMP 행 패딩
+
+
+def _noise(mode: str) -> Image.Image:
+    im = Image.frombytes("RGB", SIZE, os.urandom(SIZE[0] * SIZE[1] * 3))
+    return im.convert(mode) if mode != "P" else im.quantize(64)
+
+
+def _same(a: Image.Image, b: Image.Image) -> bool:
+    return a.size == b.size and ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox() is None
+
+
+@pytest.fixture(params=[("BMP", "RGB"), ("BMP", "L"), ("BMP", "P"), ("TIFF", "RGB"), ("TIFF", "L"), ("TIFF", "RGBA")])
+def saved(request, tmp_path):
+    fmt, mode = request.param
+    path = tmp_path / f"img.{fmt.lower()}"
+    _noise(mode).save(path, format=fmt)
+    with Image.open(path) as im:
+        reference = im.convert("RGB")
+    return path, reference
+
+
+def test_strip_matches_pil(saved):
+    path, reference = saved
+    with MappedImage(path) as mapped:
+        assert mapped.size == reference.size
+        for top, bottom in [(0, 1), (0, 100), (37, 301), (500, 517), (0, SIZE[1])]:
+            assert _same(mapped.strip(top, bottom), reference.crop((0, top, SIZE[0], bottom)))
+
+
+def test_crop_matches_pil(saved):
+    path, reference = saved
+    with MappedImage(path) as mapped:
+        for box in [(0, 0, 10, 10), (13, 250, 300, 400), (0, 0, *SIZE), (299, 516, 301, 517)]:
+            assert _same(mapped.crop(box), reference.crop(box))
+
+
+def test_to_image_matches_pil(saved):
+    path, reference = saved
+    with MappedImage(path) as mapped:
+        assert _same(mapped.to_image(rows=64), reference)
+        preview = mapped.preview(max_side=128)
+    assert max(preview.size) <= 128
+
+
+@pytest.mark.parametrize("fmt,kwargs", [("TIFF", {"compression": "tiff_lzw"}), ("PNG", {}), ("JPEG", {})])
+def test_compressed_is_not_mappable(tmp_path, fmt, kwargs):
+    path = tmp_path / f"img.{fmt.lower()}"
+    _noise("RGB").save(path, format=fmt, **kwargs)
+    with pytest.raises(NotMappable):
+        MappedImage(path)
+
+
+def test_truncated_file_is_not_mappable(tmp_path):
+    path = tmp_path / "img.bmp"
+    _noise("RGB").save(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(NotMappable):
+        MappedImage(path)
+
+
+def test_closed_image_refuses_strip(saved):
+    path, _ = saved
+    mapped = MappedImage(path)
+    mapped.close()
+    with pytest.raises(ValueError):
+        mapped.strip(0, 1)
+
+
+def test_should_map():
+    assert largeimage.should_map("BMP", largeimage.MIN_BYTES)
+    assert not largeimage.should_map("BMP", largeimage.MIN_BYTES - 1)
+    assert not largeimage.should_map("PNG", largeimage.MIN_BYTES)
+
+
+# ---------- ingest 의 mapped 한도 ----------
+@pytest.fixture
+def small_limits(monkeypatch):
+    # 일반 한도 = 이 테스트 이미지보다 작게, mapped 한도 = 넉넉하게
+    monkeypatch.setattr(ingest, "MAPPED_MAX_BYTES", 10 * 1024 * 1024)
+    monkeypatch.setattr(ingest, "MAPPED_MAX_PIXELS", 10_000_000)
+    return {"max_bytes": 1000, "max_pixels": 1000}
+
+
+def _encoded(fmt: str) -> bytes:
+    buf = io.BytesIO()
+    _noise("RGB").save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_mapped_limits_apply_to_mappable_formats(small_limits):
+    data = _encoded("BMP")
+    with pytest.raises(IngestError):
+        ingest.ingest(io.BytesIO(data), "a.bmp", len(data), **small_limits)
+    upload = ingest.ingest(io.BytesIO(data), "a.bmp", len(data), mapped=True, **small_limits)
+    assert upload.format == "BMP"
+    # 메모리 맵으로 못 열었을 때는 일반 한도로 다시 검사
+    with pytest.raises(IngestError):
+        ingest.check_unmapped(upload, **small_limits)
+
+
+def test_mapped_limits_do_not_apply_to_other_formats(small_limits):
+    data = _encoded("PNG")
+    with pytest.raises(IngestError):
+        ingest.ingest(io.BytesIO(data), "a.png", len(data), mapped=True, **small_limits)
+
+
+def test_mapped_size_checked_before_reading(small_limits):
+    class Unreadable(io.BytesIO):
+        def read(self, *args):
+            raise AssertionError("읽기 전에 거절되어야 함")
+
+    with pytest.raises(IngestError, match="너무 큽니다"):
+        ingest.ingest(Unreadable(b""), "a.bmp", 10 * 1024 * 1024 + 1, mapped=True, **small_limits)
+
+
+def test_ingest_leaves_pillow_limit_alone():
+    # 새 프로세스에서 import 전후 비교 (이 프로세스는 이미 import 함)
+    code = (
+        "from PIL import Image; before = Image.MAX_IMAGE_PIXELS; "
+        "import restoration.ingest, restoration.largeimage; "
+        "assert Image.MAX_IMAGE_PIXELS == before, Image.MAX_IMAGE_PIXELS"
+    )
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+
+def test_mapped_path_skips_pillow_limit_only_there(tmp_path, monkeypatch):
+    # Pillow 전역 한도보다 큰 BMP: mapped 경로는 자체 한도로 받고, 일반 경로는 그대로 거절
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    path = tmp_path / "img.bmp"
+    _noise("RGB").save(path)
+    data = path.read_bytes()
+    upload = ingest.ingest(io.BytesIO(data), "a.bmp", len(data), mapped=True)
+    assert (upload.width, upload.height) == SIZE
+    with MappedImage(path) as mapped:
+        assert mapped.size == SIZE
+    with pytest.raises(IngestError, match="해상도"):
+        ingest.ingest(io.BytesIO(data), "a.bmp", len(data))
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(path)
@@ -0,0 +1,65 @@
+import io
+import json
+import logging
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from restoration import memory
+
+APP = Path(__file__).resolve().parent.parent / "team_project1.py"
+
+
+def _memory_records(caplog):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == "restoration.memory"]
+
+
+def test_track_logs_one_info_line(caplog):
+    caplog.set_level(logging.INFO, logger="restoration.memory")
+    with memory.track("upscale", "session-1234567890") as info:
+        bytearray(1024)
+    records = [r for r in caplog.records if r.name == "restoration.memory"]
+    assert len(records) == 1 and records[0].levelno == logging.INFO
+    line = json.loads(records[0].getMessage())
+    assert line["event"] == "memory" and line["op"] == "upscale"
+    assert line["session"] == "session-1234"  # 세션 ID 앞 12자만
+    assert line["rss_after"] == info["rss_after"]
+    assert line["peak_alloc"] is None  # MEMORY_TRACEMALLOC 기본 off
+
+
+def test_tracemalloc_opt_in(monkeypatch):
+    monkeypatch.setattr(memory, "TRACEMALLOC", True)
+    with memory.track("denoise") as info:
+        blob = bytes(4 * 1024 * 1024)
+    assert info["peak_alloc"] >= len(blob)
+
+
+def test_retained_bytes_counts_shared_blobs_once():
+    data, other = b"x" * 10, b"y" * 5
+    rstate = {"original_bytes": data, "current_bytes": data, "history": [{"bytes": data}, {"bytes": other}]}
+    assert memory.retained_bytes(rstate) == 15
+    assert memory.retained_bytes(None) == 0
+
+
+def test_app_emits_memory_line_by_default(monkeypatch, caplog):
+    # 기본 배포: 앱이 restoration 로거를 INFO 로 설정 → 단계별 JSON 한 줄이 실제로 기록됨
+    pytest.importorskip("streamlit")
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setattr(logging.getLogger("restoration"), "level", logging.NOTSET)
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.secrets["HF_TOKEN"] = "test"
+    at.run()
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), "gray").save(buf, "PNG")
+    data = buf.getvalue()
+    at.session_state["restoration"] = {
+        "upload_digest": "d", "original_bytes": data, "current_bytes": data, "file_name": "a.png",
+        "description": "", "counts": {"color": 0, "upscale": 0, "denoise": 0, "story": 0},
+        "history": [], "story": None,
+    }
+    at.run()
+    at.button(key="btn_upscale").click().run()
+    assert not at.exception
+    assert [line["op"] for line in _memory_records(caplog)] == ["upscale"]
@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+from restoration import ratelimit
+from restoration.ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_capacity_then_waits():
+    bucket = TokenBucket(3, 30)  # 10초마다 1회 회복
+    now = bucket.updated
+    assert [bucket.take(1, now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(1, now) == pytest.approx(10.0)
+
+
+def test_bucket_refills_over_time_up_to_capacity():
+    bucket = TokenBucket(3, 30)
+    now = bucket.updated
+    for _ in range(3):
+        bucket.take(1, now)
+    assert bucket.take(1, now + 5) == pytest.approx(5.0)
+    assert bucket.take(1, now + 10) == 0.0
+    assert bucket.take(1, now + 10) > 0
+    bucket.take(0, now + 1000)
+    assert bucket.tokens == 3  # 오래 쉬어도 용량 이상으로 쌓이지 않음
+
+
+def test_bucket_cost_above_capacity_needs_full_bucket():
+    bucket = TokenBucket(4, 40)
+    now = bucket.updated
+    assert bucket.take(10, now) == 0.0  # 가득 차 있으면 통과 (용량만큼 차감)
+    assert bucket.tokens == 0
+    assert bucket.take(10, now) == pytest.approx(40.0)
+
+
+def test_zero_period_is_unlimited():
+    bucket = TokenBucket(1, 0)
+    assert bucket.rate == math.inf
+    now = bucket.updated
+    assert bucket.take(1, now) == 0.0
+    assert bucket.take(1, now) == 0.0
+
+
+def test_limiter_keys_and_ops_are_separate():
+    limiter = RateLimiter({("guest", "story"): (1, 600), ("guest", "image"): (1, 600)})
+    assert limiter.acquire("guest:a", "guest", "story") == 0.0
+    assert limiter.acquire("guest:a", "guest", "story") > 0
+    assert limiter.acquire("guest:a", "guest", "image") == 0.0
+    assert limiter.acquire("guest:b", "guest", "story") == 0.0
+    assert limiter.acquire("kakao:1", "kakao", "story") == 0.0  # 정의 안 된 등급은 제한 없음
+
+
+def test_limiter_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_BUCKETS", 2)
+    limiter = RateLimiter({("guest", "story"): (1, 600)})
+    for key in ("a", "b", "c"):
+        limiter.acquire(key, "guest", "story")
+    assert limiter.acquire("a", "guest", "story") == 0.0  # 지워진 사용자는 가득 찬 버킷으로 다시 시작
+    assert limiter.acquire("c", "guest", "story") > 0
+
+
+def test_load_limits_from_env(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_GUEST_STORY", "5/60")
+    limits = ratelimit.load_limits()
+    assert limits[("guest", "story")] == (5.0, 60.0)
+    assert limits[("kakao", "story")] == ratelimit.DEFAULT_LIMITS[("kakao", "story")]
+
+
+def test_batch_max_files(monkeypatch):
+    monkeypatch.delenv("BATCH_MAX_FILES_GUEST", raising=False)
+    assert ratelimit.batch_max_files("guest", 500) == 500
+    monkeypatch.setenv("BATCH_MAX_FILES_GUEST", "20")
+    assert ratelimit.batch_max_files("guest", 500) == 20
+    assert ratelimit.batch_max_files("kakao", 500) == 500
+
+
+def test_identity_and_image_cost():
+    assert ratelimit.identity({"id": 42}, "s1") == ("kakao:42", "kakao")
+    assert ratelimit.identity(None, "s1") == ("guest:s1", "guest")
+    assert ratelimit.image_cost(None) == 1.0
+    assert ratelimit.image_cost(1_000_000) == 1.0
+    assert ratelimit.image_cost(12_000_001) == 4.0
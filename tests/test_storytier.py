@@ -0,0 +1,129 @@
+import io
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from restoration import ml, storytier, telemetry
+from restoration.telemetry import GenerationStats
+
+APP = Path(__file__).resolve().parent.parent / "team_project1.py"
+TOKENS = 250
+
+
+@pytest.fixture(autouse=True)
+def fresh_tier(monkeypatch):
+    monkeypatch.setattr(storytier, "_ready", threading.Event())
+    monkeypatch.setattr(storytier, "_warm_thread", None)
+    monkeypatch.setattr(storytier, "MODE", "tiered")
+    monkeypatch.setattr(telemetry, "_records", type(telemetry._records)(maxlen=telemetry.HISTORY_SIZE))
+
+
+def _gate(running=0, waiting=0, max_concurrent=1, max_queue=8):
+    return {"running": running, "waiting": waiting, "max_concurrent": max_concurrent, "max_queue": max_queue}
+
+
+def _history(*totals, max_new_tokens=TOKENS):
+    for total in totals:
+        telemetry.record(GenerationStats("stub", "cpu", "none", max_new_tokens, total_s=total))
+
+
+# ---------- decide ----------
+def test_template_until_model_ready():
+    assert storytier.decide([_gate()], TOKENS) == (False, "model_not_loaded")
+    storytier.mark_ready()
+    assert storytier.decide([_gate()], TOKENS) == (True, "ok")
+
+
+def test_template_mode_never_uses_model(monkeypatch):
+    monkeypatch.setattr(storytier, "MODE", "template")
+    storytier.mark_ready()
+    assert storytier.decide([_gate()], TOKENS) == (False, "mode")
+
+
+def test_full_queue_on_any_gate():
+    storytier.mark_ready()
+    assert storytier.decide([_gate(), _gate(waiting=8)], TOKENS) == (False, "queue_full")
+
+
+def test_slo_uses_recent_median_and_queue_depth():
+    storytier.mark_ready()
+    _history(4, 5, 100, max_new_tokens=TOKENS)
+    _history(1000, max_new_tokens=64)  # 다른 상한의 기록은 제외
+    assert storytier.expected_seconds(_gate(), TOKENS) == 5
+    # 앞선 3개 요청, 동시 2개 → 1라운드 기다린 뒤 내 차례
+    assert storytier.expected_seconds(_gate(running=2, waiting=1, max_concurrent=2), TOKENS) == 10
+    assert storytier.decide([_gate(running=1, waiting=4)], TOKENS, slo_sec=20) == (False, "slo")
+    assert storytier.decide([_gate(running=1, waiting=2)], TOKENS, slo_sec=20) == (True, "ok")
+
+
+def test_no_history_does_not_block():
+    storytier.mark_ready()
+    assert storytier.expected_seconds(_gate(running=1, waiting=7), TOKENS) is None
+    assert storytier.decide([_gate(running=1, waiting=7)], TOKENS, slo_sec=0.001) == (True, "ok")
+
+
+def test_warm_starts_one_loader():
+    release, calls = threading.Event(), []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        storytier.mark_ready()
+
+    storytier.warm(load)
+    storytier.warm(load)
+    release.set()
+    storytier._warm_thread.join(5)
+    storytier.warm(load)  # 이미 로드됨
+    assert calls == [1]
+    assert storytier.model_ready()
+
+
+# ---------- 앱: 템플릿 먼저 → 모델 결과로 교체 ----------
+def test_app_shows_template_then_upgrades(monkeypatch):
+    st = pytest.importorskip("streamlit")
+    from streamlit.testing.v1 import AppTest
+
+    release = threading.Event()
+
+    def slow_load(hf_token=None):
+        release.wait(10)
+        return ml.StubStoryModel()
+
+    monkeypatch.setattr(ml, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(ml, "load_gemma", slow_load)
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.secrets["HF_TOKEN"] = "test"
+    at.run()
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), "gray").save(buf, "PNG")
+    data = buf.getvalue()
+    at.session_state["restoration"] = {
+        "upload_digest": "d", "original_bytes": data, "current_bytes": data, "file_name": "a.png",
+        "description": "할머니 사진", "counts": {"color": 0, "upscale": 1, "denoise": 0, "story": 0},
+        "history": [], "story": None,
+    }
+    at.run()
+
+    at.button(key="btn_story").click().run()
+    story = at.session_state["restoration"]["story"]
+    assert (story["tier"], story["reason"]) == ("template", "model_not_loaded")
+    assert story["text"]
+
+    release.set()
+    deadline = time.monotonic() + 10
+    while not storytier.model_ready() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert storytier.model_ready()
+
+    at.button(key="btn_story").click().run()
+    assert not at.exception
+    story = at.session_state["restoration"]["story"]
+    assert story["tier"] == "model"
+    assert story["telemetry"]["output_tokens"] > 0
+    st.cache_resource.clear()